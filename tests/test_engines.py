@@ -0,0 +1,316 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+
+##############################################################################
+#
+# Equivalence checks of the engines of the tool against direct
+# implementations (run with python3 -m pytest tests, or python3
+# tests/test_engines.py) :
+#   - unranking of the tuples (combs_batches, extends_batches) against
+#     itertools.combinations
+#   - subset index of the flawed tuples (subset_index) against a brute
+#     force inclusion test
+#   - bitmaps of the expressions (anf.py) against the polynomials of the
+#     gadget
+#   - symmetries of the gadget (symmetry.py) : orbits of the tuples, and
+#     the coefficients of RP and RPC with and without the symmetries
+#
+##############################################################################
+
+import os
+import sys
+import itertools
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from verif_files import anf, elimination, symmetry
+from verif_files.verification_rules import combs_batches, extends_batches, extends_count
+from verif_files.elimination import subset_index, eliminate_from_smaller
+from verif_files.gadget_cache import compile_gadget
+from verif_files.random_probing_func import verification_random_probing
+from verif_files.random_probing_comp_func import verification_random_probing_comp
+
+ISW_3 = """#SHARES 3
+#IN a b
+#RANDOMS r01 r02 r12
+#OUT d
+
+c0 = a0 * b0
+c1 = a1 * b1
+c2 = a2 * b2
+u = a0 * b1
+s10 = r01 + u
+u = a1 * b0
+s10 = s10 + u
+u = a0 * b2
+s20 = r02 + u
+u = a2 * b0
+s20 = s20 + u
+u = a1 * b2
+s21 = r12 + u
+u = a2 * b1
+s21 = s21 + u
+c0 = c0 + r01
+d0 = c0 + r02
+
+c1 = c1 + s10
+d1 = c1 + r12
+
+c2 = c2 + s20
+d2 = c2 + s21
+"""
+
+#Same gadget up to a permutation of the shares (cyclic), and up to the exchange of the two inputs
+SMUL_3 = """#SHARES 3
+#IN a b
+#RANDOMS r0 r1 r2
+#OUT d
+
+p0 = a0 * b0
+c0 = p0 + r0
+s0 = a0 * b1
+q0 = a1 * b0
+u0 = s0 + q0
+v0 = c0 + u0
+d0 = v0 + r2
+
+p1 = a1 * b1
+c1 = p1 + r1
+s1 = a1 * b2
+q1 = a2 * b1
+u1 = s1 + q1
+v1 = c1 + u1
+d1 = v1 + r0
+
+p2 = a2 * b2
+c2 = p2 + r2
+s2 = a2 * b0
+q2 = a0 * b2
+u2 = s2 + q2
+v2 = c2 + u2
+d2 = v2 + r1
+"""
+
+REFRESH_3 = """#SHARES 3
+#IN a
+#RANDOMS r0 r1 r2
+#OUT d
+
+t0 = a0 + r0
+d0 = t0 + r1
+t1 = a1 + r1
+d1 = t1 + r2
+t2 = a2 + r2
+d2 = t2 + r0
+"""
+
+
+#Random variables multiplied by shares, and appearing both linearly and in products
+NONLINEAR_2 = """#SHARES 2
+#IN a b
+#RANDOMS r0 r1
+#OUT d
+
+t0 = a0 * r1
+u0 = t0 + r0
+t1 = a1 * b1
+d0 = u0 + t1
+v = a1 + r1
+w = v * b0
+d1 = w + r1
+"""
+
+
+def compile_text(text):
+    (fd, name) = tempfile.mkstemp(suffix=".sage")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    try:
+        return compile_gadget(name, 0)
+    finally:
+        os.remove(name)
+
+
+#################### Unranking of the tuples ####################
+def test_combs_batches():
+    for (n, r, batch_size) in [(1, 1, 1), (7, 3, 1), (7, 3, 4), (12, 4, 50), (12, 4, 1000), (20, 2, 7)]:
+        a = np.arange(3, 3 + n, dtype=np.uint16)
+        expected = list(itertools.combinations(a.tolist(), r))
+        for reuse in [False, True]:
+            tuples = [tuple(t) for batch in combs_batches(a, r, batch_size, reuse = reuse) for t in batch.tolist()]
+            assert tuples == expected
+        #Batches given by their numbers, in any order
+        nb_b = -(-len(expected) // batch_size)
+        numbers = list(range(nb_b))[::-2]
+        batches = combs_batches(a, r, batch_size, numbers, reuse = True)
+        for (b, batch) in zip(numbers, batches):
+            assert batch.dtype == a.dtype
+            assert [tuple(t) for t in batch.tolist()] == expected[b*batch_size:(b+1)*batch_size]
+
+
+def test_extends_batches():
+    a = np.arange(10, dtype=np.uint16)
+    prev = np.asarray([t for t in itertools.combinations(a.tolist(), 3) if (sum(t) % 3 == 0)], dtype=np.uint16)
+    expected = [t + (x,) for t in map(tuple, prev.tolist()) for x in a.tolist() if x > t[-1]]
+    assert extends_count(a, prev) == len(expected)
+    for batch_size in [1, 5, 64, 10000]:
+        tuples = [tuple(t) for batch in extends_batches(a, prev, batch_size) for t in batch.tolist()]
+        assert tuples == expected
+
+
+#################### Subset index of the flawed tuples ####################
+def check_subset_index(rng, nb_bits, nb_flawed, nb_sums):
+    nb_words = (nb_bits + 63) // 64
+    def random_masks(nb, density):
+        bits = rng.random((nb, 64*nb_words)) < density
+        bits[:, nb_bits:] = False
+        return np.packbits(bits, axis=1, bitorder="little").view("<u8").astype(np.uint64)
+    flawed = random_masks(nb_flawed, 3.0 / nb_bits)
+    #A flawed tuple has at least one wire
+    flawed[:, 0] |= np.uint64(1)
+    sums = random_masks(nb_sums, 8.0 / nb_bits)
+    #A part of the sums include a flawed tuple
+    sums[::3] |= flawed[rng.integers(0, nb_flawed, len(sums[::3]))]
+    expected = np.asarray([np.any(np.all((s & flawed) == flawed, axis=1)) for s in sums])
+    assert np.array_equal(eliminate_from_smaller(subset_index(flawed), sums), expected)
+
+
+def test_subset_index():
+    rng = np.random.default_rng(1)
+    dense_max = elimination.SUBSET_INDEX_DENSE_MAX
+    try:
+        for dense in [dense_max, 0]:
+            elimination.SUBSET_INDEX_DENSE_MAX = dense
+            check_subset_index(rng, 20, 30, 2000)
+            check_subset_index(rng, 20, 2, 2000)
+            check_subset_index(rng, 100, 300, 2000)
+            check_subset_index(rng, 150, 3, 2000)
+    finally:
+        elimination.SUBSET_INDEX_DENSE_MAX = dense_max
+
+
+#################### Bitmaps of the expressions ####################
+### Secret and random dependencies of the polynomial poly (same format as anf_deps)
+def poly_deps(poly):
+    (nb_secrets, nb_shares, nb_randoms) = (anf.ANF["nb_secrets"], anf.ANF["nb_shares"], anf.ANF["nb_randoms"])
+    secret = [0] * nb_secrets
+    occurrences = [0] * nb_randoms
+    for m in poly:
+        for v in m:
+            if(v < nb_secrets*nb_shares):
+                secret[v // nb_shares] |= 1 << (v % nb_shares)
+            else:
+                occurrences[v - nb_secrets*nb_shares] += 1
+    random = [0 if (occ == 0) else (1 if ((occ == 1) and ((r + nb_secrets*nb_shares,) in poly)) else 2) for (r, occ) in enumerate(occurrences)]
+    return secret, random
+
+
+def test_anf():
+    for text in [ISW_3, SMUL_3, REFRESH_3, NONLINEAR_2]:
+        gadget = compile_text(text)
+        (indices, exps, secret_deps, random_deps, nb_occs, weights, exps_str) = gadget["int"]
+        names = anf.ANF["names"]
+        polys = [frozenset(anf.anf_parse(str(e), anf.ANF["var_ids"])) for e in exps_str]
+        
+        #Expressions, lengths and dependencies of the wires (computed from the polynomials when the gadget is read)
+        assert [anf.anf_poly_str(p, names) for p in polys] == exps_str.tolist()
+        assert np.array_equal(anf.anf_len(exps), [len(e) for e in exps_str])
+        (s, r) = anf.anf_deps(exps)
+        assert np.array_equal(s, secret_deps) and np.array_equal(r, random_deps)
+        
+        #Sums of two wires (and the sum of a wire with itself, the expression 0)
+        for (w1, w2) in [(0, 0)] + list(itertools.combinations(range(len(exps)), 2)):
+            poly = polys[w1] ^ polys[w2]
+            row = np.bitwise_xor(exps[w1], exps[w2])[None, :]
+            assert np.array_equal(row[0], anf.anf_encode(anf.anf_poly_str(poly, names)))
+            assert anf.anf_len(row)[0] == len(anf.anf_poly_str(poly, names))
+            assert anf.anf_len(row)[0] <= anf.anf_max_len()
+            (s, r) = anf.anf_deps(row)
+            assert (s[0].tolist(), r[0].tolist()) == poly_deps(poly)
+
+
+#################### Symmetries of the gadget ####################
+def init_symmetry(gadget):
+    (indices, exps, secret_deps, random_deps, nb_occs, weights, exps_str) = gadget["int"]
+    list_out = gadget["out"]
+    kinds = [0] * len(exps) + [k+1 for k in range(len(list_out)) for w in list_out[k][1]]
+    return symmetry.symmetry_init(np.concatenate([exps] + [out[1] for out in list_out]), np.concatenate([nb_occs] + [out[4] for out in list_out]), kinds)
+
+
+def test_symmetry_orbits():
+    for (text, order) in [(SMUL_3, 6), (REFRESH_3, 3)]:
+        gadget = compile_text(text)
+        indices = gadget["int"][0]
+        try:
+            assert init_symmetry(gadget) == order
+            group = symmetry.symmetry_group()
+            for r in [1, 2, 3]:
+                tuples = np.asarray(list(itertools.combinations(indices.tolist(), r)), dtype=np.int64)
+                (canonical, orbits) = symmetry.symmetry_reduce(tuples, group)
+                #Each orbit has one canonical tuple, the smallest image of its tuples, and the orbits cover all the tuples
+                smallest = set([min([tuple(sorted(perm[list(t)].tolist())) for perm in group]) for t in tuples.tolist()])
+                assert set(map(tuple, canonical.tolist())) == smallest
+                assert int(np.sum(orbits)) == len(tuples)
+        finally:
+            symmetry.SYMMETRY = None
+
+
+def verify_rp_rpc(gadget, coeff_max):
+    (indices, exps, secret_deps, random_deps, nb_occs, weights, exps_str) = gadget["int"]
+    nb_shares = gadget["nb_shares"]
+    coeffs_rp = verification_random_probing(indices, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, 0)
+    
+    (indices_o, exps_o, secret_deps_o, random_deps_o, nb_occs_o, weights_o, exps_str_o) = gadget["out"][0]
+    coeffs_rpc = verification_random_probing_comp(indices, indices_o + len(exps), np.append(weights, weights_o, 0), np.append(exps, exps_o, 0), 
+                                                  np.append(secret_deps, secret_deps_o, 0), np.append(random_deps, random_deps_o, 0), np.append(nb_occs, nb_occs_o),
+                                                  coeff_max, nb_shares, 1, 0)
+    return coeffs_rp, coeffs_rpc
+
+
+def test_symmetry_coefficients():
+    for (text, coeff_max) in [(SMUL_3, 3), (REFRESH_3, 4)]:
+        gadget = compile_text(text)
+        expected = verify_rp_rpc(gadget, coeff_max)
+        try:
+            init_symmetry(gadget)
+            assert verify_rp_rpc(gadget, coeff_max) == expected
+        finally:
+            symmetry.SYMMETRY = None
+
+
+if __name__ == "__main__":
+    for (name, test) in list(globals().items()):
+        if(name.startswith("test_")):
+            test()
+            print(name + " : OK")
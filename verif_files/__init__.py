@@ -0,0 +1,44 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+from .read_gadget import compute_input_file, write_exps_file, return_numpy_arrays
+from .anf import anf_init
+from .gadget_cache import compile_gadget, load_gadget
+from .verification_rules import BATCH_SIZE, apply_all_rules
+from .coefficients import update_coeff_c, find_pmax, get_fmin, get_fmax
+from .probing_func import verification_probing
+from .random_probing_func import verification_random_probing
+from .random_probing_comp_func import verification_random_probing_comp
+from .random_probing_exp1_func import verification_random_probing_exp_1
+from .random_probing_exp2_func import verification_random_probing_exp_2
+from .random_probing_exp_copy_func import verification_random_probing_exp_copy_12
+from .random_probing_exp_fused_func import verification_random_probing_exp_fused
+from .shard import shard_merge, shard_save
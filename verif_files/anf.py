@@ -0,0 +1,323 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import numpy as np
+
+##############################################################################
+#
+# Bitset representation of the algebraic normal form of the wires
+#
+#   The monomials appearing in the expressions of the gadget are numbered
+#   once (anf_init). An expression is then represented by a bitmap over
+#   these monomials (one row of uint8), the sum of two expressions is the
+#   XOR of their bitmaps, and every sum or simplification of expressions
+#   of the gadget only uses these monomials.
+#   A monomial is the tuple of its variables (sorted in the order of the
+#   polynomial ring : input shares, then random variables), the constant 1
+#   is the empty tuple.
+#
+##############################################################################
+
+##############################################################################
+#
+# Boolean polynomials of the gadget
+#
+#   A polynomial is the frozenset of its monomials, a monomial is the
+#   sorted tuple of the indices of its variables in the list names of the
+#   variables of the ring (same order as the Sage BooleanPolynomialRing 
+#   used by the previous versions of the tool), the constant 1 is ().
+#
+##############################################################################
+
+def anf_poly_var(index):
+    return frozenset([(index,)])
+
+def anf_poly_const(value):
+    return frozenset([()]) if (value % 2) else frozenset()
+
+def anf_poly_add(p, q):
+    return p ^ q
+
+def anf_poly_mul(p, q):
+    res = set()
+    for m1 in p:
+        for m2 in q:
+            res ^= set([tuple(sorted(set(m1 + m2)))])
+    return frozenset(res)
+
+def anf_poly_variables(p):
+    return sorted(set([v for m in p for v in m]))
+
+#################### String representation of p (monomials in decreasing lexicographic order, as printed by Sage) ####################
+def anf_poly_str(p, names):
+    if(len(p) == 0):
+        return "0"
+    monos = sorted(p, key=lambda m: m + (len(names),))
+    return " + ".join(["*".join([names[v] for v in m]) if (len(m) > 0) else "1" for m in monos])
+
+
+ANF = None
+
+#################### Popcount of a byte ####################
+ANF_POP = np.asarray([bin(v).count("1") for v in range(256)], dtype=np.int32)
+
+def anf_parse(exp, var_ids):
+    if(exp == "0"):
+        return []
+    monos = []
+    for elem in exp.split(" + "):
+        if(elem == "1"):
+            monos.append(())
+        else:
+            monos.append(tuple(sorted([var_ids[v] for v in elem.split("*")])))
+    return monos
+
+
+##############################################################################
+#
+# anf_init
+#	OUTPUT:
+#		- builds the table of monomials of the gadget from the expressions
+#           of list_int_var and list_out_var, along with the lookup tables
+#           (one per byte of the bitmaps) giving the length of the string
+#           representation, the secret dependencies and the occurrences of
+#           the random variables of an expression
+#
+##############################################################################
+
+def anf_init(list_int_var, list_out_var, nb_shares):
+    global ANF
+    nb_secrets = len(list_int_var[0][2])
+    nb_randoms = len(list_int_var[0][3])
+    
+    #Variables of the polynomial ring, numbered in the order of the ring (input shares, then random variables)
+    names = [None for v in range(nb_secrets*nb_shares + nb_randoms)]
+    for var in list_int_var:
+        if(var[0] != str(var[1])):
+            continue
+        if(1 in var[3]):
+            names[nb_secrets*nb_shares + var[3].index(1)] = var[0]
+        else:
+            sec = [k for k in range(nb_secrets) if var[2][k] != 0][0]
+            names[sec*nb_shares + var[2][sec].bit_length() - 1] = var[0]
+    var_ids = {names[v]: v for v in range(len(names))}
+    
+    #Monomials of all the expressions of the gadget
+    monos = []
+    mono_ids = dict()
+    for var in list_int_var + [var for out in list_out_var for var in out]:
+        for m in anf_parse(str(var[1]), var_ids):
+            if(m not in mono_ids):
+                mono_ids[m] = len(monos)
+                monos.append(m)
+    nb_bytes = max(1, (len(monos) + 7) // 8)
+    
+    #Lookup tables indexed by (byte position, byte value)
+    mono_len = np.zeros(8*nb_bytes, dtype=np.int32)
+    mono_secret = np.zeros((8*nb_bytes, nb_secrets), dtype=np.uint64)
+    mono_random = np.zeros((nb_randoms, 8*nb_bytes), dtype=np.uint8)
+    linear_random = np.zeros((nb_randoms, nb_bytes), dtype=np.uint8)
+    for (k, m) in enumerate(monos):
+        if(len(m) == 0):
+            mono_len[k] = 1
+        else:
+            mono_len[k] = sum([len(names[v]) for v in m]) + len(m) - 1
+        for v in m:
+            if(v < nb_secrets*nb_shares):
+                mono_secret[k, v // nb_shares] |= np.uint64(1 << (v % nb_shares))
+            else:
+                mono_random[v - nb_secrets*nb_shares, k] = 1
+        if((len(m) == 1) and (m[0] >= nb_secrets*nb_shares)):
+            linear_random[m[0] - nb_secrets*nb_shares, k // 8] = 1 << (k % 8)
+            
+    bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder="little").astype(bool)
+    len_table = np.zeros((nb_bytes, 256), dtype=np.int32)
+    secret_table = np.zeros((nb_bytes, 256, nb_secrets), dtype=np.uint64)
+    for j in range(nb_bytes):
+        len_table[j] = bits.astype(np.int32) @ mono_len[8*j:8*j+8]
+        for b in range(8):
+            secret_table[j][bits[:, b]] |= mono_secret[8*j+b]
+    
+    ANF = {"names": names, "var_ids": var_ids, "monos": monos, "mono_ids": mono_ids, "nb_bytes": nb_bytes,
+           "nb_secrets": nb_secrets, "nb_shares": nb_shares, "nb_randoms": nb_randoms,
+           "len_table": len_table, "secret_table": secret_table,
+           "random_masks": np.packbits(mono_random, axis=1, bitorder="little"), "linear_random": linear_random,
+           "rule_4": dict()}
+
+
+##############################################################################
+#
+# anf_tables / anf_load
+#	OUTPUT:
+#		- the monomials of the gadget and the lookup tables as numpy
+#           arrays (stored in the cache of compiled gadgets), and the
+#           initialization of the engine from these arrays
+#
+##############################################################################
+
+def anf_tables():
+    max_deg = max([1] + [len(m) for m in ANF["monos"]])
+    monos = np.full((len(ANF["monos"]), max_deg), -1, dtype=np.int32)
+    for (k, m) in enumerate(ANF["monos"]):
+        monos[k, :len(m)] = m
+    return {"names": np.asarray(ANF["names"]), "monos": monos,
+            "sizes": np.asarray([ANF["nb_secrets"], ANF["nb_shares"], ANF["nb_randoms"]], dtype=np.int64),
+            "len_table": ANF["len_table"], "secret_table": ANF["secret_table"],
+            "random_masks": ANF["random_masks"], "linear_random": ANF["linear_random"]}
+
+
+def anf_load(tables):
+    global ANF
+    names = [str(v) for v in tables["names"]]
+    monos = [tuple([int(v) for v in row if v >= 0]) for row in tables["monos"]]
+    (nb_secrets, nb_shares, nb_randoms) = [int(v) for v in tables["sizes"]]
+    ANF = {"names": names, "var_ids": {names[v]: v for v in range(len(names))},
+           "monos": monos, "mono_ids": {monos[k]: k for k in range(len(monos))}, "nb_bytes": tables["len_table"].shape[0],
+           "nb_secrets": nb_secrets, "nb_shares": nb_shares, "nb_randoms": nb_randoms,
+           "len_table": tables["len_table"], "secret_table": tables["secret_table"],
+           "random_masks": tables["random_masks"], "linear_random": tables["linear_random"],
+           "rule_4": dict()}
+
+
+#################### Bitmap of an expression given in str format ####################
+def anf_encode(exp):
+    row = np.zeros(8*ANF["nb_bytes"], dtype=np.uint8)
+    for m in anf_parse(exp, ANF["var_ids"]):
+        row[ANF["mono_ids"][m]] ^= 1
+    return np.packbits(row, bitorder="little")
+
+
+#################### Length of the string representation of the expressions rows (same as len(str(exp))) ####################
+def anf_len(rows):
+    positions = np.arange(ANF["nb_bytes"])
+    nb_monos = np.sum(ANF_POP[rows], axis=-1)
+    lengths = np.sum(ANF["len_table"][positions, rows], axis=-1) + 3*(nb_monos - 1)
+    lengths[nb_monos == 0] = 1
+    return lengths
+
+
+#################### Upper bound on the lengths of the expressions (length of the sum of all the monomials) ####################
+def anf_max_len():
+    return int(np.sum(ANF["len_table"][:, 255])) + 3*(8*ANF["nb_bytes"] - 1)
+
+
+##############################################################################
+#
+# anf_deps
+#	OUTPUT:
+#		- secret and random dependencies of the expressions rows : for each
+#           input, the bits of its shares that appear in the expression,
+#           and for each random variable, 0 if it does not appear in the
+#           expression, 1 if it only appears as a single linear term, and
+#           2 otherwise
+#
+##############################################################################
+
+def anf_deps(rows):
+    positions = np.arange(ANF["nb_bytes"])
+    secret_deps = np.bitwise_or.reduce(ANF["secret_table"][positions, rows], axis=1).astype(np.uint)
+    
+    occurrences = np.sum(ANF_POP[rows[:, None, :] & ANF["random_masks"][None, :, :]], axis=2)
+    linear = np.any(rows[:, None, :] & ANF["linear_random"][None, :, :], axis=2)
+    random_deps = np.where(occurrences == 0, 0, np.where((occurrences == 1) & linear, 1, 2)).astype(np.uint8)
+    return secret_deps, random_deps
+
+
+##############################################################################
+#
+# anf_rule_4
+#	OUTPUT:
+#		- the expressions rows where the random variable r is factorized :
+#           if exp = r*(x1 + ... + xk [+ 1]) + (y1 + ... + yl)*(x1 + ... + xk [+ 1]) + e,
+#           the monomials of (y1 + ... + yl)*(x1 + ... + xk [+ 1]) are removed
+#           (r + y1 + ... + yl is uniformly random and r only appears in it).
+#           The result for each (expression, r) is cached
+#
+##############################################################################
+
+def anf_rule_4_exp(row, r):
+    monos = ANF["monos"]
+    ra = ANF["nb_secrets"]*ANF["nb_shares"] + r
+    mono_ids = np.nonzero(np.unpackbits(row, bitorder="little"))[0]
+    
+    e = []
+    e_final = []
+    var = []
+    bo_one = False
+    for k in mono_ids:
+        m = monos[k]
+        if(len(m) >= 2):
+            if(m[0] == ra):
+                var.append(m[1]);   e_final.append(k)
+            elif(m[1] == ra):
+                var.append(m[0]);   e_final.append(k)
+            else:
+                e.append(k)
+        elif(m == (ra,)):
+            bo_one = True
+            e_final.append(k)
+        else:
+            e.append(k)
+    if(len(var) == 0):
+        return row
+    
+    #Variables y such that x*y appears in e for all the variables x multiplied by r (and y appears in e if r does)
+    def partners(v):
+        return set([monos[k][1] if (monos[k][0] == v) else monos[k][0] for k in e if ((len(monos[k]) >= 2) and (v in monos[k]))])
+    inter = partners(var[0])
+    for v in var[1:]:
+        inter &= partners(v)
+    if(bo_one):
+        inter &= set([monos[k][0] for k in e if (len(monos[k]) == 1)])
+    
+    for k in e:
+        m = monos[k]
+        if(len(m) >= 2):
+            if(((m[0] in var) and (m[1] in inter)) or ((m[1] in var) and (m[0] in inter))):
+                continue
+        elif(bo_one and (len(m) == 1) and (m[0] in inter)):
+            continue
+        e_final.append(k)
+        
+    bits = np.zeros(8*ANF["nb_bytes"], dtype=np.uint8)
+    bits[e_final] = 1
+    return np.packbits(bits, bitorder="little")
+
+
+def anf_rule_4(rows, r):
+    cache = ANF["rule_4"]
+    (uniques, inverse) = np.unique(rows, axis=0, return_inverse=True)
+    for (k, row) in enumerate(uniques):
+        key = (row.tobytes(), r)
+        if(key not in cache):
+            cache[key] = anf_rule_4_exp(row, r)
+        uniques[k] = cache[key]
+    return uniques[inverse.reshape(-1)]
\ No newline at end of file
@@ -0,0 +1,84 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import os
+import time
+import numpy as np
+
+##############################################################################
+#
+# checkpoint_load / checkpoint_save
+#	OUTPUT:
+#		- save the state of a verification loop (dictionary of numpy
+#           arrays) in the file CHECKPOINT_FILE + name (npz format), and
+#           load it back when the verification is resumed. Files are
+#           written to a temporary file and renamed, so that a killed run
+#           always leaves the last complete checkpoint.
+#           CHECKPOINT_PARAMS identifies the verification (gadget, property,
+#           parameters), a checkpoint of another verification is rejected
+#
+##############################################################################
+
+CHECKPOINT_FILE = None
+CHECKPOINT_RESUME = False
+CHECKPOINT_PARAMS = ""
+#Minimum number of seconds between two checkpoints of a same loop
+CHECKPOINT_PERIOD = 60
+
+def checkpoint_load(name):
+    if((CHECKPOINT_FILE is None) or (not CHECKPOINT_RESUME)):
+        return None
+    filename = CHECKPOINT_FILE + name
+    if(not os.path.exists(filename)):
+        return None
+        
+    with np.load(filename, allow_pickle=False) as data:
+        state = {k: data[k] for k in data.files}
+    if(str(state.pop("params")) != CHECKPOINT_PARAMS):
+        print("Checkpoint " + filename + " was not created by the same verification")
+        exit()
+    return state
+
+
+def checkpoint_save(name, state):
+    if(CHECKPOINT_FILE is None):
+        return
+    filename = CHECKPOINT_FILE + name
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, params=np.asarray(CHECKPOINT_PARAMS), **state)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def checkpoint_due(last_save):
+    return (CHECKPOINT_FILE is not None) and (time.time() - last_save >= CHECKPOINT_PERIOD)
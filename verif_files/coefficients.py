@@ -0,0 +1,226 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import math
+import numpy as np
+from math import comb as binomial
+
+############################################### Update Coefficients of function given failure tuples ###############################################
+### Polynomials prod((1+x)^occ - 1) of the already met signatures (sorted numbers of occurrences of the wires of a tuple)
+signature_polys = dict()
+
+def signature_poly(signature):
+    poly = signature_polys.get(signature)
+    if(poly is None):
+        #A failure tuple with these occurrences contributes to coefficient k by the number of ways to choose k leaking occurrences with at least one per wire
+        poly = [1]
+        for occ in signature:
+            factor = [0] + [int(binomial(occ, j)) for j in range(1, occ+1)]
+            new_poly = [0] * (len(poly) + occ)
+            for i in range(len(poly)):
+                if(poly[i] != 0):
+                    for j in range(1, occ+1):
+                        new_poly[i+j] += poly[i] * factor[j]
+            poly = new_poly
+        signature_polys[signature] = poly
+    return poly
+    
+### Exact type of the coefficients of a gadget with nb_occ occurrences of wires : the coefficient of p^k is at most binomial(nb_occ, k),
+### int64 is used when it cannot overflow, Python integers (object arrays) otherwise
+def coeff_dtype(nb_occ):
+    if(binomial(nb_occ, nb_occ//2) <= np.iinfo(np.int64).max):
+        return np.int64
+    return object
+
+def coeff_zeros(nb_occ):
+    return np.zeros(nb_occ+1, dtype=coeff_dtype(nb_occ))
+
+### Coefficients in the npz files (checkpoints, shards, cache of results) : int64 arrays, or strings for Python integers (no pickle)
+def coeff_store(coeffs):
+    coeffs = np.asarray(coeffs)
+    if(coeffs.dtype == object):
+        return coeffs.astype(str)
+    return coeffs
+
+def coeff_restore(coeffs):
+    if(coeffs.dtype.kind == "U"):
+        return np.vectorize(int, otypes=[object])(coeffs)
+    return coeffs
+    
+def update_coeff_c(coeff_c,list_tuples_flawed, weights = None):
+    nb_occs_tuples = np.asarray(list_tuples_flawed)
+    if(nb_occs_tuples.size == 0):
+        return
+        
+    #Failure tuples are grouped by signature, each signature contributes count times its polynomial (each tuple counts weights times)
+    #The sorted rows are grouped by a single integer key (the row written in base max+1) when it fits in 63 bits
+    nb_occs_tuples = np.sort(nb_occs_tuples, axis=1)
+    base = int(nb_occs_tuples.max()) + 1
+    if(base ** nb_occs_tuples.shape[1] < (1 << 63)):
+        keys = nb_occs_tuples.astype(np.int64) @ (base ** np.arange(nb_occs_tuples.shape[1]-1, -1, -1, dtype=np.int64))
+        keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        signatures = nb_occs_tuples[first]
+    else:
+        signatures, inverse = np.unique(nb_occs_tuples, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    if(weights is None):
+        counts = np.bincount(inverse, minlength=len(signatures))
+    else:
+        counts = np.zeros(len(signatures), dtype=np.int64)
+        np.add.at(counts, inverse, weights)
+    polys = np.zeros((len(signatures), len(coeff_c)), dtype=coeff_c.dtype)
+    for (n, signature) in enumerate(signatures.tolist()):
+        poly = signature_poly(tuple(signature))
+        polys[n, :len(poly)] = poly
+    coeff_c += counts.astype(coeff_c.dtype) @ polys
+            
+
+### Adds the polynomials of all the tuples of i wires among the wires with the numbers of occurrences nb_occs without enumerating them :
+### coefficient of y^i in prod(1 + y((1+x)^occ - 1))
+def update_coeff_c_all(coeff_c, nb_occs, i):
+    polys = np.zeros((i+1, len(coeff_c)), dtype=coeff_c.dtype)
+    polys[0, 0] = 1
+    for occ in nb_occs:
+        factor = signature_poly((int(occ),))
+        for j in range(i, 0, -1):
+            for (d, f) in enumerate(factor):
+                if(f != 0):
+                    polys[j, d:] += f * polys[j-1, :len(coeff_c)-d]
+    coeff_c += polys[i]
+
+
+############################################### compute pmax value given a function f such that (f(pmax) < pmax) ###############################################
+### Number of points of the grid on which the first crossing of f(p) and p is looked for
+PMAX_GRID = 1024
+
+def find_pmax(fs):
+    #g(p) = max(f(p)) - p, the functions are evaluated on numpy arrays of values of p
+    def g(p):
+        return np.max([f(p) for f in fs], axis=0) - p
+    
+    with np.errstate(over="ignore", invalid="ignore"):
+        if(max([f(1.0) for f in fs]) == 0):
+            return 0
+        
+        #Largest power of two p = 2^(-k) (0 <= k <= 41) such that f(p) < p
+        ps = 2.0 ** (-np.arange(42))
+        below = np.flatnonzero(g(ps) < 0)
+        if(len(below) == 0):
+            return 0
+        k = below[0]
+        if((k == 0) or (k == 41)):
+            return float(ps[k])
+            
+        #First crossing of f(p) and p on a grid of [2^(-k), 2^(-k+1)], refined up to the double precision by the Illinois (false position) method
+        grid = np.linspace(ps[k], ps[k-1], PMAX_GRID + 1)
+        vals = g(grid)
+        j = np.flatnonzero(vals >= 0)[0]
+        (lo, hi) = (float(grid[j-1]), float(grid[j]))
+        (g_lo, g_hi) = (float(vals[j-1]), float(vals[j]))
+        side = 0
+        while(hi - lo > 2**(-52) * hi):
+            mid = hi - g_hi * (hi - lo) / (g_hi - g_lo)
+            if(not(lo < mid < hi)):
+                mid = (lo + hi) / 2
+            g_mid = max([f(mid) for f in fs]) - mid
+            if(g_mid < 0):
+                (lo, g_lo) = (mid, g_mid)
+                if(side == -1):
+                    g_hi /= 2
+                side = -1
+            else:
+                (hi, g_hi) = (mid, g_mid)
+                if(side == 1):
+                    g_lo /= 2
+                side = 1
+    return lo
+
+
+############################################### compute functions fmin and fmax from given coefficients array ###############################################
+### Value at p of the polynomial of coefficients coeffs (Horner's method), p is a number or a numpy array
+def eval_poly(coeffs, p):
+    val = 0.0
+    for c in reversed(coeffs):
+        val = val*p + c
+    return val
+
+### Value at p of the polynomial with the non-zero coefficients of log2 log2_coeffs and of degrees degrees, the terms are summed 
+### relatively to the largest one (the value is infinite when it is larger than the largest double), p is a number or a numpy array
+def eval_poly_log2(log2_coeffs, degrees, p):
+    ps = np.asarray(p, dtype=float).reshape(-1)
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        terms = log2_coeffs[:, None] + np.where(degrees[:, None] == 0, 0.0, degrees[:, None] * np.log2(ps)[None, :])
+        top = np.max(terms, axis=0)
+        val = np.where(top == -np.inf, 0.0, np.exp2(top) * np.sum(np.exp2(terms - top), axis=0))
+    if(np.ndim(p) == 0):
+        return float(val[0])
+    return val
+
+### Function p -> value of the polynomial of the exact (integer) coefficients coeff_c : Horner's method when all the coefficients
+### are doubles, otherwise (gadgets with more than about 1030 occurrences of wires) the terms are summed from the log2 of the coefficients
+def poly_function(coeff_c):
+    coeffs = [int(c) for c in coeff_c]
+    if(max(coeffs, default=0) < 2**1023):
+        coeffs = [float(c) for c in coeffs]
+        return lambda p: eval_poly(coeffs, p)
+    degrees = np.asarray([i for (i, c) in enumerate(coeffs) if c != 0], dtype=float)
+    log2_coeffs = np.asarray([math.log2(c) for c in coeffs if c != 0])
+    return lambda p: eval_poly_log2(log2_coeffs, degrees, p)
+
+### Lower bound on f(p)
+def get_fmin(coeff_c):
+    return poly_function(coeff_c)
+    
+    
+### Upper bound on f(p)  by replacing all ci > cmax by binom(s)(i)
+def get_fmax(coeff_c, coeff_max):
+    for i in range(coeff_max+1, len(coeff_c)):
+        coeff_c[i] = binomial(len(coeff_c)-1, i)
+    return poly_function(coeff_c)
+
+
+### Square root of the function f
+def sqrt_function(f):
+    return lambda p: np.sqrt(f(p))
+
+
+### Square root of an exact coefficient, kept exact when it is a perfect square
+def sqrt_coeff(c):
+    c = int(c)
+    r = math.isqrt(c)
+    return r if (r * r == c) else math.sqrt(c)
+
+
+### Log2 of x, printed with 15 significant digits
+def log2_str(x):
+    if(x == 0):
+        return "-infinity"
+    return format(math.log2(x), "#.15g")
\ No newline at end of file
@@ -0,0 +1,120 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import itertools
+import numpy as np
+from math import comb as binomial
+
+############################################### eliminate non-incompressible tuples tool optimization ###############################################
+### Maximum number of wires for which the superset closure of the flawed tuples is stored as a bitmap (2^SUBSET_INDEX_DENSE_MAX bytes)
+SUBSET_INDEX_DENSE_MAX = 24
+
+### 1-D array with one key per row of the 2-D array a, to use the rows of a in sort, unique, intersect1d and searchsorted
+def row_keys(a):
+    if(a.shape[1] == 1):
+        return a[:, 0]
+    return np.ascontiguousarray(a).view(np.dtype((np.void, a.dtype.itemsize*a.shape[1])))[:, 0]
+
+
+### Bits 0 to nb_bits-1 of each mask (row of 64-bit words) as a 2-D array of 0/1
+def mask_bits(masks, nb_bits):
+    bytes_masks = np.ascontiguousarray(masks, dtype="<u8").view(np.uint8)
+    return np.unpackbits(bytes_masks, axis=1, bitorder="little")[:, :nb_bits]
+
+
+### Index answering "is there a flawed tuple included in the tuple" for whole batches of tuples
+def subset_index(list_int_prev_flawed):
+    index = dict()
+    index["size"] = len(list_int_prev_flawed)
+    if(len(list_int_prev_flawed) == 0):
+        return index
+        
+    flawed = list_int_prev_flawed[np.unique(row_keys(list_int_prev_flawed), return_index=True)[1]]
+    used = np.bitwise_or.reduce(flawed, axis=0)
+    w = np.nonzero(used)[0][-1]
+    nb_bits = 64*int(w) + int(used[w]).bit_length()
+    index["nb_bits"] = nb_bits
+    if(nb_bits <= SUBSET_INDEX_DENSE_MAX):
+        #closure[m] is True iff a flawed tuple is included in m (sum over subsets dynamic programming)
+        closure = np.zeros(1 << nb_bits, dtype=bool)
+        closure[flawed[:, 0].astype(np.int64)] = True
+        for b in range(nb_bits):
+            view = closure.reshape(-1, 2, 1 << b)
+            view[:, 1, :] |= view[:, 0, :]
+        index["closure"] = closure
+    else:
+        #Flawed tuples bucketed by hamming weight, each bucket is sorted by the positions of the bits of the tuples
+        bits = mask_bits(flawed, nb_bits)
+        hw = bits.sum(axis=1)
+        index["buckets"] = []
+        for k in np.unique(hw):
+            rows = np.nonzero(hw == k)[0]
+            positions = np.nonzero(bits[rows])[1].reshape(len(rows), k).astype(np.uint16)
+            index["buckets"].append((int(k), np.sort(row_keys(positions)), flawed[rows]))
+    return index
+
+
+def eliminate_from_smaller(index_prev_flawed, sums):
+    #Bits above the highest bit of the flawed tuples can not help including a flawed tuple
+    nb_bits = index_prev_flawed["nb_bits"]
+    if("closure" in index_prev_flawed):
+        return index_prev_flawed["closure"][(sums[:, 0] & np.uint64((1 << nb_bits) - 1)).astype(np.int64)]
+    
+    e = np.zeros(len(sums), dtype=bool)
+    bits = mask_bits(sums, nb_bits)
+    hw = bits.sum(axis=1)
+    for k in np.unique(hw):
+        rows = np.nonzero(hw == k)[0]
+        found = np.zeros(len(rows), dtype=bool)
+        #Each of these tuples has exactly k bits
+        positions = np.nonzero(bits[rows])[1].reshape(len(rows), k).astype(np.uint16)
+        for (s, bucket, bucket_masks) in index_prev_flawed["buckets"]:
+            if(s > k):
+                break
+            todo = np.nonzero(~found)[0]
+            if(len(todo) == 0):
+                break
+            if(binomial(k, s) <= len(bucket)):
+                #Looking up every subset of size s of the remaining tuples in the bucket
+                for c in itertools.combinations(range(k), s):
+                    sub = row_keys(positions[todo][:, c])
+                    pos = np.searchsorted(bucket, sub)
+                    pos[pos == len(bucket)] = 0
+                    found[todo] |= (bucket[pos] == sub)
+            else:
+                #Small bucket, direct comparison with each of its elements
+                q = sums[rows[todo]]
+                step = max(1, (1 << 22) // (len(todo)*sums.shape[1]))
+                for j in range(0, len(bucket_masks), step):
+                    b = bucket_masks[j:j+step]
+                    found[todo] |= np.any(np.all((q[:, None, :] & b) == b, axis=2), axis=1)
+        e[rows] = found
+    return e
\ No newline at end of file
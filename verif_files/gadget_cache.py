@@ -0,0 +1,146 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+from .read_gadget import compute_input_file, write_exps_file, return_numpy_arrays
+from .anf import anf_init, anf_tables, anf_load
+
+##############################################################################
+#
+# Cache of compiled gadgets
+#
+#   A compiled gadget is stored in the directory CACHE_DIR/HASH_vVERSION,
+#   where HASH is the SHA-256 of the content of the gadget file, with one
+#   .npy file per array, so that later runs load the arrays with a memory
+#   mapping instead of reading and compiling the gadget again.
+#
+##############################################################################
+
+### Version of the format of the compiled gadgets (to be increased when the compilation changes)
+GADGET_CACHE_VERSION = 1
+
+GADGET_ARRAYS = ["indices", "exps", "secret_deps", "random_deps", "nb_occs", "weights", "exps_str"]
+ANF_ARRAYS = ["names", "monos", "sizes", "len_table", "secret_table", "random_masks", "linear_random"]
+
+
+##############################################################################
+#
+# compile_gadget
+#	OUTPUT:
+#		- the gadget of the file circuit_file compiled in a dictionary :
+#           order, nb_shares and complexity of the gadget, the numpy arrays
+#           (indices, exps, secret_deps, random_deps, nb_occs, weights,
+#           exps_str) of its intermediate variables ("int") and of the 
+#           shares of each of its outputs ("out"), and the tables of the 
+#           bitmaps of the expressions ("anf")
+#
+##############################################################################
+
+def compile_gadget(circuit_file, verbosity, dump = False):
+    (order,nb_shares,list_int_var,list_out_var, complexity) = compute_input_file(circuit_file, verbosity, dump)
+    if(dump):
+        write_exps_file(list_int_var, list_out_var)
+    anf_init(list_int_var, list_out_var, nb_shares)
+    
+    #Number of 64-bit words needed to represent a set of wires (intermediate and output variables)
+    nb_words = (len(list_int_var) + sum([len(out) for out in list_out_var]) + 63) // 64
+    
+    return {"order": order, "nb_shares": nb_shares, "complexity": complexity,
+            "int": return_numpy_arrays(list_int_var, nb_words),
+            "out": [return_numpy_arrays(out, nb_words) for out in list_out_var],
+            "anf": anf_tables()}
+
+
+def gadget_cache_save(dirname, gadget):
+    parent = os.path.dirname(os.path.abspath(dirname))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent)
+    arrays = dict(zip(["int_" + name for name in GADGET_ARRAYS], gadget["int"]))
+    for (o, out) in enumerate(gadget["out"]):
+        arrays.update(zip(["out" + str(o) + "_" + name for name in GADGET_ARRAYS], out))
+    arrays.update([("anf_" + name, gadget["anf"][name]) for name in ANF_ARRAYS])
+    for (name, a) in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), a, allow_pickle=False)
+    with open(os.path.join(tmp, "gadget.json"), "w") as f:
+        json.dump({"order": gadget["order"], "nb_shares": gadget["nb_shares"], "complexity": list(gadget["complexity"]), "nb_outs": len(gadget["out"])}, f)
+    #The directory appears at once, and is kept if another run created it in the meantime
+    try:
+        os.rename(tmp, dirname)
+    except OSError:
+        shutil.rmtree(tmp)
+
+
+def gadget_cache_load(dirname):
+    if(not os.path.isfile(os.path.join(dirname, "gadget.json"))):
+        return None
+    with open(os.path.join(dirname, "gadget.json")) as f:
+        meta = json.load(f)
+    def arrays(prefix, names):
+        return tuple([np.load(os.path.join(dirname, prefix + name + ".npy"), mmap_mode="r", allow_pickle=False) for name in names])
+    return {"order": meta["order"], "nb_shares": meta["nb_shares"], "complexity": tuple(meta["complexity"]),
+            "int": arrays("int_", GADGET_ARRAYS),
+            "out": [arrays("out" + str(o) + "_", GADGET_ARRAYS) for o in range(meta["nb_outs"])],
+            "anf": dict(zip(ANF_ARRAYS, arrays("anf_", ANF_ARRAYS)))}
+
+
+##############################################################################
+#
+# load_gadget
+#	OUTPUT:
+#		- the compiled gadget of the file circuit_file (see compile_gadget),
+#           loaded from the directory cache_dir if it was already compiled
+#           (gadget_hash is the SHA-256 of the content of the file), and
+#           added to it otherwise. The gadget is always compiled if cache_dir
+#           is None or with dump
+#
+##############################################################################
+
+def load_gadget(circuit_file, gadget_hash, cache_dir, verbosity, dump = False):
+    if((cache_dir is None) or dump):
+        return compile_gadget(circuit_file, verbosity, dump)
+    
+    dirname = os.path.join(cache_dir, gadget_hash + "_v" + str(GADGET_CACHE_VERSION))
+    gadget = gadget_cache_load(dirname)
+    if(gadget is not None):
+        anf_load(gadget["anf"])
+        if(verbosity > 0):
+            print("Compiled gadget loaded from " + dirname + "\n")
+        return gadget
+        
+    gadget = compile_gadget(circuit_file, verbosity)
+    gadget_cache_save(dirname, gadget)
+    if(verbosity > 0):
+        print("Compiled gadget saved in " + dirname + "\n")
+    return gadget
\ No newline at end of file
@@ -0,0 +1,113 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import multiprocessing
+import traceback
+
+##############################################################################
+#
+# pool_map
+#	OUTPUT:
+#		- yields func(*shared_args, *task) for each task of tasks, computed
+#           by jobs worker processes. The workers are forked, so that the
+#           (possibly large) shared_args are inherited instead of being sent
+#           through the queues, only the tasks and the results are pickled.
+#           With ordered = True, results are yielded in the order of tasks,
+#           otherwise (task_number, result) couples are yielded as soon as
+#           they are available
+#
+##############################################################################
+
+POOL_FUNC = None
+POOL_ARGS = ()
+
+def pool_worker(task_queue, result_queue):
+    for (n, task) in iter(task_queue.get, None):
+        try:
+            result_queue.put((n, True, POOL_FUNC(*(POOL_ARGS + tuple(task)))))
+        except BaseException:
+            result_queue.put((n, False, traceback.format_exc()))
+
+
+def pool_map(func, shared_args, tasks, jobs, ordered = True):
+    global POOL_FUNC, POOL_ARGS
+    POOL_FUNC = func
+    POOL_ARGS = tuple(shared_args)
+
+    ctx = multiprocessing.get_context("fork")
+    task_queue = ctx.Queue()
+    result_queue = ctx.Queue()
+    workers = [ctx.Process(target=pool_worker, args=(task_queue, result_queue)) for j in range(jobs)]
+    for w in workers:
+        w.daemon = True
+        w.start()
+
+    #At most `window` tasks are pending at any time, which bounds the memory used by the results waiting for an earlier task
+    window = 4*jobs
+    tasks = iter(tasks)
+    sent = 0
+    received = 0
+    done = dict()
+    next_out = 0
+    try:
+        while True:
+            while(sent - next_out < window):
+                task = next(tasks, None)
+                if(task is None):
+                    break
+                task_queue.put((sent, task))
+                sent += 1
+
+            if(received == sent):
+                break
+
+            n, ok, res = result_queue.get()
+            received += 1
+            if(not ok):
+                raise RuntimeError("Worker process failed :\n" + res)
+
+            if(ordered):
+                done[n] = res
+                while(next_out in done):
+                    yield done.pop(next_out)
+                    next_out += 1
+            else:
+                next_out += 1
+                yield (n, res)
+    finally:
+        #When the results are not all consumed (early exit), the tasks still in the queue are dropped instead of blocking the exit of the process
+        task_queue.cancel_join_thread()
+        for w in workers:
+            w.terminate()
+        for w in workers:
+            w.join()
+        POOL_FUNC = None
+        POOL_ARGS = ()
@@ -31,8 +31,9 @@
 
 import numpy as np
 import time
-import math
-import itertools
+from math import comb as binomial
+from .verification_rules import BATCH_SIZE, apply_all_rules, combs_batches
+from .parallel import pool_map
 
 ##############################################################################
 #
@@ -42,41 +43,47 @@ import itertools
 #
 ##############################################################################
 
-####################### Batching Version #######################
-def verification_probing(indices, weights, exps,  exps_str, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity):
+####################### Batch of tuples of size t #######################
+def probing_batch(weights, exps, secret_deps, random_deps, nb_occs, val_max, t, verbosity, list_tuples):
+    nb_occs_tuple = nb_occs[list_tuples]
+    sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
+
+    #####################################  Apply Probing Rules (1, 2, 3 and 4)  #####################################
+    list_tuples, sums, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples, secret_deps, random_deps, exps, nb_occs_tuple, sums, t, val_max, t = None, verbosity=verbosity)
 
-    nb_wires = len(exps)
+    #Failure tuples of the batch
+    return l
+
+
+####################### Batching Version #######################
+def verification_probing(indices, weights, exps,  exps_str, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, jobs = 1):
 
     val_max = (1<<nb_shares) - 1
     
-    list_tuples_orig = itertools.combinations(indices, t)
-    
     batch_size = BATCH_SIZE
-        
-    list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
+    
+    batches = combs_batches(indices, t, batch_size, reuse = (jobs == 1))
     nb_b = (binomial(len(indices), t)//batch_size)+1
-    b = 0
     #####################################  BATCHING  #####################################
-    while(len(list_tuples) != 0):            
-        b += 1
-        if(verbosity >= 1):
-            print("----------- Batch " + str(b) + "/" + str(nb_b) + " -----------")
+    #With jobs workers, the batches are verified in any order and the verification stops at the first failure tuples found by any worker
+    shared_args = (weights, exps, secret_deps, random_deps, nb_occs, val_max, t, verbosity)
+    if(jobs > 1):
+        results = pool_map(probing_batch, shared_args, ((list_tuples,) for list_tuples in batches), jobs, ordered = False)
+    else:
+        results = enumerate(probing_batch(*(shared_args + (list_tuples,))) for list_tuples in batches)
 
-        nb_occs_tuple = nb_occs[list_tuples]
-        sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
-    
-        #####################################  Apply Probing Rules (1, 2, 3 and 4)  #####################################
-        list_tuples, sums, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples, secret_deps, random_deps, exps, exps_str, nb_occs_tuple, sums, t, val_max, t = None, verbosity=verbosity)
-    
-        secret_deps = secret_deps[:nb_wires, :]
+    for (b, l) in results:
+        if(verbosity >= 1):
+            print("----------- Batch " + str(b+1) + "/" + str(nb_b) + " -----------")
 
-        if(len(list_tuples) > 0):
+        if(len(l) > 0):
+            #The workers still verifying other batches are stopped
+            if(jobs > 1):
+                results.close()
             print("Gadget is NOT " + str(t) + "-Probing Secure !\n")
             print("Failure Tuples :")
             for elem in l:
                 print(str(exps_str[elem]))
             return
         
-        list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-        
     print("Gadget is " + str(t) + "-Probing Secure !\n")
\ No newline at end of file
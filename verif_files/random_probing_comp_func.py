@@ -29,12 +29,162 @@
 #
 ###############################################################################
 
+import numpy as np
+import time
+from math import comb as binomial
+from .verification_rules import BATCH_SIZE, apply_all_rules, combs, combs_batches
+from .coefficients import coeff_zeros, coeff_store, coeff_restore, update_coeff_c
+from .elimination import subset_index, eliminate_from_smaller
+from .checkpoint import checkpoint_due, checkpoint_load, checkpoint_save
+from .result_cache import result_cache_load, result_cache_save
+from .parallel import pool_map
+from . import shard
+from .shard import shard_batches, shard_merged, shard_record
+from .symmetry import symmetry_out_combs, symmetry_group, symmetry_reduce, symmetry_orbits
+
 
 # **************************************************
 #	Verification of random probing Composability
 # **************************************************
 
-def verification_random_probing_comp(indices, indices_o, weights, exps,  exps_str, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, copy = False, t_output = None):
+####################### Output combination list_out #######################
+def random_probing_comp_out(indices, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, t, verbosity, o, list_out):
+    nb_wires = len(exps)
+    nb_occ = int(np.sum(nb_occs))
+    batch_size = BATCH_SIZE
+    total_time = 0
+    total_time3 = 0
+
+    list_int_prev_flawed = np.zeros((0, weights.shape[1]), dtype=np.uint64)
+    
+    #Creating temporary Coefficients function for I1, I2, I1_and_I2, I1_or_I2 (we take maximum amongst all of them for max coefficient functions)
+    coeff_c_I1_or_I2 = coeff_zeros(nb_occ)
+
+    #####################################  Resuming from the last checkpoint or from the cached levels  #####################################
+    checkpoint_name = ".rpc.out" + "-".join([str(o) for o in list_out])
+    i_start = 1
+    state = checkpoint_load(checkpoint_name)
+    if(state is None):
+        state = result_cache_load(checkpoint_name, coeff_max)
+    if(state is not None):
+        coeff_c_I1_or_I2[:] = coeff_restore(state["coeff_c_I1_or_I2"])
+        list_int_prev_flawed = state["list_int_prev_flawed"]
+        i_start = int(state["i"])
+    index_prev_flawed = subset_index(list_int_prev_flawed)
+    last_save = time.time()
+
+    #With symmetries, only the canonical tuples are verified, weighted by the sizes of their orbits (the automorphisms must leave list_out unchanged)
+    group = symmetry_group(list_out)
+
+    #Secret dependencies of list_out, the secret dependencies of a tuple with list_out are the ones of its input part and of list_out
+    secret_deps_out = np.bitwise_or.reduce(secret_deps[list_out, :], axis=0, dtype=np.uint)
+
+    #####################################  Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+    for i in range(i_start, coeff_max+1):
+        if(verbosity == 2):
+            print ("\n\nTransform tuples in list elements..")
+            
+        list_int_prev_flawed_tmp = np.zeros((0, weights.shape[1]), dtype=np.uint64)
+        b_start = 0
+        if((state is not None) and (i == i_start)):
+            list_int_prev_flawed_tmp = state["list_int_prev_flawed_tmp"]
+            b_start = int(state["b"])
+        nb_b = -(-int(binomial(len(indices), i)) // batch_size)
+        numbers = shard_batches(nb_b, b_start, o + i)
+        batches = combs_batches(indices, i, batch_size, numbers, reuse = True)
+        #Tuples with list_out, written once in the last columns
+        buffer = np.empty((batch_size, i + len(list_out)), dtype=np.result_type(indices, list_out))
+        buffer[:, i:] = list_out
+        
+        if(verbosity >= 1):
+            print ('\n   ***   '+str(i)+"-uples : " + str(binomial(len(indices), i)))
+            
+        #####################################  BATCHING  #####################################
+        for (b, list_tuples) in zip(numbers, batches):
+            if(checkpoint_due(last_save)):
+                checkpoint = {"i": i, "b": b, "coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed_tmp}
+                checkpoint_save(checkpoint_name, checkpoint)
+                last_save = time.time()
+            if(verbosity >= 1):
+                print("----------- Batch " + str(b+1) + "/" + str(nb_b) + " -----------")
+                
+            list_tuples, orbits = symmetry_reduce(list_tuples, group)
+            
+            ########## Compute binary value for each tuple in list_tuples
+            sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
+             
+            ########## Adding output comb of shares to each tuple
+            buffer[:len(list_tuples), :i] = list_tuples
+            list_tuples = buffer[:len(list_tuples)]
+
+            #####################################  Eliminating Non-Incompressible Tuples  #####################################
+            if(list_int_prev_flawed.size != 0):
+                start = time.time()
+                e =  eliminate_from_smaller(index_prev_flawed, sums)
+                end = time.time()
+                if(verbosity == 2):
+                    print("Time to eliminate = " + str(end-start)+ " seconds")
+                    
+                list_tuples_flawed = list_tuples[e, :]
+                nb_occs_tuple_flawed = nb_occs[list_tuples_flawed]
+                nb_occs_tuple_flawed = nb_occs_tuple_flawed[:, :i]
+                if(verbosity == 2):
+                    print( "Eliminated : " + str(len(list_tuples_flawed)) + " tuples")
+                    
+                
+                update_coeff_c(coeff_c_I1_or_I2, nb_occs_tuple_flawed, orbits[e])
+
+                list_tuples = list_tuples[~e, :]
+                sums = sums[~e]
+                orbits = orbits[~e]
+                del list_tuples_flawed;  del nb_occs_tuple_flawed;  del e  
+    
+                if(len(list_tuples) == 0):
+                    del sums;  del list_tuples
+                    continue
+            #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
+            
+            nb_occs_tuple = nb_occs[list_tuples]
+            nb_occs_tuple = nb_occs_tuple[:, :i]
+            
+            #####################################  Apply Probing Rules (1, 2 and 3) !!  #####################################
+            list_tuples, sums, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples, secret_deps, random_deps, exps, nb_occs_tuple, sums, i+1, None, t=t, verbosity = verbosity, secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples[:, :i], :], axis=1, dtype=np.uint) | secret_deps_out)
+            #####################################  Done Apply Probing Rules (1, 2 and 3) !!  #####################################
+            total_time += time4
+            total_time3 += time3
+            #####################################  Updating Coefficients  #####################################
+            if(verbosity == 2):
+                print("Updating c coefficients...")
+
+            
+            if(len(list_tuples) > 0):
+                #list_int_prev_flawed_tmp = np.append(list_int_prev_flawed_tmp, sums)  
+                
+                orbits = symmetry_orbits(l[:, :i], group)
+                update_coeff_c(coeff_c_I1_or_I2, nb_occs_tuple, orbits)
+            
+            #####################################  Done Updating Coefficients  #####################################
+            del nb_occs_tuple
+            del sums
+            secret_deps = secret_deps[:nb_wires, :]
+            
+        #####################################  Done BATCHING  #####################################
+        
+        list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp, 0)  
+        index_prev_flawed = subset_index(list_int_prev_flawed)
+        result_cache_save(checkpoint_name, i, {"coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed})
+        if(verbosity >= 1):
+                print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2.tolist()))
+                
+    #####################################  Done Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+    if(i_start <= coeff_max):
+        checkpoint = {"i": coeff_max+1, "b": 0, "coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed[:0]}
+        checkpoint_save(checkpoint_name, checkpoint)
+    return coeff_c_I1_or_I2
+
+
+####################### Batching Version #######################
+def verification_random_probing_comp(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, copy = False, t_output = None, jobs = 1):
     if(t >= nb_shares):
         print("t (= " + str(t) +  ") >= nb_shares (= " + str(nb_shares) + ")")
         exit()
@@ -45,15 +195,9 @@ def verification_random_probing_comp(indices, indices_o, weights, exps,  exps_st
         print("Not applicable yet, not 1 or 2 inputs\n")
         exit()
 
-    nb_wires = len(exps)
-    upd = 0
-    batch_size = BATCH_SIZE
-    total_time = 0
-    total_time3 = 0
-    
     #Creating maximum Coefficients function for I1, I2, I1_and_I2, I1_or_I2
     nb_occ = int(np.sum(nb_occs))
-    coeff_c_max_I1_or_I2 = np.zeros(nb_occ+1).tolist()
+    coeff_c_max_I1_or_I2 = coeff_zeros(nb_occ)
         
     #####################################  Iterating Over all combinations of output shares of size t  #####################################
     if(t_output):
@@ -72,108 +216,35 @@ def verification_random_probing_comp(indices, indices_o, weights, exps,  exps_st
     else:
         out_combs = combs(indices_o, tp)
 
-    for list_out in out_combs:
-    
-        list_int_prev_flawed = np.asarray([], dtype="int64")
-        
-        #Creating temporary Coefficients function for I1, I2, I1_and_I2, I1_or_I2 (we take maximum amongst all of them for max coefficient functions)
-        coeff_c_I1_or_I2 = np.zeros(nb_occ+1).tolist()
+    #With symmetries, the combinations mapped to each other by an automorphism have the same coefficients, only one of each class is verified
+    out_combs = symmetry_out_combs(out_combs)
 
-        #####################################  Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
-        for i in range(1, coeff_max+1):
-            if(verbosity == 2):
-                print ("\n\nTransform tuples in list elements..")
-                
-            list_tuples_orig = itertools.combinations(indices, i)
-            
-            if(verbosity >= 1):
-                print ('\n   ***   '+str(i)+"-uples : " + str(binomial(len(indices), i)))
-                
-            list_int_prev_flawed_tmp = np.asarray([], dtype="int64")
-            list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-            nb_b = (binomial(len(indices), i)//batch_size)+1
-            b = 0
-            #####################################  BATCHING  #####################################
-            while(len(list_tuples) != 0):            
-                b += 1
-                if(verbosity >= 1):
-                    print("----------- Batch " + str(b) + "/" + str(nb_b) + " -----------")
-                    
-                ########## Compute binary value for each tuple in list_tuples
-                sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
-                 
-                ########## Adding output comb of shares to each tuple
-                list_tuples = np.hstack((list_tuples, np.repeat([list_out], len(list_tuples), axis=0)))
-    
-                #####################################  Eliminating Non-Incompressible Tuples  #####################################
-                if(list_int_prev_flawed.size != 0):
-                    start = time.time()
-                    e =  eliminate_from_smaller(list_int_prev_flawed, sums, nb_wires)
-                    end = time.time()
-                    if(verbosity == 2):
-                        print("Time to eliminate = " + str(end-start)+ " seconds")
-                        
-                    list_tuples_flawed = list_tuples[e, :]
-                    nb_occs_tuple_flawed = nb_occs[list_tuples_flawed]
-                    nb_occs_tuple_flawed = nb_occs_tuple_flawed[:, :i]
-                    if(verbosity == 2):
-                        print( "Eliminated : " + str(len(list_tuples_flawed)) + " tuples")
-                        
-                    
-                    update_coeff_c(coeff_c_I1_or_I2, nb_occs_tuple_flawed.tolist())
+    #Each output combination is verified independently, the results are computed by jobs workers and max-merged in the order of out_combs
+    #With shards, the partial coefficients of each output combination are kept, they are summed over the shards before being max-merged
+    merged = shard_merged("rpc")
+    if(merged is not None):
+        results = merged
+    else:
+        shared_args = (indices, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, t, verbosity)
+        if(jobs > 1):
+            results = pool_map(random_probing_comp_out, shared_args, enumerate(out_combs), jobs)
+        else:
+            results = (random_probing_comp_out(*(shared_args + (o, list_out))) for (o, list_out) in enumerate(out_combs))
+        if(shard.SHARD_OUTPUT is not None):
+            results = list(results)
+            shard_record("rpc", results)
+
+    for coeff_c_I1_or_I2 in results:
 
-                    list_tuples = list_tuples[~e, :]
-                    sums = sums[~e]
-                    del list_tuples_flawed;  del nb_occs_tuple_flawed;  del e  
-        
-                    if(len(list_tuples) == 0):
-                        del sums;  del list_tuples
-                        list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-                        continue
-                #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
-                
-                nb_occs_tuple = nb_occs[list_tuples]
-                nb_occs_tuple = nb_occs_tuple[:, :i]
-                
-                #####################################  Apply Probing Rules (1, 2 and 3) !!  #####################################
-                list_tuples, sums, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples, secret_deps, random_deps, exps, exps_str, nb_occs_tuple, sums, i+1, None, t=t, verbosity = verbosity)
-                #####################################  Done Apply Probing Rules (1, 2 and 3) !!  #####################################
-                total_time += time4
-                total_time3 += time3
-                #####################################  Updating Coefficients  #####################################
-                if(verbosity == 2):
-                    print("Updating c coefficients...")
-    
-                
-                if(len(list_tuples) > 0):
-                    #list_int_prev_flawed_tmp = np.append(list_int_prev_flawed_tmp, sums)  
-                    
-                    update_coeff_c(coeff_c_I1_or_I2, nb_occs_tuple.tolist())
-                
-                #####################################  Done Updating Coefficients  #####################################
-                del nb_occs_tuple
-                del sums
-                secret_deps = secret_deps[:nb_wires, :]
-                list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-                
-            #####################################  Done BATCHING  #####################################
-            
-            list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp)  
-            if(verbosity >= 1):
-                    print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2))
-                    
-        #####################################  Done Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
-        
         ########## Updating coeff_c_max(s) ##########
         if(verbosity == 2):
-            print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2))
+            print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2.tolist()))
                 
-        for c in range(nb_occ+1):
-            coeff_c_max_I1_or_I2[c] = max(coeff_c_max_I1_or_I2[c],coeff_c_I1_or_I2[c])
+        coeff_c_max_I1_or_I2 = np.maximum(coeff_c_max_I1_or_I2, coeff_c_I1_or_I2)
                 
         ########## Done Updating coeff_c_max(s) ##########
                 
     #####################################  Done Iterating Over all combinations of output shares of size t  #####################################
     if(verbosity == 2):
-        print("MAX coefficients c (|I1|>t) : " + str(coeff_c_max_I1_or_I2))
-    return coeff_c_max_I1_or_I2
+        print("MAX coefficients c (|I1|>t) : " + str(coeff_c_max_I1_or_I2.tolist()))
+    return coeff_c_max_I1_or_I2.tolist()
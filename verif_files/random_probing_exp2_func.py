@@ -30,7 +30,16 @@
 ###############################################################################
 
 import numpy as np
-import itertools
+import time
+from math import comb as binomial
+from .verification_rules import BATCH_SIZE, apply_all_rules, classify_rule_1, combs, combs_batches
+from .coefficients import coeff_zeros, coeff_store, coeff_restore, update_coeff_c
+from .elimination import row_keys, subset_index, eliminate_from_smaller
+from .checkpoint import checkpoint_due, checkpoint_load, checkpoint_save
+from .result_cache import result_cache_load, result_cache_save
+from . import shard
+from .shard import shard_batches, shard_merged, shard_record
+from .symmetry import symmetry_group, symmetry_reduce
 
 ##############################################################################
 #
@@ -41,7 +50,7 @@ import itertools
 ##############################################################################
 
 ####################### Batching Version #######################
-def verification_random_probing_exp_2(indices, indices_o, weights, exps,  exps_str, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, copy = False):
+def verification_random_probing_exp_2(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, copy = False, survivors = False):
     if(t >= nb_shares):
         print("t (= " + str(t) +  ") >= nb_shares (= " + str(nb_shares) + ")")
         exit()
@@ -54,11 +63,11 @@ def verification_random_probing_exp_2(indices, indices_o, weights, exps,  exps_s
     batch_size = BATCH_SIZE
 
     nb_occ = int(np.sum(nb_occs))
-    coeff_c_I1_or_I2 = np.zeros(nb_occ+1).tolist()
+    coeff_c_I1_or_I2 = coeff_zeros(nb_occ)
     if(nb_inputs > 1):
-        coeff_c_I1 = np.zeros(nb_occ+1).tolist();  coeff_c_I2 = np.zeros(nb_occ+1).tolist();  coeff_c_I1_and_I2 = np.zeros(nb_occ+1).tolist()      
+        coeff_c_I1 = coeff_zeros(nb_occ);  coeff_c_I2 = coeff_zeros(nb_occ);  coeff_c_I1_and_I2 = coeff_zeros(nb_occ)      
         
-    list_int_prev_flawed = np.asarray([], dtype="int64")
+    list_int_prev_flawed = np.zeros((0, weights.shape[1]), dtype=np.uint64)
     upd = 0
     if(copy):
         out_combs = []
@@ -71,98 +80,145 @@ def verification_random_probing_exp_2(indices, indices_o, weights, exps,  exps_s
         del out_combs1; del out_combs2
     else:
         out_combs = combs(indices_o, nb_shares - 1)
+    #Even with symmetries, all the combinations are needed: a tuple is flawed when it is flawed with every combination, and the automorphism mapping a combination to another one also changes the tuple
+    
+    #Secret dependencies of each combination, the secret dependencies of a tuple with a combination are the ones of its input part and of the combination
+    secret_deps_outs = np.bitwise_or.reduce(secret_deps[out_combs, :], axis=1, dtype=np.uint)
+
+    #####################################  Merging the partial coefficients of the shards  #####################################
+    merged = shard_merged("exp2")
+    if(merged is not None):
+        if(nb_inputs > 1):
+            return tuple(merged.tolist())
+        else:
+            return merged[0].tolist()
+
+    #####################################  Resuming from the last checkpoint or from the cached levels  #####################################
+    i_start = 1
+    state = checkpoint_load(".exp2")
+    if(state is None):
+        state = result_cache_load(".exp2", coeff_max)
+    if(state is not None):
+        coeff_c_I1_or_I2[:] = coeff_restore(state["coeff_c_I1_or_I2"])
+        if(nb_inputs > 1):
+            coeff_c_I1[:] = coeff_restore(state["coeff_c_I1"]);  coeff_c_I2[:] = coeff_restore(state["coeff_c_I2"]);  coeff_c_I1_and_I2[:] = coeff_restore(state["coeff_c_I1_and_I2"])
+        list_int_prev_flawed = state["list_int_prev_flawed"]
+        i_start = int(state["i"])
+    index_prev_flawed = subset_index(list_int_prev_flawed)
+    last_save = time.time()
+
+    #With symmetries, only the canonical tuples are verified, weighted by the sizes of their orbits (the automorphisms permute the output combinations, for I1 and I2 they must not exchange the inputs)
+    group = symmetry_group(swaps = False)
 
     #####################################  Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
-    for i in range(1, coeff_max+1):
+    for i in range(i_start, coeff_max+1):
         if(verbosity == 2):
             print ("\n\nTransform tuples in list elements..")
             
-        list_tuples_orig = itertools.combinations(indices, i)
+        list_int_prev_flawed_tmp = np.zeros((0, weights.shape[1]), dtype=np.uint64)
+        b_start = 0
+        if((state is not None) and (i == i_start)):
+            list_int_prev_flawed_tmp = state["list_int_prev_flawed_tmp"]
+            b_start = int(state["b"])
+        nb_b = -(-int(binomial(len(indices), i)) // batch_size)
+        numbers = shard_batches(nb_b, b_start, i)
+        batches = combs_batches(indices, i, batch_size, numbers, reuse = True)
+        #Tuples with the output combinations, the output shares are written in the last columns
+        buffer = np.empty((batch_size, i + out_combs.shape[1]), dtype=np.result_type(indices, out_combs))
         
         if(verbosity >= 1):
             print ('\n   ***   '+str(i)+"-uples : " + str(binomial(len(indices), i)))
             
-        list_int_prev_flawed_tmp = np.asarray([], dtype="int64")
-        list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-        nb_b = (binomial(len(indices), i)//batch_size)+1
-        b = 0
         #####################################  BATCHING  #####################################
-        while(len(list_tuples) != 0):      
-            b += 1
+        for (b, list_tuples) in zip(numbers, batches):
+            if(checkpoint_due(last_save)):
+                checkpoint = {"i": i, "b": b, "coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed_tmp}
+                if(nb_inputs > 1):
+                    checkpoint.update({"coeff_c_I1": coeff_store(coeff_c_I1), "coeff_c_I2": coeff_store(coeff_c_I2), "coeff_c_I1_and_I2": coeff_store(coeff_c_I1_and_I2)})
+                checkpoint_save(".exp2", checkpoint)
+                last_save = time.time()
             if(verbosity >= 1):
-                print("----------- Batch " + str(b) + "/" + str(nb_b) + " -----------")
+                print("----------- Batch " + str(b+1) + "/" + str(nb_b) + " -----------")
                 
+            list_tuples, orbits = symmetry_reduce(list_tuples, group)
+            
             ########## Compute binary value for each tuple in list_tuples
             sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
-            sums_args = np.argsort(sums)
+            sums_keys = row_keys(sums)
+            sums_args = np.argsort(sums_keys)
             
-            mask_I1_or_I2 = np.asarray([], dtype="int64")
+            mask_I1_or_I2 = sums_keys[:0]
             if(nb_inputs > 1):
-                mask_I1 = np.asarray([], dtype="int64");   mask_I2 = np.asarray([], dtype="int64")
+                mask_I1 = sums_keys[:0];   mask_I2 = sums_keys[:0]
                 
-            mask_I1_or_I2_flawed = np.asarray([], dtype="int64")
+            mask_I1_or_I2_flawed = sums_keys[:0]
             if(nb_inputs > 1):
-                mask_I1_flawed = np.asarray([], dtype="int64"); mask_I2_flawed = np.asarray([], dtype="int64")
+                mask_I1_flawed = sums_keys[:0]; mask_I2_flawed = sums_keys[:0]
+    
+            ####################################  Eliminating Non-Incompressible Tuples  #####################################
+            #The elimination only depends on the input part of the tuples, it is done once for all the output combinations (as the
+            #secret dependencies of this part for the eliminated tuples)
+            list_tuples_in = list_tuples
+            sums_in = sums_keys
+            if(list_int_prev_flawed.size != 0):
+                start = time.time()
+                e =  eliminate_from_smaller(index_prev_flawed, sums)
+                end = time.time()
+                if(verbosity == 2):
+                    print("Time to eliminate = " + str(end-start)+ " seconds")
+                
+                mask_I1_or_I2_flawed = sums_keys[e]
+                if(nb_inputs > 1):
+                    sums_flawed = mask_I1_or_I2_flawed
+                    secret_deps_flawed = np.bitwise_or.reduce(secret_deps[list_tuples[e, :], :], axis=1, dtype=np.uint)
+                    
+                list_tuples_in = list_tuples[~e, :]
+                sums_in = sums_keys[~e]
+                del e
+            #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
+            
+            #The input part of the tuples is written once in the buffer, each output combination only overwrites the last columns
+            rows = buffer[:len(list_tuples_in)]
+            rows[:, :i] = list_tuples_in
+            secret_deps_in = np.bitwise_or.reduce(secret_deps[list_tuples_in, :], axis=1, dtype=np.uint)
     
             itera = 0
             #####################################  Iterating Over all combinations of output shares of size (nb_shares - 1)  #####################################
-            for list_out in out_combs:
+            #After the first combination, only the tuples in the intersection mask_I1_or_I2 (which contains mask_I1 and mask_I2) can still be
+            #failure tuples for all the combinations, the loop stops when none is left (and no eliminated tuple is left in the intersections).
+            #With survivors, the next combinations are only verified on them: the rules are applied to smaller batches, which stop sooner
+            #(the rules are applied until a pass eliminates none of the tuples of the batch), so the coefficients can be slightly larger
+            for (o, list_out) in enumerate(out_combs):
+                if((itera > 0) and (len(mask_I1_or_I2) == 0) and ((nb_inputs == 1) or ((len(mask_I1_flawed) == 0) and (len(mask_I2_flawed) == 0)))):
+                    break
             
                 if(verbosity == 2):
                     print("********************************************")
-                sums_sub = np.copy(sums)
                 
-                ########## Adding output comb of shares to each tuple
-                list_tuples_sub = np.hstack((np.copy(list_tuples), np.repeat([list_out], len(list_tuples), axis=0)))
-                
-                ####################################  Eliminating Non-Incompressible Tuples  #####################################
-                if(list_int_prev_flawed.size != 0):
-                    start = time.time()
-                    e =  eliminate_from_smaller(list_int_prev_flawed, sums_sub, nb_wires-len(indices_o))
-                    end = time.time()
-                    if(verbosity == 2):
-                        print("Time to eliminate = " + str(end-start)+ " seconds")
-                        
-                    s = sums_sub[e]
+                ########## Classifying the eliminated tuples with the output comb of shares
+                if((nb_inputs > 1) and (len(mask_I1_or_I2_flawed) > 0)):
+                    mask_I1_tmp, mask_I2_tmp = classify_rule_1(secret_deps_flawed | secret_deps_outs[o], t)
+                    s1 = sums_flawed[mask_I1_tmp]
+                    s2 = sums_flawed[mask_I2_tmp]
                     
                     if(itera == 0):
-                        mask_I1_or_I2_flawed = s
+                        mask_I1_flawed = s1
+                        mask_I2_flawed = s2
                     else:
-                        mask_I1_or_I2_flawed = np.intersect1d(mask_I1_or_I2_flawed, s)
-                    
-                    if((nb_inputs > 1) and (len(s) > 0)):
-                        l = list_tuples_sub[e, :]
-                        secret_deps_tuple = np.bitwise_or.reduce(secret_deps[l, :], axis=1, dtype=np.int8)
-                        mask_I1_tmp, mask_I2_tmp = classify_rule_1(secret_deps_tuple, t)
-                        del secret_deps_tuple; del l
-                        s1 = s[mask_I1_tmp]
-                        s2 = s[mask_I2_tmp]
-                        
-                        if(itera == 0):
-                            mask_I1_flawed = s1
-                            mask_I2_flawed = s2
-                        else:
-                            mask_I1_flawed = np.intersect1d(mask_I1_flawed, s1)
-                            mask_I2_flawed = np.intersect1d(mask_I2_flawed, s2)
+                        mask_I1_flawed = np.intersect1d(mask_I1_flawed, s1)
+                        mask_I2_flawed = np.intersect1d(mask_I2_flawed, s2)
     
-                        del mask_I1_tmp; del mask_I2_tmp; del s1; del s2
-                        
-                    list_tuples_sub = list_tuples_sub[~e, :]
-                    sums_sub = sums_sub[~e]
-                    del e
+                    del mask_I1_tmp; del mask_I2_tmp; del s1; del s2
                     
-                    if(len(list_tuples_sub) == 0):
-                        mask_I1_or_I2 = np.asarray([], dtype="int64")
-                        if(nb_inputs > 1):
-                            mask_I1 = np.asarray([], dtype="int64");  mask_I2 = np.asarray([], dtype="int64")
-                        del sums_sub
-                        del list_tuples_sub
-                        itera += 1
-                        continue
-                #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
+                if((len(list_tuples_in) == 0) or ((itera > 0) and (len(mask_I1_or_I2) == 0))):
+                    itera += 1
+                    continue
+                
+                ########## Adding output comb of shares to each tuple
+                rows[:, i:] = list_out
                 
                 #####################################  Apply Probing Rules (1, 2 and 3) !!  #####################################
-                list_tuples_sub, sums_sub, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples_sub, secret_deps, random_deps, exps, exps_str, None, sums_sub, i+1, None, t=t, verbosity=verbosity)
+                list_tuples_sub, sums_sub, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(rows, secret_deps, random_deps, exps, None, sums_in, i+1, None, t=t, verbosity=verbosity, secret_deps_tuple=secret_deps_in | secret_deps_outs[o])
                 
                 ########### Eliminating from previous flawed tuples, the ones that are not flawed for the considered output (computing intersection of flaws for all outputs)
                 if(itera == 0):
@@ -172,7 +228,7 @@ def verification_random_probing_exp_2(indices, indices_o, weights, exps,  exps_s
                 
                 if(nb_inputs > 1):
                     if(len(sums_sub) > 0):
-                        secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples_sub, :], axis=1, dtype=np.int8)                
+                        secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples_sub, :], axis=1, dtype=np.uint)                
                         mask_I1_tmp, mask_I2_tmp = classify_rule_1(secret_deps_tuple, t)
     
                         s1 = sums_sub[mask_I1_tmp]
@@ -186,13 +242,23 @@ def verification_random_probing_exp_2(indices, indices_o, weights, exps,  exps_s
                         
                         del mask_I1_tmp; del mask_I2_tmp; del s1; del s2
                     else:
-                        mask_I1 = np.asarray([], dtype="int64")
-                        mask_I2 = np.asarray([], dtype="int64")
+                        mask_I1 = sums_keys[:0]
+                        mask_I2 = sums_keys[:0]
                     
                 del list_tuples_sub;  del sums_sub
                 ########### To delete added wires from the application of rule 3
                 secret_deps = secret_deps[:nb_wires, :]
                 itera += 1
+                
+                ########### Restricting the tuples to the ones which are failure tuples for all the combinations verified so far
+                if(survivors):
+                    mask = np.isin(sums_in, mask_I1_or_I2)
+                    list_tuples_in = list_tuples_in[mask, :]
+                    sums_in = sums_in[mask]
+                    secret_deps_in = secret_deps_in[mask]
+                    rows = buffer[:len(list_tuples_in)]
+                    rows[:, :i] = list_tuples_in
+                    del mask
             #####################################  Done Iterating Over all combinations of output shares of size (nb_shares - 1)  #####################################
             
             #list_int_prev_flawed_tmp = np.append(list_int_prev_flawed_tmp, mask_I1_or_I2)
@@ -202,95 +268,109 @@ def verification_random_probing_exp_2(indices, indices_o, weights, exps,  exps_s
                 print("Updating c coefficients...")
     
             if(len(mask_I1_or_I2_flawed) > 0):
-                search = sums_args[np.searchsorted(sums, mask_I1_or_I2_flawed, sorter=sums_args)]
+                search = sums_args[np.searchsorted(sums_keys, mask_I1_or_I2_flawed, sorter=sums_args)]
                 l = list_tuples[search, :]
                 start = time.time()
-                update_coeff_c(coeff_c_I1_or_I2, nb_occs[l].tolist())
+                update_coeff_c(coeff_c_I1_or_I2, nb_occs[l], orbits[search])
                 end = time.time()
                 upd += (end - start)
             
             if(len(mask_I1_or_I2) > 0):
-                search = sums_args[np.searchsorted(sums, mask_I1_or_I2, sorter=sums_args)]
+                search = sums_args[np.searchsorted(sums_keys, mask_I1_or_I2, sorter=sums_args)]
                 l = list_tuples[search, :]
                 start = time.time()
-                update_coeff_c(coeff_c_I1_or_I2, nb_occs[l].tolist())
+                update_coeff_c(coeff_c_I1_or_I2, nb_occs[l], orbits[search])
                 end = time.time()
                 upd += (end - start)
                 
             if(nb_inputs > 1):
                 if(len(mask_I1_flawed) > 0):
-                    search = sums_args[np.searchsorted(sums, mask_I1_flawed, sorter=sums_args)]
+                    search = sums_args[np.searchsorted(sums_keys, mask_I1_flawed, sorter=sums_args)]
                     l = list_tuples[search, :]
                     start = time.time()
-                    update_coeff_c(coeff_c_I1, nb_occs[l].tolist())
+                    update_coeff_c(coeff_c_I1, nb_occs[l], orbits[search])
                     end = time.time()
                     upd += (end - start)
                 if(len(mask_I1) > 0):
-                    search = sums_args[np.searchsorted(sums, mask_I1, sorter=sums_args)]
+                    search = sums_args[np.searchsorted(sums_keys, mask_I1, sorter=sums_args)]
                     l = list_tuples[search, :]
                     start = time.time()
-                    update_coeff_c(coeff_c_I1, nb_occs[l].tolist())
+                    update_coeff_c(coeff_c_I1, nb_occs[l], orbits[search])
                     end = time.time()
                     upd += (end - start)
                     
                 if(len(mask_I2_flawed) > 0):
-                    search = sums_args[np.searchsorted(sums, mask_I2_flawed, sorter=sums_args)]
+                    search = sums_args[np.searchsorted(sums_keys, mask_I2_flawed, sorter=sums_args)]
                     l = list_tuples[search, :]
                     start = time.time()
-                    update_coeff_c(coeff_c_I2, nb_occs[l].tolist())
+                    update_coeff_c(coeff_c_I2, nb_occs[l], orbits[search])
                     end = time.time()
                     upd += (end - start)
                 if(len(mask_I2) > 0):
-                    search = sums_args[np.searchsorted(sums, mask_I2, sorter=sums_args)]
+                    search = sums_args[np.searchsorted(sums_keys, mask_I2, sorter=sums_args)]
                     l = list_tuples[search, :]
                     start = time.time()
-                    update_coeff_c(coeff_c_I2, nb_occs[l].tolist())
+                    update_coeff_c(coeff_c_I2, nb_occs[l], orbits[search])
                     end = time.time()
                     upd += (end - start)
                 flawed12 = np.intersect1d(mask_I1_flawed, mask_I2_flawed)
                 if(len(flawed12) > 0):
-                    search = sums_args[np.searchsorted(sums, flawed12, sorter=sums_args)]
+                    search = sums_args[np.searchsorted(sums_keys, flawed12, sorter=sums_args)]
                     l = list_tuples[search, :]
                     start = time.time()
-                    update_coeff_c(coeff_c_I1_and_I2, nb_occs[l].tolist())
+                    update_coeff_c(coeff_c_I1_and_I2, nb_occs[l], orbits[search])
                     end = time.time()
                     upd += (end - start)
                 flawed12 = np.intersect1d(mask_I1, mask_I2)
                 if(len(flawed12) > 0):
-                    search = sums_args[np.searchsorted(sums, flawed12, sorter=sums_args)]
+                    search = sums_args[np.searchsorted(sums_keys, flawed12, sorter=sums_args)]
                     l = list_tuples[search, :]
                     start = time.time()
-                    update_coeff_c(coeff_c_I1_and_I2, nb_occs[l].tolist())
+                    update_coeff_c(coeff_c_I1_and_I2, nb_occs[l], orbits[search])
                     end = time.time()
                     upd += (end - start)
             
             #####################################  Done Updating Coefficients  ##################################### 
-            list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
             
         #####################################  Done BATCHING  #####################################
         
-        list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp)
+        list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp, 0)
+        index_prev_flawed = subset_index(list_int_prev_flawed)
+        level = {"coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed}
+        if(nb_inputs > 1):
+            level.update({"coeff_c_I1": coeff_store(coeff_c_I1), "coeff_c_I2": coeff_store(coeff_c_I2), "coeff_c_I1_and_I2": coeff_store(coeff_c_I1_and_I2)})
+        result_cache_save(".exp2", i, level)
         
         if(verbosity == 2):
             if(nb_inputs > 1):
-                print("coefficients c (|I1|>t) : " + str(coeff_c_I1))
-                print("coefficients c (|I2|>t) : " + str(coeff_c_I2))
-                print("coefficients c (|I1|>t and |I2|>t) : " + str(coeff_c_I1_and_I2))
-                print("coefficients c (|I1|>t or |I2|>t) : " + str(coeff_c_I1_or_I2))
+                print("coefficients c (|I1|>t) : " + str(coeff_c_I1.tolist()))
+                print("coefficients c (|I2|>t) : " + str(coeff_c_I2.tolist()))
+                print("coefficients c (|I1|>t and |I2|>t) : " + str(coeff_c_I1_and_I2.tolist()))
+                print("coefficients c (|I1|>t or |I2|>t) : " + str(coeff_c_I1_or_I2.tolist()))
             else:
-                print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2))
+                print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2.tolist()))
     #####################################  Done Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+    if(i_start <= coeff_max):
+        checkpoint = {"i": coeff_max+1, "b": 0, "coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed[:0]}
+        if(nb_inputs > 1):
+            checkpoint.update({"coeff_c_I1": coeff_store(coeff_c_I1), "coeff_c_I2": coeff_store(coeff_c_I2), "coeff_c_I1_and_I2": coeff_store(coeff_c_I1_and_I2)})
+        checkpoint_save(".exp2", checkpoint)
+    if(shard.SHARD_OUTPUT is not None):
+        if(nb_inputs > 1):
+            shard_record("exp2", [coeff_c_I1, coeff_c_I2, coeff_c_I1_and_I2, coeff_c_I1_or_I2])
+        else:
+            shard_record("exp2", [coeff_c_I1_or_I2])
     if(verbosity == 2):
         print("Total update Time = " + str(upd))
     if(nb_inputs > 1):
         if(verbosity == 2):
-            print("\n\ncoefficients c (|I1|>t) : " + str(coeff_c_I1))
-            print("coefficients c (|I2|>t) : " + str(coeff_c_I2))
-            print("coefficients c (|I1|>t and |I2|>t) : " + str(coeff_c_I1_and_I2))
-            print("coefficients c (|I1|>t or |I2|>t) : " + str(coeff_c_I1_or_I2))
+            print("\n\ncoefficients c (|I1|>t) : " + str(coeff_c_I1.tolist()))
+            print("coefficients c (|I2|>t) : " + str(coeff_c_I2.tolist()))
+            print("coefficients c (|I1|>t and |I2|>t) : " + str(coeff_c_I1_and_I2.tolist()))
+            print("coefficients c (|I1|>t or |I2|>t) : " + str(coeff_c_I1_or_I2.tolist()))
 
-        return coeff_c_I1, coeff_c_I2, coeff_c_I1_and_I2, coeff_c_I1_or_I2
+        return coeff_c_I1.tolist(), coeff_c_I2.tolist(), coeff_c_I1_and_I2.tolist(), coeff_c_I1_or_I2.tolist()
     else:
         if(verbosity == 2):
-            print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2))
-        return coeff_c_I1_or_I2
\ No newline at end of file
+            print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2.tolist()))
+        return coeff_c_I1_or_I2.tolist()
\ No newline at end of file
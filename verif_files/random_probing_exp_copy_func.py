@@ -29,152 +29,236 @@
 #
 ###############################################################################
 
+import numpy as np
+import time
+from math import comb as binomial
+from .verification_rules import BATCH_SIZE, apply_all_rules, combs, combs_batches
+from .coefficients import coeff_zeros, coeff_store, coeff_restore, update_coeff_c
+from .elimination import row_keys, subset_index, eliminate_from_smaller
+from .checkpoint import checkpoint_due, checkpoint_load, checkpoint_save
+from .result_cache import result_cache_load, result_cache_save
+from .parallel import pool_map
+from . import shard
+from .shard import shard_batches, shard_merged, shard_record
+from .symmetry import symmetry_out_combs, symmetry_group, symmetry_reduce, symmetry_masks
 
-def verification_random_probing_exp_copy_12(indices, indices_o, weights, exps,  exps_str, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, bit):
-    
-    out_combs1 = combs(indices_o[bit], t)
-    
-    out_combs2 = combs(indices_o[1-bit], nb_shares - 1)
-    
-    nb_inputs = len(secret_deps[0])
+
+####################### Tuple list_out1 of output bit #######################
+def random_probing_exp_copy_12_out(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, t, verbosity, out_combs2, survivors, o, list_out1):
     nb_wires = len(exps)
+    nb_occ = int(np.sum(nb_occs))
     upd = 0
     batch_size = BATCH_SIZE
+
+    list_int_prev_flawed = np.zeros((0, weights.shape[1]), dtype=np.uint64)
+    coeff_c_I1_or_I2 = coeff_zeros(nb_occ)
     
-    #Creating maximum Coefficients function for I1, I2, I1_and_I2, I1_or_I2
-    nb_occ = int(np.sum(nb_occs))
-    coeff_c_max_I1_or_I2 = np.zeros(nb_occ+1).tolist()
+    #####################################  Resuming from the last checkpoint or from the cached levels  #####################################
+    checkpoint_name = ".copy12.out" + "-".join([str(o) for o in list_out1])
+    i_start = 1
+    state = checkpoint_load(checkpoint_name)
+    if(state is None):
+        state = result_cache_load(checkpoint_name, coeff_max)
+    if(state is not None):
+        coeff_c_I1_or_I2[:] = coeff_restore(state["coeff_c_I1_or_I2"])
+        list_int_prev_flawed = state["list_int_prev_flawed"]
+        i_start = int(state["i"])
+    index_prev_flawed = subset_index(list_int_prev_flawed)
+    last_save = time.time()
+
+    #With symmetries, only the canonical tuples are verified, weighted by the sizes of their orbits (the automorphisms must leave list_out1 unchanged)
+    group = symmetry_group(list_out1)
     
-    #####################################  Iterating Over Tuples of size t of output b  #####################################
-    for list_out1 in out_combs1:
+    #Secret dependencies of list_out1 and of each tuple of output (1-b), the secret dependencies of a tuple with them are the ones of its input part and of them
+    secret_deps_outs = np.bitwise_or.reduce(secret_deps[out_combs2, :], axis=1, dtype=np.uint) | np.bitwise_or.reduce(secret_deps[list_out1, :], axis=0, dtype=np.uint)
     
-        list_int_prev_flawed = np.asarray([], dtype="int64")
-        coeff_c_I1_or_I2 = np.zeros(nb_occ+1).tolist()
+    #####################################  Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+    for i in range(i_start, coeff_max+1):
         
-        #####################################  Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
-        for i in range(1, coeff_max+1):
-            
-            if(verbosity == 2):
-                print ("\n\nTransform tuples in list elements..")
+        if(verbosity == 2):
+            print ("\n\nTransform tuples in list elements..")
+        
+        list_int_prev_flawed_tmp = np.zeros((0, weights.shape[1]), dtype=np.uint64)
+        b_start = 0
+        if((state is not None) and (i == i_start)):
+            list_int_prev_flawed_tmp = state["list_int_prev_flawed_tmp"]
+            b_start = int(state["b"])
+        nb_b = -(-int(binomial(len(indices), i)) // batch_size)
+        #Every shard verifies all the tuples of size smaller than coeff_max (their flawed tuples are needed to eliminate the larger tuples), but only shard 0 counts them
+        if((i == coeff_max) or (shard.SHARD[0] == 0)):
+            coeff_c_level = coeff_c_I1_or_I2
+        else:
+            coeff_c_level = coeff_zeros(nb_occ)
+        numbers = shard_batches(nb_b, b_start, o + i, (i == coeff_max))
+        batches = combs_batches(indices, i, batch_size, numbers, reuse = True)
+        #list_tuples = combs(indices, i)
+        #Tuples with list_out1 and a tuple of output (1-b), list_out1 is written once, each tuple of output (1-b) only overwrites the last columns
+        buffer = np.empty((batch_size, i + len(list_out1) + out_combs2.shape[1]), dtype=np.result_type(indices, list_out1, out_combs2))
+        buffer[:, i:i+len(list_out1)] = list_out1
+        if(verbosity >= 1):
+            print ('\n   ***   '+str(i)+"-uples : " + str(binomial(len(indices), i)))
             
-            list_tuples_orig = itertools.combinations(indices, i)
-            #list_tuples = combs(indices, i)
+        #####################################  BATCHING  #####################################
+        for (b, list_tuples) in zip(numbers, batches):
+            if(checkpoint_due(last_save)):
+                checkpoint_save(checkpoint_name, {"i": i, "b": b, "coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed_tmp})
+                last_save = time.time()
             if(verbosity >= 1):
-                print ('\n   ***   '+str(i)+"-uples : " + str(binomial(len(indices), i)))
-                
-            list_int_prev_flawed_tmp = np.asarray([], dtype="int64")
-            list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-            nb_b = (binomial(len(indices), i)//batch_size)+1
-            b = 0
-            #####################################  BATCHING  #####################################
-            while(len(list_tuples) != 0):            
-                b += 1
-                if(verbosity >= 1):
-                    print("----------- Batch " + str(b) + "/" + str(nb_b) + " -----------")
-                
-                ########## Compute binary value for each tuple in list_tuples
-                sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
-                sums_args = np.argsort(sums)
-                
-                list_tuples_c = np.hstack((list_tuples, np.repeat([list_out1], len(list_tuples), axis=0)))
-                
-                mask_I1_or_I2 = np.asarray([], dtype="int64")
-                mask_I1_or_I2_flawed = np.asarray([], dtype="int64")
-                itera = 0
-                
-                
-                #####################################  Iterating Over Tuples of size (nb_shares - 1) of output (1-b) #####################################
-                for list_out2 in out_combs2:
+                print("----------- Batch " + str(b+1) + "/" + str(nb_b) + " -----------")
             
-                    if(verbosity == 2):
-                        print("********************************************")
-                    sums_sub = np.copy(sums)
-                    
-                    ########## Adding output comb of shares to each tuple
-                    list_tuples_sub = np.hstack((np.copy(list_tuples_c), np.repeat([list_out2], len(list_tuples), axis=0)))
-                    
-                    ####################################  Eliminating Non-Incompressible Tuples  #####################################
-                    if(list_int_prev_flawed.size != 0):
-                        start = time.time()
-                        e =  eliminate_from_smaller(list_int_prev_flawed, sums_sub, nb_wires - len(indices_o[0]) - len(indices_o[1]))
-                        end = time.time()
-                        if(verbosity == 2):
-                            print("Time to eliminate = " + str(end-start)+ " seconds")
-                            
-                        s = sums_sub[e]
-                        
-                        if(itera == 0):
-                            mask_I1_or_I2_flawed = s
-                        else:
-                            mask_I1_or_I2_flawed = np.intersect1d(mask_I1_or_I2_flawed, s)
-                            
-                        list_tuples_sub = list_tuples_sub[~e, :]
-                        sums_sub = sums_sub[~e]
-                        del e
-                        
-                        if(len(list_tuples_sub) == 0):
-                            mask_I1_or_I2 = np.asarray([], dtype="int64")
-                            del sums_sub
-                            del list_tuples_sub
-                            itera += 1
-                            #list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-                            continue
-                    #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
-                    
-                    #####################################  Apply Probing Rules (1, 2 and 3) !!  #####################################
-                    list_tuples_sub, sums_sub, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples_sub, secret_deps, random_deps, exps, exps_str, None, sums_sub, i+1, None, t=t, verbosity=verbosity)
-                
-                    ########### Eliminating from previous flawed tuples, the ones that are not flawed for the considered output (computing intersection of flaws for all outputs)
-                    if(itera == 0):
-                        mask_I1_or_I2 = sums_sub
-                    else:
-                        mask_I1_or_I2 = np.intersect1d(mask_I1_or_I2, sums_sub)
+            list_tuples, orbits = symmetry_reduce(list_tuples, group)
+            
+            ########## Compute binary value for each tuple in list_tuples
+            sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
+            sums_keys = row_keys(sums)
+            sums_args = np.argsort(sums_keys)
+            
+            list_tuples_c = list_tuples
+            
+            mask_I1_or_I2 = sums_keys[:0]
+            mask_I1_or_I2_flawed = sums_keys[:0]
+            
+            ####################################  Eliminating Non-Incompressible Tuples  #####################################
+            #The elimination only depends on the input part of the tuples, it is done once for all the tuples of output (1-b)
+            sums_in = sums_keys
+            if(list_int_prev_flawed.size != 0):
+                start = time.time()
+                e =  eliminate_from_smaller(index_prev_flawed, sums)
+                end = time.time()
+                if(verbosity == 2):
+                    print("Time to eliminate = " + str(end-start)+ " seconds")
                     
-                    del list_tuples_sub;  del sums_sub
-                    ########### To delete added wires from the application of rule 3
-                    secret_deps = secret_deps[:nb_wires, :]
+                mask_I1_or_I2_flawed = sums_keys[e]
+                list_tuples_c = list_tuples_c[~e, :]
+                sums_in = sums_keys[~e]
+                del e
+            #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
+            
+            #The input part of the tuples is written once in the buffer
+            rows = buffer[:len(list_tuples_c)]
+            rows[:, :i] = list_tuples_c
+            secret_deps_in = np.bitwise_or.reduce(secret_deps[list_tuples_c, :], axis=1, dtype=np.uint)
+            itera = 0
+            
+            #####################################  Iterating Over Tuples of size (nb_shares - 1) of output (1-b) #####################################
+            #After the first tuple of output (1-b), only the tuples in the intersection mask_I1_or_I2 can still be failure tuples for all the
+            #tuples of output (1-b), the loop stops when none is left. With survivors, the next tuples of output (1-b) are only verified on them
+            #(see random_probing_exp2_func.py, the coefficients can be slightly larger)
+            for (o2, list_out2) in enumerate(out_combs2):
+                if((len(list_tuples_c) == 0) or ((itera > 0) and (len(mask_I1_or_I2) == 0))):
+                    break
         
-                    itera += 1
-                #####################################  Done Iterating Over Tuples of size (nb_shares - 1) of output (1-b)  #####################################
+                if(verbosity == 2):
+                    print("********************************************")
+                ########## Adding output comb of shares to each tuple
+                rows[:, i+len(list_out1):] = list_out2
                 
-                #list_int_prev_flawed = np.append(list_int_prev_flawed, mask_I1_or_I2)
-                list_int_prev_flawed_tmp = np.append(list_int_prev_flawed_tmp, mask_I1_or_I2)
+                #####################################  Apply Probing Rules (1, 2 and 3) !!  #####################################
+                list_tuples_sub, sums_sub, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(rows, secret_deps, random_deps, exps, None, sums_in, i+1, None, t=t, verbosity=verbosity, secret_deps_tuple=secret_deps_in | secret_deps_outs[o2])
+            
+                ########### Eliminating from previous flawed tuples, the ones that are not flawed for the considered output (computing intersection of flaws for all outputs)
+                if(itera == 0):
+                    mask_I1_or_I2 = sums_sub
+                else:
+                    mask_I1_or_I2 = np.intersect1d(mask_I1_or_I2, sums_sub)
                 
-                #####################################  Updating Coefficients  #####################################
-                if(verbosity == 2):
-                    print("Updating c coefficients...")
-                    
-                if(len(mask_I1_or_I2_flawed) > 0):
-                    search = sums_args[np.searchsorted(sums, mask_I1_or_I2_flawed, sorter=sums_args)]
-                    l = list_tuples[search, :]
-                    start = time.time()
-                    update_coeff_c(coeff_c_I1_or_I2, nb_occs[l].tolist())
-                    end = time.time()
-                    upd += (end - start)
+                del list_tuples_sub;  del sums_sub
+                ########### To delete added wires from the application of rule 3
+                secret_deps = secret_deps[:nb_wires, :]
+    
+                itera += 1
                 
-                if(len(mask_I1_or_I2) > 0):
-                    search = sums_args[np.searchsorted(sums, mask_I1_or_I2, sorter=sums_args)]
-                    l = list_tuples[search, :]
-                    start = time.time()
-                    update_coeff_c(coeff_c_I1_or_I2, nb_occs[l].tolist())
-                    end = time.time()
-                    upd += (end - start)
-                    
-                #####################################  Done Updating Coefficients  #####################################
-                list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
+                ########### Restricting the tuples to the ones which are failure tuples for all the tuples of output (1-b) verified so far
+                if(survivors):
+                    mask = np.isin(sums_in, mask_I1_or_I2)
+                    list_tuples_c = list_tuples_c[mask, :]
+                    sums_in = sums_in[mask]
+                    secret_deps_in = secret_deps_in[mask]
+                    rows = buffer[:len(list_tuples_c)]
+                    rows[:, :i] = list_tuples_c
+                    del mask
+            #####################################  Done Iterating Over Tuples of size (nb_shares - 1) of output (1-b)  #####################################
+            
+            #list_int_prev_flawed = np.append(list_int_prev_flawed, mask_I1_or_I2)
+            search = sums_args[np.searchsorted(sums_keys, mask_I1_or_I2, sorter=sums_args)]
+            list_int_prev_flawed_tmp = np.append(list_int_prev_flawed_tmp, sums[search], 0)
             
-            #####################################  Done BATCHING  #####################################
+            #####################################  Updating Coefficients  #####################################
+            if(verbosity == 2):
+                print("Updating c coefficients...")
+                
+            if(len(mask_I1_or_I2_flawed) > 0):
+                search = sums_args[np.searchsorted(sums_keys, mask_I1_or_I2_flawed, sorter=sums_args)]
+                l = list_tuples[search, :]
+                start = time.time()
+                update_coeff_c(coeff_c_level, nb_occs[l], orbits[search])
+                end = time.time()
+                upd += (end - start)
             
-            list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp)
+            if(len(mask_I1_or_I2) > 0):
+                search = sums_args[np.searchsorted(sums_keys, mask_I1_or_I2, sorter=sums_args)]
+                l = list_tuples[search, :]
+                start = time.time()
+                update_coeff_c(coeff_c_level, nb_occs[l], orbits[search])
+                end = time.time()
+                upd += (end - start)
+                
+            #####################################  Done Updating Coefficients  #####################################
         
-        #####################################  Done Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+        #####################################  Done BATCHING  #####################################
         
+        #The images of the flawed canonical tuples are flawed
+        list_int_prev_flawed_tmp = symmetry_masks(list_int_prev_flawed_tmp, group)
+        list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp, 0)
+        index_prev_flawed = subset_index(list_int_prev_flawed)
+        result_cache_save(checkpoint_name, i, {"coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed})
+    
+    #####################################  Done Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+    if(i_start <= coeff_max):
+        checkpoint_save(checkpoint_name, {"i": coeff_max+1, "b": 0, "coeff_c_I1_or_I2": coeff_store(coeff_c_I1_or_I2), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed[:0]})
+    return coeff_c_I1_or_I2, upd
+
+
+####################### Batching Version #######################
+def verification_random_probing_exp_copy_12(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, bit, jobs = 1, survivors = False):
+    
+    out_combs1 = combs(indices_o[bit], t)
+    
+    out_combs2 = combs(indices_o[1-bit], nb_shares - 1)
+    
+    upd = 0
+    
+    #Creating maximum Coefficients function for I1, I2, I1_and_I2, I1_or_I2
+    nb_occ = int(np.sum(nb_occs))
+    coeff_c_max_I1_or_I2 = coeff_zeros(nb_occ)
+    
+    #With symmetries, the combinations mapped to each other by an automorphism have the same coefficients, only one of each class is verified
+    out_combs1 = symmetry_out_combs(out_combs1)
+
+    #####################################  Iterating Over Tuples of size t of output b  #####################################
+    #Each tuple of output bit is verified independently, the results are computed by jobs workers and max-merged in the order of out_combs1
+    #With shards, the partial coefficients of each tuple are kept, they are summed over the shards before being max-merged
+    merged = shard_merged("copy12_" + str(bit))
+    if(merged is not None):
+        results = [(coeffs, 0) for coeffs in merged]
+    else:
+        shared_args = (indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, t, verbosity, out_combs2, survivors)
+        if(jobs > 1):
+            results = pool_map(random_probing_exp_copy_12_out, shared_args, enumerate(out_combs1), jobs)
+        else:
+            results = (random_probing_exp_copy_12_out(*(shared_args + (o, list_out1))) for (o, list_out1) in enumerate(out_combs1))
+        if(shard.SHARD_OUTPUT is not None):
+            results = list(results)
+            shard_record("copy12_" + str(bit), [coeffs for (coeffs, upd_out) in results])
+
+    for (coeff_c_I1_or_I2, upd_out) in results:
+        upd += upd_out
+
         ########## Updating coeff_c_max(s) ##########
         if(verbosity == 2):
-            print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2))
+            print("coefficients c (|I1|>t) : " + str(coeff_c_I1_or_I2.tolist()))
             
-        for c in range(nb_occ+1):
-            coeff_c_max_I1_or_I2[c] = max(coeff_c_max_I1_or_I2[c],coeff_c_I1_or_I2[c])
+        coeff_c_max_I1_or_I2 = np.maximum(coeff_c_max_I1_or_I2, coeff_c_I1_or_I2)
         ########## Done Updating coeff_c_max(s) ##########
         
     #####################################  Done Iterating Over Tuples of size t of output b  #####################################
@@ -182,6 +266,6 @@ def verification_random_probing_exp_copy_12(indices, indices_o, weights, exps,
     if(verbosity == 2):
         print("Total update Time = " + str(upd))
         print("\n\n")
-        print("MAX coefficients c (|I1|>t) : " + str(coeff_c_max_I1_or_I2))
+        print("MAX coefficients c (|I1|>t) : " + str(coeff_c_max_I1_or_I2.tolist()))
         
-    return coeff_c_max_I1_or_I2
\ No newline at end of file
+    return coeff_c_max_I1_or_I2.tolist()
\ No newline at end of file
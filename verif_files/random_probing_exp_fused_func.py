@@ -0,0 +1,403 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random 
+# probing expandability (RPE) that was introduced in the following publication:
+# 
+#    "Random Probing Security: Verification, Composition, Expansion and New 
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain, 
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+# **************************************************
+#	Verification of all the functions of random probing expandability
+# **************************************************
+import numpy as np
+import time
+from math import comb as binomial
+from .verification_rules import BATCH_SIZE, apply_all_rules, classify_rule_1, combs, combs_batches
+from .coefficients import coeff_dtype, coeff_store, coeff_restore, update_coeff_c
+from .elimination import subset_index, eliminate_from_smaller
+from .checkpoint import checkpoint_due, checkpoint_load, checkpoint_save
+from .result_cache import result_cache_load, result_cache_save
+from .parallel import pool_map
+from . import shard
+from .shard import shard_batches, shard_merged, shard_record
+
+##############################################################################
+#
+# Verification of RPE 1 and RPE 2 (and of the functions 12 and 21 of the 
+# copy gadgets), or of RPC (comp), in a single enumeration of the tuples
+#	OUTPUT:
+#		- the coefficients of the functions f(p) of each property, in the
+#           format of verification_random_probing_exp_1, _exp_2, 
+#           _exp_copy_12 (or verification_random_probing_comp), for each
+#           couple (t, t_output) of sweep if specified
+#
+#   The properties are verified by tasks : one per output combination for
+#   RPE1, one for RPE2 and one per tuple of output bit for the copy 
+#   functions 12 and 21. A task intersects the failure tuples found with 
+#   each of its sets of output shares. Each batch of tuples is enumerated 
+#   once, and the rules are applied once for each distinct set of output 
+#   shares, on the tuples needed by the tasks still using it. When t (or 
+#   t_output) = nb_shares - 1, all the tasks use the same sets of output 
+#   shares, so the rules are applied once instead of once per property.
+#
+#   Only the tasks of the copy functions eliminate the tuples including
+#   their failure tuples of smaller sizes (as their own verification). A 
+#   set of output shares shared with RPE1 or RPE2 is verified on all the 
+#   tuples of the batch, and the rules are applied until a pass eliminates
+#   none of the tuples of the batch, so the coefficients of the copy 
+#   functions can be slightly different (still upper bounds)
+#
+#   With several couples (t, t_output) (sweep), the tasks of all the 
+#   couples are verified in the same enumeration, and the couples with the
+#   same value of t share their tasks of RPE2 and of the copy functions. 
+#   The rules are applied once for each set of output shares and each 
+#   value of t (the passes of the rules depend on t through rule 1), so 
+#   the coefficients are the same as with one run for each couple.
+#
+##############################################################################
+
+####################### Keys of the coefficients of a task #######################
+def fused_keys(task):
+    if(task["nb"] > 1):
+        return ["coeff_c_I1", "coeff_c_I2", "coeff_c_I1_and_I2", "coeff_c_I1_or_I2"]
+    return ["coeff_c_I1_or_I2"]
+
+
+####################### Tasks and distinct sets of output shares #######################
+def fused_set(sets, ids, out):
+    key = tuple(sorted(int(w) for w in out))
+    if(key not in ids):
+        ids[key] = len(sets)
+        sets.append(np.asarray(out))
+    return ids[key]
+    
+def fused_task(tasks, names, p, task):
+    #A task is shared by all the couples (t, t_output) which need it (same name)
+    if(task["name"] not in names):
+        names[task["name"]] = len(tasks)
+        task["pairs"] = []
+        tasks.append(task)
+    tasks[names[task["name"]]]["pairs"].append(p)
+    
+def fused_tasks(indices_o, nb_shares, sweep, nb_inputs, copy, comp):
+    tasks = []
+    sets = []
+    ids = dict()
+    names = dict()
+    nb = 4 if ((nb_inputs > 1) and not(comp)) else 1
+    #With several values of t, the names of the tasks are prefixed by their value of t
+    prefixed = (len(set([t for (t, t_output) in sweep])) > 1)
+    
+    for (p, (t, t_output)) in enumerate(sweep):
+        prefix = (".t" + str(t)) if prefixed else ""
+        
+        #RPE1 (or RPC) : one task per output combination of size t (or t_output)
+        if(t_output):
+            tp = t_output
+        else:
+            tp = t
+        if(copy):
+            out_combs = [np.concatenate((o1, o2)) for o1 in combs(indices_o[0], tp) for o2 in combs(indices_o[1], tp)]
+        else:
+            out_combs = combs(indices_o, tp)
+        prop = "comp" if comp else "exp1"
+        for list_out in out_combs:
+            fused_task(tasks, names, p, {"prop": prop, "t": t, "name": prefix + (".rpc.out" if comp else ".exp1.out") + "-".join([str(o) for o in list_out]), "sets": [fused_set(sets, ids, list_out)], "eliminate": False, "nb": nb})
+        if(comp):
+            continue
+            
+        #RPE2 : one task for all the output combinations of size (nb_shares - 1)
+        if(copy):
+            out_combs = [np.concatenate((o1, o2)) for o1 in combs(indices_o[0], nb_shares - 1) for o2 in combs(indices_o[1], nb_shares - 1)]
+        else:
+            out_combs = combs(indices_o, nb_shares - 1)
+        fused_task(tasks, names, p, {"prop": "exp2", "t": t, "name": prefix + ".exp2", "sets": [fused_set(sets, ids, list_out) for list_out in out_combs], "eliminate": False, "nb": nb})
+        
+        #Copy 12 and 21 : one task per tuple of size t of output bit, for all the tuples of size (nb_shares - 1) of output (1-bit)
+        if(copy):
+            for bit in [0, 1]:
+                out_combs2 = combs(indices_o[1-bit], nb_shares - 1)
+                for list_out1 in combs(indices_o[bit], t):
+                    fused_task(tasks, names, p, {"prop": "copy12_" + str(bit), "t": t, "name": prefix + ".copy12.out" + "-".join([str(o) for o in list_out1]), "sets": [fused_set(sets, ids, np.concatenate((list_out1, list_out2))) for list_out2 in out_combs2], "eliminate": True, "nb": 1})
+    
+    #Rows of the coefficients of each task, and tasks using each set of output shares
+    rows = 0
+    set_tasks = [[] for out in sets]
+    for (k, task) in enumerate(tasks):
+        task["rows"] = rows
+        rows += task["nb"]
+        for s in task["sets"]:
+            set_tasks[s].append(k)
+    return tasks, sets, set_tasks
+
+
+####################### Batch of tuples of size i #######################
+def random_probing_exp_fused_batch(weights, exps, secret_deps, random_deps, nb_occs, nb_inputs, i, sets, secret_deps_sets, set_tasks, tasks, indexes, verbosity, list_tuples):
+    nb_wires = len(exps)
+    nb_occ = int(np.sum(nb_occs))
+    nb = len(list_tuples)
+    coeffs = np.zeros((tasks[-1]["rows"] + tasks[-1]["nb"], nb_occ+1), dtype=coeff_dtype(nb_occ))
+    
+    ########## Compute binary value and secret dependencies for each tuple in list_tuples
+    sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
+    secret_deps_in = np.bitwise_or.reduce(secret_deps[list_tuples, :], axis=1, dtype=np.uint)
+    
+    #####################################  Eliminating Non-Incompressible Tuples  #####################################
+    #alive : tuples verified by each task, failure : the ones which are failure tuples with all the sets of output shares of the task verified so far
+    alive = []
+    for index in indexes:
+        if(index["size"] != 0):
+            alive.append(~eliminate_from_smaller(index, sums))
+        else:
+            alive.append(np.ones(nb, dtype=bool))
+    failure = [np.copy(a) for a in alive]
+    if(nb_inputs > 1):
+        failure_I1 = [np.copy(a) for a in alive];  failure_I2 = [np.copy(a) for a in alive]
+    verified = np.zeros(len(tasks), dtype=bool)
+    
+    #####################################  Iterating Over the distinct sets of output shares  #####################################
+    #A task which has no failure tuple left after one of its sets does not need the next ones. The rules are applied once for each value of t of the tasks using the set (the passes of the rules depend on t)
+    buffer = np.empty((nb, i + max([len(out) for out in sets])), dtype=np.result_type(list_tuples, *sets))
+    buffer[:, :i] = list_tuples
+    for (s, out) in enumerate(sets):
+        for t in sorted(set([tasks[k]["t"] for k in set_tasks[s]])):
+            users = [k for k in set_tasks[s] if (tasks[k]["t"] == t) and (not(verified[k]) or failure[k].any())]
+            if(len(users) == 0):
+                continue
+            verified[users] = True
+            positions = np.flatnonzero(np.logical_or.reduce([alive[k] for k in users]))
+            if(len(positions) == 0):
+                continue
+                
+            if(verbosity == 2):
+                print("********************************************")
+            
+            ########## Adding the output shares to each tuple
+            buffer[:, i:i+len(out)] = out
+            rows = buffer[:, :i+len(out)]
+            if(len(positions) < nb):
+                rows = rows[positions]
+            
+            #####################################  Apply Probing Rules (1, 2, 3 and 4)  #####################################
+            list_tuples_sub, positions_sub, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(rows, secret_deps, random_deps, exps, None, positions, i+1, None, t=t, verbosity=verbosity, secret_deps_tuple=secret_deps_in[positions] | secret_deps_sets[s])
+            
+            ########### Eliminating from the failure tuples of the tasks, the ones that are not failure tuples for this set of output shares
+            verdict = np.zeros(nb, dtype=bool)
+            verdict[positions_sub] = True
+            if(nb_inputs > 1):
+                verdict_I1 = np.zeros(nb, dtype=bool);  verdict_I2 = np.zeros(nb, dtype=bool)
+                if(len(positions_sub) > 0):
+                    secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples_sub, :], axis=1, dtype=np.uint)
+                    mask_I1, mask_I2 = classify_rule_1(secret_deps_tuple, t);    del secret_deps_tuple
+                    verdict_I1[positions_sub[mask_I1]] = True
+                    verdict_I2[positions_sub[mask_I2]] = True
+                    del mask_I1;  del mask_I2
+            for k in users:
+                failure[k] &= verdict
+                if(nb_inputs > 1):
+                    failure_I1[k] &= verdict_I1;  failure_I2[k] &= verdict_I2
+            
+            del list_tuples_sub;  del positions_sub
+            ########### To delete added wires from the application of rule 3
+            secret_deps = secret_deps[:nb_wires, :]
+    #####################################  Done Iterating Over the distinct sets of output shares  #####################################
+    
+    #####################################  Updating Coefficients  #####################################
+    #The eliminated tuples are failure tuples (tasks of the copy functions), the failure tuples found by the rules eliminate the larger tuples
+    if(verbosity == 2):
+        print("Updating c coefficients...")
+    flawed = []
+    for (k, task) in enumerate(tasks):
+        if(task["nb"] > 1):
+            masks = [failure_I1[k], failure_I2[k], failure_I1[k] & failure_I2[k], failure[k]]
+        else:
+            masks = [failure[k] | ~alive[k]]
+        for (r, mask) in enumerate(masks):
+            update_coeff_c(coeffs[task["rows"] + r], nb_occs[list_tuples[mask]])
+        flawed.append(sums[failure[k]] if task["eliminate"] else None)
+    
+    return coeffs, flawed
+
+
+####################### Batching Version #######################
+def verification_random_probing_exp_fused(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, copy = False, t_output = None, jobs = 1, sweep = None, comp = False):
+    #sweep : list of the couples (t, t_output) to verify, the results are returned for each couple
+    for (t_, t_output_) in (sweep if sweep else [(t, t_output)]):
+        if(t_ >= nb_shares):
+            print("t (= " + str(t_) +  ") >= nb_shares (= " + str(nb_shares) + ")")
+            exit()
+        if((t_output_) and (t_output_ >= nb_shares)):
+            print("t_output (= " + str(t_output_) +  ") >= nb_shares (= " + str(nb_shares) + ")")
+            exit()
+    if((len(secret_deps[0]) != 1) and (len(secret_deps[0]) != 2)) :
+        print("Not applicable yet, not 1 or 2 inputs\n")
+        exit()
+        
+    nb_inputs = len(secret_deps[0])
+    nb_occ = int(np.sum(nb_occs))
+    batch_size = BATCH_SIZE
+    
+    tasks, sets, set_tasks = fused_tasks(indices_o, nb_shares, sweep if sweep else [(t, t_output)], nb_inputs, copy, comp)
+    secret_deps_sets = [np.bitwise_or.reduce(secret_deps[out, :], axis=0, dtype=np.uint) for out in sets]
+    if(verbosity >= 1):
+        print(str(len(tasks)) + " tasks, " + str(len(sets)) + " distinct sets of output shares")
+    
+    #Coefficients of all the tasks (rows task["rows"] to task["rows"] + task["nb"] - 1 for each task)
+    coeffs = np.zeros((tasks[-1]["rows"] + tasks[-1]["nb"], nb_occ+1), dtype=coeff_dtype(nb_occ))
+    list_int_prev_flawed = [np.zeros((0, weights.shape[1]), dtype=np.uint64) for task in tasks]
+    
+    #####################################  Merging the partial coefficients of the shards  #####################################
+    merged = shard_merged("fused")
+    if(merged is not None):
+        return fused_results(tasks, merged, copy, comp, sweep, verbosity)
+    
+    #####################################  Resuming from the last checkpoint or from the cached levels  #####################################
+    #The levels are cached for each task under the name of its own verification loop, the verification resumes after the last level cached for all the tasks
+    i_start = 1
+    state = checkpoint_load(".fused")
+    if(state is None):
+        states = [result_cache_load(task["name"], coeff_max) for task in tasks]
+        if(all([s is not None for s in states])):
+            n = min([int(s["i"]) for s in states]) - 1
+            states = [result_cache_load(task["name"], n) for task in tasks]
+            state = {"i": n+1, "b": 0}
+            for (k, (task, s)) in enumerate(zip(tasks, states)):
+                for (r, key) in enumerate(fused_keys(task)):
+                    state["coeff_c_" + str(task["rows"] + r)] = s[key]
+                state["list_int_prev_flawed_" + str(k)] = s["list_int_prev_flawed"]
+                state["list_int_prev_flawed_tmp_" + str(k)] = s["list_int_prev_flawed_tmp"]
+    if(state is not None):
+        for r in range(len(coeffs)):
+            coeffs[r] = coeff_restore(state["coeff_c_" + str(r)])
+        list_int_prev_flawed = [state["list_int_prev_flawed_" + str(k)] for k in range(len(tasks))]
+        i_start = int(state["i"])
+    indexes = [subset_index(f) for f in list_int_prev_flawed]
+    last_save = time.time()
+    
+    #####################################  Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+    eliminate = any([task["eliminate"] for task in tasks])
+    for i in range(i_start, coeff_max+1):
+        if(verbosity == 2):
+            print ("\n\nTransform tuples in list elements..")
+        
+        list_int_prev_flawed_tmp = [np.zeros((0, weights.shape[1]), dtype=np.uint64) for task in tasks]
+        b_start = 0
+        if((state is not None) and (i == i_start)):
+            list_int_prev_flawed_tmp = [state["list_int_prev_flawed_tmp_" + str(k)] for k in range(len(tasks))]
+            b_start = int(state["b"])
+        nb_b = -(-int(binomial(len(indices), i)) // batch_size)
+        #With the copy functions, every shard verifies all the tuples of size smaller than coeff_max (their flawed tuples are needed to eliminate the larger tuples), but only shard 0 counts them. Otherwise the tuples of each size are split
+        split = (i == coeff_max) or not(eliminate)
+        count = split or (shard.SHARD[0] == 0)
+        numbers = shard_batches(nb_b, b_start, i, split)
+        batches = combs_batches(indices, i, batch_size, numbers, reuse = (jobs == 1))
+        
+        if(verbosity >= 1):
+            print ('\n   ***   '+str(i)+"-uples : " + str(binomial(len(indices), i)))
+        
+        #####################################  BATCHING  #####################################
+        #Batches of a same size i only share the flawed tuples of smaller sizes, they are processed by jobs workers and merged in order
+        shared_args = (weights, exps, secret_deps, random_deps, nb_occs, nb_inputs, i, sets, secret_deps_sets, set_tasks, tasks, indexes, verbosity)
+        if(jobs > 1):
+            results = pool_map(random_probing_exp_fused_batch, shared_args, ((list_tuples,) for list_tuples in batches), jobs)
+        else:
+            results = (random_probing_exp_fused_batch(*(shared_args + (list_tuples,))) for list_tuples in batches)
+        
+        for (b, (coeffs_batch, flawed)) in zip(numbers, results):
+            if(verbosity >= 1):
+                print("----------- Batch " + str(b+1) + "/" + str(nb_b) + " -----------")
+                
+            if(count):
+                coeffs += coeffs_batch
+            for (k, sums) in enumerate(flawed):
+                if(sums is not None):
+                    list_int_prev_flawed_tmp[k] = np.append(list_int_prev_flawed_tmp[k], sums, 0)
+            del coeffs_batch;  del flawed
+            
+            if(checkpoint_due(last_save)):
+                checkpoint_save(".fused", fused_state(i, b+1, coeffs, list_int_prev_flawed, list_int_prev_flawed_tmp))
+                last_save = time.time()
+        
+        #####################################  Done BATCHING  #####################################
+        
+        for k in range(len(tasks)):
+            list_int_prev_flawed[k] = np.append(list_int_prev_flawed[k], list_int_prev_flawed_tmp[k], 0)
+            indexes[k] = subset_index(list_int_prev_flawed[k])
+        for (k, task) in enumerate(tasks):
+            level = {key: coeff_store(coeffs[task["rows"] + r]) for (r, key) in enumerate(fused_keys(task))}
+            level["list_int_prev_flawed"] = list_int_prev_flawed[k]
+            result_cache_save(task["name"], i, level)
+    
+    #####################################  Done Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
+    if(i_start <= coeff_max):
+        checkpoint_save(".fused", fused_state(coeff_max+1, 0, coeffs, list_int_prev_flawed, [f[:0] for f in list_int_prev_flawed]))
+    if(shard.SHARD_OUTPUT is not None):
+        shard_record("fused", coeffs)
+    return fused_results(tasks, coeffs, copy, comp, sweep, verbosity)
+
+
+####################### State of the verification (checkpoints) #######################
+def fused_state(i, b, coeffs, list_int_prev_flawed, list_int_prev_flawed_tmp):
+    state = {"i": i, "b": b}
+    for r in range(len(coeffs)):
+        state["coeff_c_" + str(r)] = coeff_store(coeffs[r])
+    for k in range(len(list_int_prev_flawed)):
+        state["list_int_prev_flawed_" + str(k)] = list_int_prev_flawed[k]
+        state["list_int_prev_flawed_tmp_" + str(k)] = list_int_prev_flawed_tmp[k]
+    return state
+
+
+####################### Coefficients of each property (maximum over its tasks), for each couple (t, t_output) #######################
+def fused_results(tasks, coeffs, copy, comp, sweep, verbosity):
+    results = [dict() for p in (sweep if sweep else [None])]
+    for task in tasks:
+        c = coeffs[task["rows"]:task["rows"] + task["nb"]]
+        for p in task["pairs"]:
+            if(task["prop"] in results[p]):
+                results[p][task["prop"]] = np.maximum(results[p][task["prop"]], c)
+            else:
+                results[p][task["prop"]] = c
+    
+    for (p, result) in enumerate(results):
+        for prop in result:
+            if(verbosity == 2):
+                for (key, c) in zip(fused_keys({"nb": len(result[prop])}), result[prop]):
+                    print("MAX " + prop + " " + key + " : " + str(c.tolist()) + ((" (t = " + str(sweep[p][0]) + ", t_output = " + str(sweep[p][1]) + ")") if sweep else ""))
+            if(len(result[prop]) > 1):
+                result[prop] = tuple([c.tolist() for c in result[prop]])
+            else:
+                result[prop] = result[prop][0].tolist()
+        
+        if(comp):
+            results[p] = result["comp"]
+        elif(copy):
+            results[p] = (result["exp1"], result["exp2"], result["copy12_0"], result["copy12_1"])
+        else:
+            results[p] = (result["exp1"], result["exp2"])
+    
+    if(sweep):
+        return results
+    return results[0]
\ No newline at end of file
@@ -31,8 +31,16 @@
 
 import numpy as np
 import time
-import math
-import itertools
+from math import comb as binomial
+from .verification_rules import BATCH_SIZE, apply_all_rules, combs_batches, extends_count, extends_batches
+from .coefficients import coeff_zeros, coeff_store, coeff_restore, update_coeff_c, update_coeff_c_all
+from .elimination import row_keys, subset_index, eliminate_from_smaller
+from .checkpoint import checkpoint_due, checkpoint_load, checkpoint_save
+from .result_cache import result_cache_load, result_cache_save
+from .parallel import pool_map
+from . import shard
+from .shard import shard_batches, shard_merged, shard_record
+from .symmetry import symmetry_group, symmetry_reduce, symmetry_orbits, symmetry_masks
 
 ##############################################################################
 #
@@ -42,100 +50,188 @@ import itertools
 #
 ##############################################################################
 
+####################### Batch of tuples of size i #######################
+def random_probing_batch(weights, exps, secret_deps, random_deps, nb_occs, nb_shares, i, index_prev_flawed, verbosity, apriori, list_tuples):
+
+    nb_occ = int(np.sum(nb_occs))
+    coeff_c = coeff_zeros(nb_occ)
+    val_max = (1<<nb_shares) - 1
+
+    #With symmetries, only the canonical tuples are verified, weighted by the sizes of their orbits
+    group = symmetry_group()
+    list_tuples, orbits = symmetry_reduce(list_tuples, group)
+
+    #Compute binary value for each tuple in list_tuples
+    sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
+
+    #####################################  Eliminating Non-Incompressible Tuples  #####################################
+    if(index_prev_flawed["size"] != 0):
+        start = time.time()
+
+        e = eliminate_from_smaller(index_prev_flawed, sums)
+
+        end = time.time()
+        if(verbosity == 2):
+            print("Time to eliminate = " + str(end-start)+ " seconds")
+
+        list_tuples_flawed = list_tuples[e, :]
+        nb_occ_tuple_flawed = nb_occs[list_tuples_flawed]
+
+        if(verbosity == 2):
+            print( "Eliminated : " + str(len(list_tuples_flawed)) + " tuples")
+
+        list_tuples = list_tuples[~e, :]
+        sums = sums[~e]
+
+        if(not apriori):
+            update_coeff_c(coeff_c,nb_occ_tuple_flawed, orbits[e])
+        del list_tuples_flawed
+        del e
+        del nb_occ_tuple_flawed
+
+        if(len(list_tuples) == 0):
+            return coeff_c, sums, (list_tuples if apriori else None)
+    #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
+
+    nb_occs_tuple = nb_occs[list_tuples]
+    candidates = np.copy(list_tuples) if apriori else None
+    candidates_keys = row_keys(sums) if apriori else None
+
+    #####################################  Apply Probing Rules (1, 2, 3 and 4)  #####################################
+    list_tuples, sums, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples, secret_deps, random_deps, exps, nb_occs_tuple, sums, i, val_max, t = None, verbosity=verbosity)
+
+    if(verbosity > 1):
+        print("Updating c coefficients...")
+
+    #####################################  Updating Coefficients  #####################################
+    #With apriori, all the tuples of size i are already counted as failure tuples, the secure tuples are subtracted and extended at the next size
+    if(apriori):
+        secure = candidates[~np.isin(candidates_keys, row_keys(sums))]
+        coeff_c_secure = coeff_zeros(nb_occ)
+        update_coeff_c(coeff_c_secure, nb_occs[secure])
+        coeff_c -= coeff_c_secure
+        return coeff_c, sums, secure
+
+    update_coeff_c(coeff_c, nb_occs_tuple, symmetry_orbits(l, group))
+
+    return coeff_c, sums, None
+
+
 ####################### Batching Version #######################
-def verification_random_probing(indices, weights, exps, exps_str, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, verbosity):
+def verification_random_probing(indices, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, verbosity, jobs = 1, apriori = False):
 
     nb_occ = int(np.sum(nb_occs))
-    coeff_c = np.zeros(nb_occ+1).tolist()
-    nb_wires = len(exps)
+    coeff_c = coeff_zeros(nb_occ)
 
-    list_int_prev_flawed = np.asarray([], dtype="int64")
-    val_max = (1<<nb_shares) - 1
+    list_int_prev_flawed = np.zeros((0, weights.shape[1]), dtype=np.uint64)
+    
+    #With apriori, the tuples of size i are only the extensions of the secure tuples of size i-1 (list_secure), all the tuples of size i
+    #are counted as failure tuples and the secure ones are subtracted. All the tuples are enumerated when list_secure is not known
+    list_secure = None
     
     batch_size = BATCH_SIZE
 
+    #####################################  Merging the partial coefficients of the shards  #####################################
+    merged = shard_merged("rp")
+    if(merged is not None):
+        return merged.tolist()
+
+    #####################################  Resuming from the last checkpoint or from the cached levels  #####################################
+    i_start = 1
+    state = checkpoint_load(".rp")
+    if(state is None):
+        state = result_cache_load(".rp", coeff_max)
+    if(state is not None):
+        coeff_c[:] = coeff_restore(state["coeff_c"])
+        list_int_prev_flawed = state["list_int_prev_flawed"]
+        if(apriori and ("list_secure" in state)):
+            list_secure = state["list_secure"]
+        i_start = int(state["i"])
+    index_prev_flawed = subset_index(list_int_prev_flawed)
+    last_save = time.time()
+
     #####################################  Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
-    for i in range(1, coeff_max+1):
+    for i in range(i_start, coeff_max+1):
         if(verbosity > 0):
             print ("\n\nTransform tuples in list elements..")
             
-        list_tuples_orig = itertools.combinations(indices, i)
-        
         if(verbosity >= 1):
                 print ('\n   ***   '+str(i)+"-uples : " + str(binomial(len(indices), i)))
                 
-        list_int_prev_flawed_tmp = np.asarray([], dtype="int64")
-        list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-        nb_b = (binomial(len(indices), i)//batch_size)+1
-        b = 0
+        list_int_prev_flawed_tmp = np.zeros((0, weights.shape[1]), dtype=np.uint64)
+        list_secure_tmp = np.zeros((0, i), dtype=indices.dtype)
+        b_start = 0
+        if((state is not None) and (i == i_start)):
+            list_int_prev_flawed_tmp = state["list_int_prev_flawed_tmp"]
+            if(apriori and ("list_secure_tmp" in state)):
+                list_secure_tmp = state["list_secure_tmp"]
+            b_start = int(state["b"])
+        if(list_secure is not None):
+            nb_b = -(-extends_count(indices, list_secure) // batch_size)
+        else:
+            nb_b = -(-int(binomial(len(indices), i)) // batch_size)
+        #Every shard verifies all the tuples of size smaller than coeff_max (their flawed tuples are needed to eliminate the larger tuples), but only shard 0 counts them
+        count = (i == coeff_max) or (shard.SHARD[0] == 0)
+        numbers = shard_batches(nb_b, b_start, 0, (i == coeff_max))
+        if(list_secure is not None):
+            batches = extends_batches(indices, list_secure, batch_size, numbers)
+        else:
+            batches = combs_batches(indices, i, batch_size, numbers, reuse = (jobs == 1))
+        if(apriori and (b_start == 0)):
+            update_coeff_c_all(coeff_c, nb_occs[indices], i)
+
         #####################################  BATCHING  #####################################
-        while(len(list_tuples) != 0):            
-            b += 1
+        #Batches of a same size i only share the flawed tuples of smaller sizes, they are processed by jobs workers and merged in order
+        shared_args = (weights, exps, secret_deps, random_deps, nb_occs, nb_shares, i, index_prev_flawed, verbosity, apriori)
+        if(jobs > 1):
+            results = pool_map(random_probing_batch, shared_args, ((list_tuples,) for list_tuples in batches), jobs)
+        else:
+            results = (random_probing_batch(*(shared_args + (list_tuples,))) for list_tuples in batches)
+
+        for (b, (coeff_c_batch, sums, secure)) in zip(numbers, results):
             if(verbosity >= 1):
-                print("----------- Batch " + str(b) + "/" + str(nb_b) + " -----------")
-        
-            #Compute binary value for each tuple in list_tuples
-            sums = np.bitwise_or.reduce(weights[list_tuples], axis=1)
-            
-            #####################################  Eliminating Non-Incompressible Tuples  #####################################
-            if(list_int_prev_flawed.size != 0):
-                start = time.time()
-                
-                e = eliminate_from_smaller(list_int_prev_flawed, sums, nb_wires)
-                
-                end = time.time()
-                if(verbosity == 2):
-                    print("Time to eliminate = " + str(end-start)+ " seconds")
-    
-                list_tuples_flawed = list_tuples[e, :]
-                nb_occ_tuple_flawed = nb_occs[list_tuples_flawed].tolist()
-                
-                if(verbosity == 2):
-                    print( "Eliminated : " + str(len(list_tuples_flawed)) + " tuples")
-                    
-                list_tuples = list_tuples[~e, :]
-                sums = sums[~e]
-    
-                update_coeff_c(coeff_c,nb_occ_tuple_flawed)
-                del list_tuples_flawed
-                del e
-                del nb_occ_tuple_flawed
-                
-                if(len(list_tuples) == 0):
-                    if(verbosity == 2):
-                        print("coefficients c :" + str(coeff_c))
-                    list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-                    continue
-            #####################################  Done Eliminating Non-Incompressible Tuples  #####################################
-    
-            nb_occs_tuple = nb_occs[list_tuples]
-    
-            #####################################  Apply Probing Rules (1, 2, 3 and 4)  #####################################
-            list_tuples, sums, nb_occs_tuple, secret_deps, l, time4, time3 = apply_all_rules(list_tuples, secret_deps, random_deps, exps, exps_str, nb_occs_tuple, sums, i, val_max, t = None, verbosity=verbosity)
-    
-            secret_deps = secret_deps[:nb_wires, :]
-            
-            if(verbosity > 1):
-                print("Updating c coefficients...")
-                
-#            print("coeff = " + str(i))
-#            print(str(exps_str[l]))
-                
-            #####################################  Updating Coefficients  #####################################
-            update_coeff_c(coeff_c, nb_occs_tuple.tolist())
-            
+                print("----------- Batch " + str(b+1) + "/" + str(nb_b) + " -----------")
+
+            if(count):
+                coeff_c += coeff_c_batch
+
             if(verbosity == 2):
-                print("coefficients c :" + str(coeff_c))	
-    
-            list_int_prev_flawed_tmp = np.append(list_int_prev_flawed_tmp, sums)
+                print("coefficients c :" + str(coeff_c.tolist()))
+
+            list_int_prev_flawed_tmp = np.append(list_int_prev_flawed_tmp, sums, 0)
             del sums
-            
-            list_tuples = np.asarray(list(itertools.islice(list_tuples_orig, 0, batch_size)))
-            
+            if(apriori):
+                list_secure_tmp = np.append(list_secure_tmp, secure, 0)
+            del secure
+
+            if(checkpoint_due(last_save)):
+                checkpoint = {"i": i, "b": b+1, "coeff_c": coeff_store(coeff_c), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed_tmp}
+                if(apriori):
+                    checkpoint["list_secure_tmp"] = list_secure_tmp
+                    if(list_secure is not None):
+                        checkpoint["list_secure"] = list_secure
+                checkpoint_save(".rp", checkpoint)
+                last_save = time.time()
+
         #####################################  Done BATCHING  #####################################
             
-        list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp) 
+        #The images of the flawed canonical tuples are flawed
+        list_int_prev_flawed_tmp = symmetry_masks(list_int_prev_flawed_tmp, symmetry_group())
+        list_int_prev_flawed = np.append(list_int_prev_flawed, list_int_prev_flawed_tmp, 0) 
+        index_prev_flawed = subset_index(list_int_prev_flawed)
+        level = {"coeff_c": coeff_store(coeff_c), "list_int_prev_flawed": list_int_prev_flawed}
+        if(apriori):
+            list_secure = list_secure_tmp
+            level["list_secure"] = list_secure
+        result_cache_save(".rp", i, level)
         
     #####################################  Done Iterating Over Tuples of hamming weight 1 to coeff_max  #####################################
-        
-    return coeff_c
\ No newline at end of file
+    
+    if(i_start <= coeff_max):
+        checkpoint = {"i": coeff_max+1, "b": 0, "coeff_c": coeff_store(coeff_c), "list_int_prev_flawed": list_int_prev_flawed, "list_int_prev_flawed_tmp": list_int_prev_flawed[:0]}
+        if(list_secure is not None):
+            checkpoint["list_secure"] = list_secure
+        checkpoint_save(".rp", checkpoint)
+    if(shard.SHARD_OUTPUT is not None):
+        shard_record("rp", coeff_c)
+    return coeff_c.tolist()
\ No newline at end of file
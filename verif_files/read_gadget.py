@@ -30,6 +30,7 @@
 ###############################################################################
 
 import numpy as np
+from .anf import anf_encode, anf_poly_var, anf_poly_const, anf_poly_add, anf_poly_mul, anf_poly_variables, anf_poly_str
 
 ##############################################################################
 #
@@ -38,6 +39,9 @@ import numpy as np
 # 	INPUTS:
 #		- circuit_file: pseudo-code
 #
+#		- dump: also write the rewritten pseudo-code in the file
+#           sage_tmp1.sage (for debugging)
+#
 #	OUTPUT:
 #		- rewritten pseudo-code such that each instruction output is unique
 #			and random variables names end with '_', along with the 
@@ -45,57 +49,45 @@ import numpy as np
 #
 ##############################################################################
 
-def compute_input_file(circuit_file, verbosity):
-    #result output circuit file after modification
-    output_circuit = open("sage_tmp1.sage", "w")
-    
-    output_pol_ring = open("sage_tmp2.sage", "w")
-    output_pol_ring.write('P.<')
+def compute_input_file(circuit_file, verbosity, dump = False):
+    #result output circuit after modification (kept in memory)
+    output_circuit = []
     
     f1 = open(circuit_file)
     lines = f1.readlines()
     f1.close()
     
+    order = None
     if("ORDER" in lines[0]):
+        order = int(lines[0].split()[1])
         lines = lines[1:]
     
     #Copying first 5 files for ORDER, SHARES, IN, RANDOMS, OUT in the specified order
-    output_circuit.write(lines[0])  #SHARES  
+    output_circuit.append(lines[0])  #SHARES  
     nb_shares = int(lines[0].split()[1])
     
-    output_circuit.write(lines[1])  #IN
-    
-    #Writing Sage_tmp2 File for polynomial Ring
-    varss = lines[1].split()[1:]
-    for v in varss:
-        for i in range(nb_shares):
-            output_pol_ring.write(v+str(i)+",")
+    output_circuit.append(lines[1])  #IN
     
     #RANDOMS with _
     args = lines[2].split()
-    output_circuit.write(args[0])
+    output_circuit.append(args[0])
     randoms = []
     randoms_dict = dict()
     tmp = 0
     for r in args[1:-1]:
-        output_circuit.write(" r"+str(tmp)+"_")
-        output_pol_ring.write("r"+str(tmp)+"_,")
+        output_circuit.append(" r"+str(tmp)+"_")
         randoms.append("r"+str(tmp)+"_")
         randoms_dict[r] = "r"+str(tmp)+"_"
         tmp += 1
     
     ri = args[-1]
-    output_circuit.write(" r"+str(tmp)+"_")
-    output_pol_ring.write("r"+str(tmp)+"_")
+    output_circuit.append(" r"+str(tmp)+"_")
     randoms.append("r"+str(tmp)+"_")
     randoms_dict[ri] = "r"+str(tmp)+"_"
     tmp += 1
-    output_circuit.write("\n")
+    output_circuit.append("\n")
     
-    output_circuit.write(lines[3])  #OUT
-    #Finishing file sage_tmp2
-    output_pol_ring.write('>=BooleanPolynomialRing()')
-    output_pol_ring.close()
+    output_circuit.append(lines[3])  #OUT
     
     output_letters = lines[3].split()[1:]
     
@@ -176,19 +168,26 @@ def compute_input_file(circuit_file, verbosity):
         new_lines.insert(0, " ".join(new_line))
         
     for line in new_lines:
-        output_circuit.write(line)
+        output_circuit.append(line)
+    circuit = "".join(output_circuit).splitlines(True)
 
-    output_circuit.close()
-    
-    if(verbosity > 0):
-        print ("Succesfully Created sage_tmp1 and sage_tmp2 intermediate files !\n")
+    if(dump):
+        f = open("sage_tmp1.sage", "w")
+        f.writelines(circuit)
+        f.close()
+        if(verbosity > 0):
+            print ("Succesfully Created sage_tmp1 intermediate file !\n")
     
-    return generate_list_inv_var_from_file()
+    return generate_list_inv_var(circuit, order)
     
 
 ##############################################################################
 #
-# generate_list_inv_var_from_file
+# generate_list_inv_var
+#
+# 	INPUTS:
+#		- lines: rewritten pseudo-code (lines of the circuit computed by
+#           compute_input_file)
 #
 #	OUTPUT:
 #		- returns the list of descriptions for each variable
@@ -197,11 +196,7 @@ def compute_input_file(circuit_file, verbosity):
 #       nb_occurrences, binary_repr, nb_variables]
 #
 ##############################################################################
-def generate_list_inv_var_from_file():
-    # load file
-    load("sage_tmp2.sage")
-    load("sage_tmp1.sage")
-
+def generate_list_inv_var(lines, order):
     dict_int_var = dict()
     dict_out_var = dict()
     list_int_var = []
@@ -210,10 +205,6 @@ def generate_list_inv_var_from_file():
     list_random_var = []
     count_int_var = 1   #This is for the binary representation of each wire in the tuples
     
-    f = open("sage_tmp1.sage")
-    lines = f.readlines()
-    f.close()
-        
     nb_shares = int(lines[0].split()[1])    #SHARES
     
     #Adding Input Variables
@@ -224,6 +215,10 @@ def generate_list_inv_var_from_file():
     for r in rands:
         list_random_var.append(r)
         
+    #Variables of the polynomial ring (shares of the inputs, then random variables) and their values
+    names = [v+str(i) for v in varss for i in range(nb_shares)] + rands
+    polys = dict([(names[k], anf_poly_var(k)) for k in range(len(names))])
+        
         
     #Adding Random Variables
     index = 0
@@ -231,7 +226,7 @@ def generate_list_inv_var_from_file():
         secret_dep = [0 for i in range(len(list_secret_var))]
         random_dep = [0 for i in range(len(list_random_var))]
         random_dep[index] = 1
-        dict_int_var[r] = [str(eval(r)), secret_dep, random_dep, 0, count_int_var, 1]
+        dict_int_var[r] = [r, secret_dep, random_dep, 0, count_int_var, 1]
         count_int_var = count_int_var << 1
         index += 1
     Nrand = len(rands)
@@ -242,7 +237,7 @@ def generate_list_inv_var_from_file():
             random_dep = [0 for j in range(len(list_random_var))]
             sh = v+str(i)
             secret_dep[index] = (1 << int(i))
-            dict_int_var[sh] = [str(eval(sh)), secret_dep, random_dep, 0, count_int_var, 1]
+            dict_int_var[sh] = [sh, secret_dep, random_dep, 0, count_int_var, 1]
             count_int_var = count_int_var << 1
         index += 1
         
@@ -259,7 +254,9 @@ def generate_list_inv_var_from_file():
         args = line.split()
         Nadd += line.count("+")
         Nmult += line.count("*")
-        expression = eval(args[0])
+        expression = eval_instruction(args[2:], polys)
+        polys[args[0]] = expression
+        exp_str = anf_poly_str(expression, names)
         token_index = 1
         while(token_index < len(args)):
             token_index += 1
@@ -271,24 +268,24 @@ def generate_list_inv_var_from_file():
         secret_dep = [0 for i in range(len(list_secret_var))]
         random_dep = [0 for i in range(len(list_random_var))]
         nb_var = 0
-        for v in expression.variables():
-            stri = str(v)
+        for v in anf_poly_variables(expression):
+            stri = names[v]
             nb_var += 1
             try:
                 index = list_random_var.index(stri)
-                if(str(expression+eval(list_random_var[index])).count(list_random_var[index])==0):
+                if(anf_poly_str(anf_poly_add(expression, polys[stri]), names).count(list_random_var[index])==0):
                     random_dep[index] = 1
-                elif(str(expression).count(list_random_var[index]) >= 1):
+                elif(exp_str.count(list_random_var[index]) >= 1):
                     random_dep[index] = 2
             except:
                 index = list_secret_var.index(stri[0])
                 secret_dep[index] += (1 << int(stri[1:]))
             
         if(args[0][0] in outs):
-            dict_out_var[args[0]] = [str(expression), secret_dep, random_dep, 0, 0, nb_var]
+            dict_out_var[args[0]] = [exp_str, secret_dep, random_dep, 0, 0, nb_var]
             #count_int_var = count_int_var << 1
         else:
-            dict_int_var[args[0]] = [str(expression), secret_dep, random_dep, 0, count_int_var, nb_var]
+            dict_int_var[args[0]] = [exp_str, secret_dep, random_dep, 0, count_int_var, nb_var]
             count_int_var = count_int_var << 1
             
     Ncopy = 0
@@ -296,13 +293,13 @@ def generate_list_inv_var_from_file():
         if(y[3] > 1):
             Ncopy += (y[3] - 1)
             y[3] = 2*y[3] - 1
-        list_int_var.append((x, eval(y[0]), y[1], y[2], y[3], y[4], y[5]))
+        list_int_var.append((x, y[0], y[1], y[2], y[3], y[4], y[5]))
         
     for v in outs:
         shares = []
         for i in range(nb_shares):
             value = dict_out_var[v+str(i)]
-            shares.append((v+str(i), eval(value[0]), value[1], value[2], value[3], count_int_var, value[4]))
+            shares.append((v+str(i), value[0], value[1], value[2], value[3], count_int_var, value[4]))
             count_int_var = count_int_var << 1
                             
         list_out_var.append(shares)
@@ -312,6 +309,23 @@ def generate_list_inv_var_from_file():
     return (order,nb_shares,list_int_var,list_out_var, complexity)
     
 
+#################### Value of the right-hand side of an instruction (sum of products of variables and constants) ####################
+def eval_instruction(tokens, polys):
+    res = anf_poly_const(0)
+    for k in range(0, len(tokens), 2):
+        if(tokens[k] in polys):
+            val = polys[tokens[k]]
+        else:
+            val = anf_poly_const(int(tokens[k]))
+        if((k == 0) or (tokens[k-1] == "+")):
+            prod = val
+        else:
+            prod = anf_poly_mul(prod, val)
+        if((k == len(tokens)-1) or (tokens[k+1] == "+")):
+            res = anf_poly_add(res, prod)
+    return res
+    
+
 def write_exps_file(list_int_var, list_out_var):
     f = open("sage_tmp2_exps.sage", "w")
     
@@ -324,14 +338,16 @@ def write_exps_file(list_int_var, list_out_var):
 
     f.close()
 
-def return_numpy_arrays(list_int_var):
+def return_numpy_arrays(list_int_var, nb_words = 1):
     indices = np.asarray([i for i in range(len(list_int_var))], dtype = np.uint16)
     #~names = np.asarray([var[0] for var in list_int_var])
-    exps = np.asarray([var[1] for var in list_int_var])
+    #Expressions as bitmaps over the monomials of the gadget (see anf.py)
+    exps = np.asarray([anf_encode(str(var[1])) for var in list_int_var], dtype = np.uint8).reshape(len(list_int_var), -1)
     exps_str = np.asarray([str(var[1]) for var in list_int_var])
     secret_deps = np.asarray([var[2] for var in list_int_var], dtype = np.uint)
     random_deps = np.asarray([var[3] for var in list_int_var], dtype = np.uint8)
     nb_occs = np.asarray([var[4] for var in list_int_var], dtype = np.uint16)
-    weights = np.asarray([var[5] for var in list_int_var], dtype = object)
+    #Binary representation of each wire as nb_words 64-bit words (least significant word first)
+    weights = np.asarray([[(var[5] >> (64*w)) & 0xffffffffffffffff for w in range(nb_words)] for var in list_int_var], dtype = np.uint64).reshape(-1, nb_words)
     
     return (indices, exps, secret_deps, random_deps, nb_occs, weights, exps_str)
@@ -0,0 +1,133 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+
+import os
+import tempfile
+import numpy as np
+
+##############################################################################
+#
+# Cache of the results of the verifications
+#
+#   The coefficients of the verification of a gadget are stored level by
+#   level (size i of the tuples) in the directory RESULT_CACHE_DIR (one 
+#   directory per gadget, property, t, t_output, BATCH_SIZE and options, 
+#   set by verif_tool.py : the rules are applied to each batch until a 
+#   pass eliminates none of its tuples, so the coefficients depend on 
+#   BATCH_SIZE, and they are upper bounds with apriori). Each verification loop
+#   (named as its checkpoints) keeps in the file RESULT_CACHE_DIR/name.npz
+#   its coefficients after each level i, and the flawed tuples used to 
+#   eliminate the larger tuples with the number of them found up to each
+#   level (and the secure tuples of the last level with apriori, see 
+#   random_probing_func.py). A verification with coeff_max smaller than 
+#   the number of stored levels is then read from the file, and a larger 
+#   coeff_max only enumerates the tuples of the new sizes.
+#
+##############################################################################
+
+### Version of the format of the stored results (to be increased when the verification changes)
+RESULT_CACHE_VERSION = 2
+
+RESULT_CACHE_DIR = None
+
+
+##############################################################################
+#
+# result_cache_load
+#	OUTPUT:
+#		- the state of the verification loop name after the level
+#           min(coeff_max, number of stored levels), in the format of the
+#           checkpoints (see checkpoint.py), None if no level is stored
+#
+##############################################################################
+
+def result_cache_load(name, coeff_max):
+    if(RESULT_CACHE_DIR is None):
+        return None
+    filename = os.path.join(RESULT_CACHE_DIR, name.lstrip(".") + ".npz")
+    if(not os.path.exists(filename)):
+        return None
+    
+    with np.load(filename, allow_pickle=False) as data:
+        n = min(len(data["flawed_ends"]), coeff_max)
+        if(n == 0):
+            return None
+        state = {k: data[k][n-1] for k in data.files if k.startswith("coeff_c")}
+        state["list_int_prev_flawed"] = data["list_int_prev_flawed"][:int(data["flawed_ends"][n-1])]
+        if(("list_secure" in data.files) and (int(data["secure_level"]) == n)):
+            state["list_secure"] = data["list_secure"]
+    state.update({"i": n+1, "b": 0, "list_int_prev_flawed_tmp": state["list_int_prev_flawed"][:0]})
+    return state
+
+
+##############################################################################
+#
+# result_cache_save
+#	OUTPUT:
+#		- add the level i to the file of the verification loop name, state
+#           contains the coefficients (keys starting with coeff_c, in the 
+#           format of coeff_store) and the 
+#           flawed tuples (list_int_prev_flawed) after the level i, and 
+#           the secure tuples of size i (list_secure) with apriori. The level
+#           is not stored if the levels 1 to i-1 are not all stored (e.g. 
+#           verification resumed from a checkpoint) or if it is already stored
+#
+##############################################################################
+
+def result_cache_save(name, i, state):
+    if(RESULT_CACHE_DIR is None):
+        return
+    filename = os.path.join(RESULT_CACHE_DIR, name.lstrip(".") + ".npz")
+    
+    if(os.path.exists(filename)):
+        with np.load(filename, allow_pickle=False) as data:
+            stored = {k: data[k] for k in data.files}
+    else:
+        stored = {k: np.zeros((0, len(v)), dtype=v.dtype) for (k, v) in state.items() if k.startswith("coeff_c")}
+        stored["flawed_ends"] = np.zeros(0, dtype=np.int64)
+    if(len(stored["flawed_ends"]) != i-1):
+        return
+        
+    for k in stored:
+        if(k.startswith("coeff_c")):
+            stored[k] = np.append(stored[k], [state[k]], 0)
+    stored["list_int_prev_flawed"] = state["list_int_prev_flawed"]
+    stored["flawed_ends"] = np.append(stored["flawed_ends"], len(state["list_int_prev_flawed"]))
+    if("list_secure" in state):
+        stored["list_secure"] = state["list_secure"]
+        stored["secure_level"] = np.asarray(i)
+    
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    (fd, tmp) = tempfile.mkstemp(dir=RESULT_CACHE_DIR)
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, **stored)
+    os.replace(tmp, filename)
\ No newline at end of file
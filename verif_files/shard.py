@@ -0,0 +1,113 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+
+import numpy as np
+from .coefficients import coeff_store, coeff_restore
+
+##############################################################################
+#
+# shard_batches
+#	OUTPUT:
+#		- the numbers of the batches of a given size of tuples (from start
+#           to nb_batches - 1) that are verified by the shard SHARD = (k, N)
+#           (0 <= k < N): batch b belongs to the shard (b + offset) % N. If split is False,
+#           the batches are not split and all of them are returned
+#
+# shard_record / shard_save
+#	OUTPUT:
+#		- keep the partial coefficients computed by the shard and write
+#           them in the file SHARD_OUTPUT (npz format). The flawed tuples
+#           are not written: they are only needed to verify larger tuples,
+#           which a shard verifies itself
+#
+# shard_merge / shard_merged
+#	OUTPUT:
+#		- load the files written by the N shards of a same verification and
+#           sum their partial coefficients
+#
+##############################################################################
+
+SHARD = (0, 1)
+SHARD_OUTPUT = None
+#Identifies the verification (gadget, property, parameters), shards of another verification are rejected
+SHARD_PARAMS = ""
+SHARD_RESULTS = dict()
+SHARD_MERGED = None
+
+def shard_batches(nb_batches, start = 0, offset = 0, split = True):
+    (k, nb_shards) = SHARD
+    if(not split):
+        return range(start, nb_batches)
+    return range(start + (k - offset - start) % nb_shards, nb_batches, nb_shards)
+
+
+def shard_record(name, coeffs):
+    SHARD_RESULTS[name] = coeff_store(coeffs)
+
+
+def shard_save():
+    (k, nb_shards) = SHARD
+    with open(SHARD_OUTPUT, "wb") as f:
+        np.savez(f, params=np.asarray(SHARD_PARAMS), shard=np.asarray([k, nb_shards]), **SHARD_RESULTS)
+    print("Partial coefficients of shard " + str(k+1) + "/" + str(nb_shards) + " written to " + SHARD_OUTPUT + "\n")
+
+
+def shard_merge(filenames):
+    global SHARD_MERGED
+    SHARD_MERGED = dict()
+    shards = []
+    for filename in filenames:
+        with np.load(filename, allow_pickle=False) as data:
+            results = {k: data[k] for k in data.files}
+        if(str(results.pop("params")) != SHARD_PARAMS):
+            print("Shard file " + filename + " was not created by the same verification")
+            exit()
+        shards.append(tuple(results.pop("shard").tolist()))
+        for name in results:
+            if(name in SHARD_MERGED):
+                SHARD_MERGED[name] = SHARD_MERGED[name] + coeff_restore(results[name])
+            else:
+                SHARD_MERGED[name] = coeff_restore(results[name])
+
+    nb_shards = shards[0][1]
+    if(sorted(shards) != [(k, nb_shards) for k in range(nb_shards)]):
+        print("Shard files do not contain exactly the shards 1/" + str(nb_shards) + " to " + str(nb_shards) + "/" + str(nb_shards))
+        exit()
+
+
+def shard_merged(name):
+    if(SHARD_MERGED is None):
+        return None
+    if(name not in SHARD_MERGED):
+        print("Shard files do not contain the coefficients " + name)
+        exit()
+    return SHARD_MERGED[name]
@@ -0,0 +1,322 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random
+# probing expandability (RPE) that was introduced in the following publication:
+#
+#    "Random Probing Security: Verification, Composition, Expansion and New
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain,
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+
+import itertools
+import numpy as np
+from collections import Counter
+from . import anf
+
+##############################################################################
+#
+# Symmetries of a gadget
+#
+#   An automorphism of a gadget is a permutation of its wires induced by a
+#   permutation of the variables (the same permutation of the share indices
+#   of every input, possibly exchanging the two inputs, and a relabeling of
+#   the random variables) which maps the expression of every wire to the 
+#   expression of a wire of the same kind (intermediate variable, or share
+#   of the same output) with the same number of occurrences. A tuple and its
+#   images are verified in the same way, so with SYMMETRY only the tuples 
+#   that are lexicographically smaller than all of their images (canonical
+#   tuples) are verified, and each of them is counted as many times as its
+#   number of images (size of its orbit).
+#
+#   SYMMETRY = {"perms": array of the permutations of the wires (intermediate
+#   wires, then the shares of each output, one row per automorphism, the
+#   first row is the identity), "swaps": True for the automorphisms
+#   exchanging the two inputs}
+#
+##############################################################################
+
+SYMMETRY = None
+### Maximum number of nodes of the search of the relabeling of the random variables, for each permutation of the shares
+SYMMETRY_MAX_NODES = 100000
+### Maximum order of the group of automorphisms
+SYMMETRY_MAX_ORDER = 10000
+
+
+#################### Expressions of the wires (polynomials, see anf.py) from their bitmaps ####################
+def symmetry_polys(exps):
+    monos = anf.ANF["monos"]
+    bits = np.unpackbits(np.asarray(exps), axis=1, bitorder="little")
+    return [frozenset([monos[k] for k in np.flatnonzero(row)]) for row in bits]
+
+
+#################### Image of a polynomial by the permutation vmap of the variables ####################
+def symmetry_poly_image(poly, vmap):
+    return frozenset([tuple(sorted([vmap[v] for v in m])) for m in poly])
+
+
+##############################################################################
+#
+# symmetry_search
+#	OUTPUT:
+#		- the permutation of the variables extending the permutation 
+#           share_map of the shares which maps the multiset keys of
+#           (polynomial, kind of wire, number of occurrences) onto itself,
+#           None if there is none (or if the search is too long)
+#
+##############################################################################
+
+def symmetry_search(keys, share_map, nb_randoms):
+    nb_vars = len(share_map) + nb_randoms
+    randoms = list(range(len(share_map), nb_vars))
+    
+    #Keys containing each random variable, the random variables are relabeled in the order of their first key
+    keys_of = dict([(r, []) for r in randoms])
+    order = []
+    for key in keys:
+        for r in sorted(set([v for m in key[0] for v in m if v >= len(share_map)])):
+            keys_of[r].append(key)
+            if(r not in order):
+                order.append(r)
+    order += [r for r in randoms if r not in order]
+    position = dict([(r, n) for (n, r) in enumerate(order)])
+    
+    #A random variable can only be mapped to a random variable appearing in the same kinds of keys
+    def invariant(r):
+        return sorted([(key[1], key[2], keys[key], len(key[0]), sorted([len(m) for m in key[0] if r in m])) for key in keys_of[r]])
+    invariants = dict([(r, invariant(r)) for r in randoms])
+    
+    #Keys checked when their last random variable (in the order) is mapped
+    checks = [[] for r in order]
+    vmap = list(share_map) + [None] * nb_randoms
+    def valid(key):
+        image = (symmetry_poly_image(key[0], vmap), key[1], key[2])
+        return keys.get(image, 0) == keys[key]
+    for key in keys:
+        rands = [position[v] for m in key[0] for v in m if v >= len(share_map)]
+        if(len(rands) == 0):
+            if(not valid(key)):
+                return None
+        else:
+            checks[max(rands)].append(key)
+    
+    used = set()
+    nodes = [0]
+    def assign(n):
+        if(n == len(order)):
+            return True
+        nodes[0] += 1
+        if(nodes[0] > SYMMETRY_MAX_NODES):
+            return False
+        r = order[n]
+        for image in randoms:
+            if((image in used) or (invariants[image] != invariants[r])):
+                continue
+            vmap[r] = image
+            used.add(image)
+            if(all([valid(key) for key in checks[n]]) and assign(n+1)):
+                return True
+            used.discard(image)
+        vmap[r] = None
+        return False
+    
+    if(assign(0)):
+        return vmap
+    return None
+
+
+##############################################################################
+#
+# symmetry_init
+#	OUTPUT:
+#		- set SYMMETRY to the group of automorphisms of the gadget whose
+#           wires (intermediate wires, then the shares of each output) have
+#           the expressions (bitmaps) exps, the numbers of occurrences 
+#           nb_occs and the kinds kinds (0 for intermediate wires, k+1 for 
+#           the shares of output k). The group is generated by the given 
+#           permutations of the wires generators (they are checked), or by
+#           the automorphisms found for every permutation of the shares if 
+#           generators is None. Returns the order of the group
+#
+##############################################################################
+
+def symmetry_init(exps, nb_occs, kinds, generators = None):
+    global SYMMETRY
+    (nb_secrets, nb_shares, nb_randoms) = (anf.ANF["nb_secrets"], anf.ANF["nb_shares"], anf.ANF["nb_randoms"])
+    polys = symmetry_polys(exps)
+    wires = list(zip(polys, [int(k) for k in kinds], [int(o) for o in nb_occs]))
+    keys = Counter(wires)
+    positions = dict()
+    for (w, key) in enumerate(wires):
+        positions.setdefault(key, []).append(w)
+    
+    #Permutation of the wires induced by the permutation vmap of the variables
+    def wire_perm(vmap):
+        perm = np.zeros(len(wires), dtype=np.int64)
+        for (key, ws) in positions.items():
+            perm[ws] = positions[(symmetry_poly_image(key[0], vmap), key[1], key[2])]
+        return perm
+    
+    gens = []
+    if(generators is None):
+        swaps = [False, True] if (nb_secrets == 2) else [False]
+        for pi in itertools.permutations(range(nb_shares)):
+            for swap in swaps:
+                share_map = [((1 - s) if swap else s)*nb_shares + pi[j] for s in range(nb_secrets) for j in range(nb_shares)]
+                vmap = symmetry_search(keys, share_map, nb_randoms)
+                if(vmap is not None):
+                    gens.append((tuple(wire_perm(vmap).tolist()), swap))
+    else:
+        shares = [w for w in range(len(wires)) if (kinds[w] == 0) and (len(polys[w]) == 1) and (len(next(iter(polys[w]))) == 1) and (next(iter(polys[w]))[0] < nb_secrets*nb_shares)]
+        for perm in generators:
+            perm = [int(w) for w in perm]
+            if((sorted(perm) != list(range(len(wires)))) or any([wires[perm[w]] != (symmetry_poly_image(wires[w][0], symmetry_vars(polys, perm)), wires[w][1], wires[w][2]) for w in range(len(wires))])):
+                print("The permutation " + str(perm) + " is not an automorphism of the gadget")
+                exit()
+            swap = any([(next(iter(polys[w]))[0] // nb_shares) != (next(iter(polys[perm[w]]))[0] // nb_shares) for w in shares])
+            gens.append((tuple(perm), swap))
+    
+    #Closure of the generators under composition
+    identity = (tuple(range(len(wires))), False)
+    group = {identity[0]: False}
+    queue = [identity]
+    while(len(queue) > 0):
+        (perm, swap) = queue.pop()
+        for (gen, gen_swap) in gens:
+            prod = tuple([gen[w] for w in perm])
+            if(prod not in group):
+                group[prod] = swap != gen_swap
+                queue.append((prod, group[prod]))
+                if(len(group) > SYMMETRY_MAX_ORDER):
+                    print("The group of automorphisms of the gadget has more than " + str(SYMMETRY_MAX_ORDER) + " elements")
+                    exit()
+    
+    perms = [identity[0]] + [perm for perm in group if perm != identity[0]]
+    SYMMETRY = {"perms": np.asarray(perms, dtype=np.int64), "swaps": np.asarray([group[perm] for perm in perms])}
+    return len(perms)
+
+
+#################### Permutation of the variables induced by the permutation perm of the wires (from the wires of single variables) ####################
+def symmetry_vars(polys, perm):
+    vmap = dict()
+    for w in range(len(polys)):
+        if((len(polys[w]) == 1) and (len(next(iter(polys[w]))) == 1) and (len(polys[perm[w]]) == 1) and (len(next(iter(polys[perm[w]]))) == 1)):
+            vmap[next(iter(polys[w]))[0]] = next(iter(polys[perm[w]]))[0]
+    return vmap
+
+
+##############################################################################
+#
+# symmetry_group
+#	OUTPUT:
+#		- the permutations of the wires of the automorphisms which map the
+#           set of wires list_out to itself (exchanging the two inputs 
+#           only if swaps is True), None without symmetry or if the
+#           identity is the only one
+#
+##############################################################################
+
+def symmetry_group(list_out = (), swaps = True):
+    if(SYMMETRY is None):
+        return None
+    perms = SYMMETRY["perms"]
+    keep = np.ones(len(perms), dtype=bool)
+    if(not swaps):
+        keep &= ~SYMMETRY["swaps"]
+    if(len(list_out) > 0):
+        keep &= np.all(np.sort(perms[:, list_out], axis=1) == np.sort(list_out), axis=1)
+    if(np.sum(keep) == 1):
+        return None
+    return perms[keep]
+
+
+##############################################################################
+#
+# symmetry_reduce / symmetry_orbits
+#	OUTPUT:
+#		- the canonical tuples of list_tuples (smaller than their images by
+#           the permutations group) and the sizes of their orbits / the 
+#           sizes of the orbits of the tuples of list_tuples
+#
+##############################################################################
+
+def symmetry_compare(list_tuples, group):
+    rows = np.arange(len(list_tuples))
+    canonical = np.ones(len(list_tuples), dtype=bool)
+    stabilizer = np.zeros(len(list_tuples), dtype=np.int64)
+    for perm in group:
+        images = np.sort(perm[list_tuples], axis=1)
+        diff = images != list_tuples
+        first = np.argmax(diff, axis=1)
+        canonical &= ~(diff[rows, first] & (images[rows, first] < list_tuples[rows, first]))
+        stabilizer += ~np.any(diff, axis=1)
+    return canonical, len(group) // stabilizer
+    
+def symmetry_reduce(list_tuples, group):
+    if(group is None):
+        return list_tuples, np.ones(len(list_tuples), dtype=np.int64)
+    canonical, orbits = symmetry_compare(list_tuples, group)
+    return list_tuples[canonical, :], orbits[canonical]
+
+def symmetry_orbits(list_tuples, group):
+    if(group is None):
+        return np.ones(len(list_tuples), dtype=np.int64)
+    return symmetry_compare(list_tuples, group)[1]
+
+
+##############################################################################
+#
+# symmetry_masks
+#	OUTPUT:
+#		- the sets of wires masks (rows of 64-bit words, wire w is the bit
+#           w) and all their images by the permutations of group, without
+#           duplicates
+#
+##############################################################################
+
+def symmetry_masks(masks, group):
+    if((group is None) or (len(masks) == 0)):
+        return masks
+    bits = np.unpackbits(np.ascontiguousarray(masks, dtype="<u8").view(np.uint8), axis=1, bitorder="little")
+    images = [masks]
+    for perm in group[1:]:
+        inverse = np.arange(bits.shape[1])
+        inverse[perm] = np.arange(len(perm))
+        images.append(np.ascontiguousarray(np.packbits(bits[:, inverse], axis=1, bitorder="little")).view("<u8").astype(np.uint64))
+    return np.unique(np.concatenate(images), axis=0)
+
+
+##############################################################################
+#
+# symmetry_out_combs
+#	OUTPUT:
+#		- the smallest combination of output shares of each class of 
+#           out_combs (the combinations mapped to each other by the 
+#           automorphisms, exchanging the two inputs only if swaps is True),
+#           the combinations of a same class have the same coefficients
+#
+##############################################################################
+
+def symmetry_out_combs(out_combs, swaps = True):
+    return symmetry_reduce(np.asarray(out_combs), symmetry_group(swaps = swaps))[0]
\ No newline at end of file
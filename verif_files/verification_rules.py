@@ -32,6 +32,11 @@
 import itertools
 import numpy as np
 import time
+from math import comb as binomial
+from .anf import anf_deps, anf_len, anf_max_len, anf_rule_4
+
+### Maximum number of tuples processed at once by the verification functions
+BATCH_SIZE = 200000
 
 def combs(a, r):
     """
@@ -44,6 +49,85 @@ def combs(a, r):
     b = np.fromiter(itertools.combinations(a, r), dt)
     return b.view(a.dtype).reshape(-1, r)
 
+def combs_unrank(a, r, start, stop, out = None):
+    """
+    Return the r-length combinations of elements in the array a of ranks
+    start to stop-1 in the order of itertools.combinations, as an array of
+    shape (stop-start, r). The combinations are written in the first rows of
+    out (of shape (batch_size, r) and of the dtype of a) when it is given.
+    """
+    n = len(a)
+    total = int(binomial(n, r))
+    dt = np.int64 if (total < (1 << 62)) else object
+    if(out is None):
+        out = np.empty((stop - start, r), dtype=a.dtype)
+    out = out[:stop - start]
+    #Rank of the combination (n-1-c_{r-1}, ..., n-1-c_0) in the combinatorial number system
+    dual = (total - 1 - start) - np.arange(stop - start, dtype=np.int64).astype(dt)
+    for k in range(r, 0, -1):
+        table = np.asarray([int(binomial(d, k)) for d in range(n)], dtype=dt)
+        d = np.searchsorted(table, dual, side="right") - 1
+        dual = dual - table[d]
+        np.take(a, (n - 1) - d, out=out[:, r-k])
+    return out
+
+def combs_batch(a, r, batch_size, b, out = None):
+    """
+    Return the batch number b of the r-length combinations of elements in
+    the array a, i.e. the combinations of ranks b*batch_size to
+    (b+1)*batch_size - 1 in the order of itertools.combinations (written in
+    out when it is given).
+    """
+    a = np.asarray(a)
+    total = int(binomial(len(a), r))
+    start = min(b * batch_size, total)
+    stop = min(start + batch_size, total)
+    return combs_unrank(a, r, start, stop, out)
+
+def combs_batches(a, r, batch_size, numbers = None, reuse = False):
+    """
+    Yield the r-length combinations of elements in the array a by batches of
+    at most batch_size combinations (in the order of itertools.combinations).
+    Only the batches whose numbers are in numbers are yielded (all of them by
+    default). With reuse, all the batches are written in a same buffer, a
+    batch is then overwritten by the next one and must not be kept (nor sent
+    to the worker processes).
+    """
+    a = np.asarray(a)
+    if(numbers is None):
+        numbers = range(-(-int(binomial(len(a), r)) // batch_size))
+    out = np.empty((batch_size, r), dtype=a.dtype) if reuse else None
+    for b in numbers:
+        yield combs_batch(a, r, batch_size, b, out)
+
+def extends_count(a, prev):
+    """
+    Return the number of extensions of the tuples of prev (increasing tuples
+    of elements of the sorted array a) by one element of a larger than their
+    last element.
+    """
+    return int(np.sum(len(a) - np.searchsorted(a, prev[:, -1], side="right")))
+
+def extends_batches(a, prev, batch_size, numbers = None):
+    """
+    Yield the extensions of the tuples of prev (increasing tuples of elements
+    of the sorted array a) by one element of a larger than their last
+    element, by batches of at most batch_size tuples (in the order of prev,
+    then of a). Only the batches whose numbers are in numbers are yielded
+    (all of them by default).
+    """
+    a = np.asarray(a)
+    first = np.searchsorted(a, prev[:, -1], side="right")
+    ends = np.cumsum(len(a) - first)
+    total = int(ends[-1]) if (len(ends) > 0) else 0
+    if(numbers is None):
+        numbers = range(-(-total // batch_size))
+    for b in numbers:
+        k = np.arange(min(b * batch_size, total), min((b+1) * batch_size, total))
+        rows = np.searchsorted(ends, k, side="right")
+        pos = first[rows] + k - (ends[rows] - (len(a) - first[rows]))
+        yield np.hstack((prev[rows], a[pos][:, None]))
+
 ##############################################################################
 #
 # apply_rule_1
@@ -56,10 +140,9 @@ def combs(a, r):
 
 def rule_1_f(liste, val_max):
     return liste == val_max
-r1 = np.vectorize(rule_1_f)
     
 def apply_rule_1(secret_deps_tuple, val_max):
-    mask = np.any(r1(secret_deps_tuple, val_max), axis=1)
+    mask = np.any(rule_1_f(secret_deps_tuple, val_max), axis=1)
     return mask    
 
 #################### Hamming Weight Lookup Table ####################
@@ -73,7 +156,7 @@ def count_one(x):
 # The value 2048 means that the number of shares does not exceed 
 #  11 (log2(2048)). For higher number of shares n, the value should be
 # changed to 2^n
-HW = np.asarray([count_one(i) for i in range(2048)], dtype=np.int)
+HW = np.asarray([count_one(i) for i in range(2048)], dtype=int)
 
 
 ##############################################################################
@@ -87,11 +170,10 @@ HW = np.asarray([count_one(i) for i in range(2048)], dtype=np.int)
 ##############################################################################
 def rule_1_f_exp(liste, t):
     return (liste > t)
-r1exp = np.vectorize(rule_1_f_exp)
 
 def apply_rule_1_exp(secret_deps_tuple, t):
     hammingw = HW[secret_deps_tuple]
-    mask = np.any(r1exp(hammingw, t), axis=1)
+    mask = np.any(rule_1_f_exp(hammingw, t), axis=1)
     del hammingw
     return mask    
     
@@ -108,7 +190,7 @@ def apply_rule_1_exp(secret_deps_tuple, t):
 def classify_rule_1(secret_deps_tuple, t):
     hammingw = HW[secret_deps_tuple]
     #I1_or_I2
-    mask = r1exp(hammingw, t)
+    mask = rule_1_f_exp(hammingw, t)
     del hammingw
     #I1
     mask_I1 = mask[:, 0]
@@ -154,6 +236,73 @@ def apply_rule_2(list_tuples,random_deps, verbosity):
     if(verbosity == 2):
         print("After rule 2 : " + str(nb) + " modified Tuples")
     
+##############################################################################
+#
+# rule_3_lengths
+#	OUTPUT:
+#		- the lengths of the expressions of the couples of wires pairs 
+#           (array of shape (..., 2)) and the lengths of their sums. Each 
+#           distinct wire and couple is computed once, and the lengths of 
+#           the wires of the gadget (the rows of exps given to rule_3_init) 
+#           and of their sums are kept in RULE_3_CACHE, so that they are 
+#           shared by all the batches and all the output combinations
+#
+##############################################################################
+
+### Maximum number of wires of the gadget for which the lengths of the sums of two wires are kept (table of nb_wires^2 lengths,
+### 32 MiB for 4096 wires when the lengths fit in int16)
+RULE_3_CACHE_MAX = 4096
+
+RULE_3_CACHE = {"exps": None}
+
+def rule_3_init(exps):
+    if(RULE_3_CACHE["exps"] is exps):
+        return
+    nb = len(exps)
+    #The lengths are at most anf_max_len(), they are kept in int16 when possible
+    dt = np.int16 if (anf_max_len() < (1 << 15)) else np.int32
+    sum_len = np.full((nb, nb) if (nb <= RULE_3_CACHE_MAX) else (0, 0), -1, dtype=dt)
+    RULE_3_CACHE.update({"exps": exps, "nb": nb, "len": anf_len(exps), "sum_len": sum_len})
+
+
+def rule_3_unique_lengths(exps, a, b = None):
+    #Lengths of the expressions of the wires a (or of the sums of the wires a and b), computed once per distinct wire (or couple)
+    keys = a if (b is None) else a * len(exps) + b
+    (keys, inverse) = np.unique(keys, return_inverse=True)
+    if(b is None):
+        lengths = anf_len(exps[keys])
+    else:
+        lengths = anf_len(np.bitwise_xor(exps[keys // len(exps)], exps[keys % len(exps)]))
+    return lengths[inverse.reshape(-1)]
+
+
+def rule_3_lengths(exps, pairs):
+    nb = RULE_3_CACHE["nb"]
+    pairs = pairs.astype(np.int64)
+    a = pairs[..., 0]
+    b = pairs[..., 1]
+    
+    lengths = np.zeros(pairs.shape, dtype=np.int64)
+    new = pairs >= nb
+    lengths[~new] = RULE_3_CACHE["len"][pairs[~new]]
+    if(np.any(new)):
+        lengths[new] = rule_3_unique_lengths(exps, pairs[new])
+    
+    sum_lengths = np.zeros(a.shape, dtype=np.int64)
+    sum_len = RULE_3_CACHE["sum_len"]
+    gadget = (a < nb) & (b < nb) & (nb <= RULE_3_CACHE_MAX)
+    if(np.any(gadget)):
+        (a_g, b_g) = (a[gadget], b[gadget])
+        missing = sum_len[a_g, b_g] < 0
+        if(np.any(missing)):
+            keys = np.unique(a_g[missing] * nb + b_g[missing])
+            sum_len[keys // nb, keys % nb] = anf_len(np.bitwise_xor(exps[keys // nb], exps[keys % nb]))
+        sum_lengths[gadget] = sum_len[a_g, b_g]
+    if(not np.all(gadget)):
+        sum_lengths[~gadget] = rule_3_unique_lengths(exps, a[~gadget], b[~gadget])
+    return lengths, sum_lengths
+
+
 ##############################################################################
 #
 # apply_rule_3
@@ -161,113 +310,19 @@ def apply_rule_2(list_tuples,random_deps, verbosity):
 #		- return a modification of list_tuples such that at most one
 #			couple of intermediate variables (a,b) is turned into (a+b,b)
 #			(resp. (a,a+b)) if a+b contains less variables than a (resp. b) 
+#           (rule_3_init must have been called with the first rows of exps)
 #
 ##############################################################################
-	
-def vecto_comb(uple):
-    return combs(uple, 2)
-def test_len(a):
-    return len(a)
-def test_len_eval(a):
-    return len(str(a))
-vectest = np.vectorize(test_len)
-vectest_eval = np.vectorize(test_len_eval)
-
-#################### updates exp (in str format) random and secret dependencies after modifications using rule 3 ####################
-def vecto_random_secret_deps(exp, nb_secrets, nb_randoms):
-    exp_split = [elem.split("*") for elem in exp.split(" + ")]
-
-    secret_dep = [0 for i in range(nb_secrets)]
-    random_dep = [0 for i in range(nb_randoms)]
-    for e in exp_split:
-        for v in e:
-            if((v == '0') or (v == '1')):
-                continue
-            if(v[-1] == '_'):
-                if((exp.count(v) == 1) and (len(e) == 1)):
-                    random_dep[int(v[1:-1])] = 1 
-                else:
-                    random_dep[int(v[1:-1])] = 2
-                #if(str(eval(exp)+eval(v)).count(v)==0):
-                #    random_dep[int(v[1:-1])] = 1
-                #elif(exp.count(v) >= 1):
-                #    random_dep[int(v[1:-1])] = 2
-            else:
-                secret_dep[ord(v[0])-97] |= (1 << int(v[1:]))
-    return np.asarray([secret_dep, random_dep], dtype=object)
-
-vect_variables = np.vectorize(vecto_random_secret_deps)
-vect_str = np.vectorize(str)
-    
-
-########## This is an auxiliary function, it is not used in the execution, check the next function
-def apply_rule_3_(list_tuples, exps, exps_str, verbosity):
-    comb_2_elems = np.apply_along_axis(func1d=vecto_comb, axis=1, arr=list_tuples)  #np.asarray([combs(uple, 2) for uple in list_tuples]) 
 
-    expressions = exps[comb_2_elems]
-    expressions_str = exps_str[comb_2_elems]
-    
-    #Computing number of variables for each couple of comb for each tuple
-    nb_var_couple = vectest(expressions_str)
-    m,n = nb_var_couple.shape[:2]
-    
-    nb_var_arg_max = np.argmax(nb_var_couple, axis=2)    
-    nb_var_max = nb_var_couple[np.arange(m)[:,None] ,np.arange(n), nb_var_arg_max]
-        
-    s = np.sum(expressions, axis=2)
-    nb_var_summed_couple = vectest_eval(s)
-    
-    del expressions
-    del expressions_str
-    del nb_var_couple
-    
-    less_than_max = nb_var_summed_couple < nb_var_max
-    
-    #TUPLES TO MODIFY
-    mask_tuples_to_modify = np.any(less_than_max, axis=1)
-    choice_combs_to_modify = np.argmax(less_than_max[mask_tuples_to_modify, :], axis=1)     #Choose the first comb for each tuple
-    
-    #Final lists to modify
-    tuples_to_modify = list_tuples[mask_tuples_to_modify, :]
-    s = s[mask_tuples_to_modify, choice_combs_to_modify]
-    if(len(s) > 0):
-        s_str = vect_str(s)
-        
-    else:
-        s_str = np.asarray([])
+def apply_rule_3(list_tuples, exps, verbosity):
+    if(list_tuples.shape[1] < 2):
         if(verbosity == 2):
             print ("After Rule 3 : 0 Modified Tuples")
-        return s, s_str
-    
-    
-    vars_max = comb_2_elems[np.arange(m)[:,None] ,np.arange(n), nb_var_arg_max]
-    vars_ = np.reshape(vars_max[mask_tuples_to_modify, choice_combs_to_modify], (-1,1))
-    vars_to_modify_mask = np.argmax((tuples_to_modify == vars_), axis=1)
-    
-    tuples_to_modify[np.arange(len(tuples_to_modify)), vars_to_modify_mask] = np.arange(len(exps),len(exps)+len(s))
-    list_tuples[mask_tuples_to_modify, :] = tuples_to_modify
-    
-    if(verbosity == 2):
-        print ("After Rule 3 : " + str(len(vars_to_modify_mask)) + " Modified Tuples")
-    
-    return s, s_str
-
-
-def apply_rule_3(list_tuples, exps, exps_str, verbosity):
-    comb_2_elems = np.apply_along_axis(func1d=vecto_comb, axis=1, arr=list_tuples)  #np.asarray([combs(uple, 2) for uple in list_tuples]) 
-    
-    expressions = exps[comb_2_elems]
-    expressions_str = exps_str[comb_2_elems]
-    
-    #Computing number of variables for each couple of comb for each tuple
-    nb_var_couple = vectest(expressions_str)
-    m,n = nb_var_couple.shape[:2]
-
-    s = np.sum(expressions, axis=2)
-    nb_var_summed_couple = vectest_eval(s)
+        return exps[:0]
+    comb_2_elems = list_tuples[:, combs(np.arange(list_tuples.shape[1]), 2)]
     
-    del expressions
-    del expressions_str
+    #Computing number of variables for each couple of comb for each tuple (length of the expressions), and of their sums
+    nb_var_couple, nb_var_summed_couple = rule_3_lengths(exps, comb_2_elems)
     
     less_than_1 = nb_var_summed_couple < nb_var_couple[:, :, 0]
     less_than_2 = (nb_var_summed_couple < nb_var_couple[:, :, 1])
@@ -284,17 +339,15 @@ def apply_rule_3(list_tuples, exps, exps_str, verbosity):
     less_than_1_or_2 = np.concatenate((less_than_1, less_than_2), axis=1)
     del less_than_1;   del less_than_2
     
-    #Final lists to modify
+    #Final lists to modify (the sums are only computed for the chosen couples)
     tuples_to_modify = list_tuples[mask_tuples_to_modify, :]
-    s = s[mask_tuples_to_modify, choice_combs_to_modify]
-    if(len(s) > 0):
-        s_str = vect_str(s)
-        
-    else:
-        s_str = np.asarray([])
+    couples = comb_2_elems[mask_tuples_to_modify, choice_combs_to_modify]
+    s = np.bitwise_xor(exps[couples[:, 0]], exps[couples[:, 1]])
+    del couples
+    if(len(s) == 0):
         if(verbosity == 2):
             print ("After Rule 3 : 0 Modified Tuples")
-        return s, s_str
+        return s
 
     vars_ = np.reshape(comb_2_elems[mask_tuples_to_modify, choice_combs_to_modify][less_than_1_or_2], (-1,1))
     vars_to_modify_mask = np.argmax(tuples_to_modify == vars_, axis=1)
@@ -305,7 +358,7 @@ def apply_rule_3(list_tuples, exps, exps_str, verbosity):
     if(verbosity == 2):
         print ("After Rule 3 : " + str(len(vars_to_modify_mask)) + " Modified Tuples")
     
-    return s, s_str
+    return s
     
 
 ##############################################################################
@@ -322,111 +375,7 @@ def apply_rule_3(list_tuples, exps, exps_str, verbosity):
 #
 ##############################################################################
 
-#################### checks if a sub-expression in exp (in str format) may be replaced by the random variable ra, and replace it ####################
-def vect_rule_4_exps(exp, ra, nb_randoms, nb_secrets):
-    secret_dep = [0 for i in range(nb_secrets)]
-    random_dep = [0 for i in range(nb_randoms)]
-    if(exp == '0' or exp == '1'):
-        return np.asarray([exp, secret_dep, random_dep], dtype=object)
-
-    exp_split = exp.split(" + ")
-    e = []
-    e_final = []
-    var = []
-    bo_one = False
-    for elem in exp_split:
-        if("*" in elem):
-            tmp = elem.split("*")
-            
-            if(tmp[0] == ra):
-                var.append(tmp[1])       
-                e_final.append(elem)
-            elif(tmp[1] == ra):
-                var.append(tmp[0])
-                e_final.append(elem)
-            else:
-                e.append(elem)
-        elif(elem == ra):
-            bo_one = True
-            e_final.append(elem)
-        else:
-            e.append(elem)       
-    
-    inter = []
-    v = var[0]
-    for elem in e:
-        if(("*" in elem) and (v in elem)):
-            
-            tmp = elem.split("*")
-            if(v == tmp[0]):
-                inter.append(tmp[1])
-            else:
-                inter.append(tmp[0])
-            
-    for v in var[1:]:
-        l = []
-        
-        for elem in e:
-            if(("*" in elem) and (v in elem)):
-                tmp = elem.split("*")
-                if(v == tmp[0]):
-                    l.append(tmp[1])
-                else:
-                    l.append(tmp[0])
-                    
-        inter = [el for el in inter if el in l]
-        
-    if(bo_one):
-        l = []
-        for elem in e:
-            if(not("*" in elem)):
-                l.append(elem)
-                
-        inter = [el for el in inter if el in l]       
-        
-        
-    for elem in e:
-        if("*" in elem):
-            tmp = elem.split("*")
-            
-            if((tmp[0] in var and tmp[1] in inter) or (tmp[1] in var and tmp[0] in inter)):
-                continue
-            else:
-                e_final.append(elem)
-                
-        elif((bo_one) and (elem in inter)):
-            continue
-        else:
-            e_final.append(elem)
-    
-    exp = " + ".join(e_final)
-    exp_split = [elem.split("*") for elem in exp.split(" + ")]
-
-    for e in exp_split:
-        for v in e:
-            if((v == '0') or (v == '1')):
-                continue
-            
-            if(v[-1] == '_'):
-                if((exp.count(v) == 1) and (len(e) == 1)):
-                    random_dep[int(v[1:-1])] = 1
-                    
-                else:
-                    random_dep[int(v[1:-1])] = 2
-
-            else:
-                secret_dep[ord(v[0])-97] |= (1 << int(v[1:]))
-                
-    return np.asarray([exp, secret_dep, random_dep], dtype=object)
-
-vect_rule_4 = np.vectorize(vect_rule_4_exps)
-
-def fo(exp):
-    return eval(exp)
-vect_eval = np.vectorize(fo)
-
-
-def apply_rule_4(list_tuples, random_deps, exps, exps_str, secret_deps, verbosity):
+def apply_rule_4(list_tuples, random_deps, exps, secret_deps, verbosity):
     #First, reduce add all random deps from all wires in each tuple
     nb = 0
     total = 0
@@ -443,54 +392,148 @@ def apply_rule_4(list_tuples, random_deps, exps, exps_str, secret_deps, verbosit
         
         varsi = (random_deps[liste, r] == 2) #This will contain the exact wire index in each tuple to modify its value
                 
-        exps_str_to_append = exps_str[liste[varsi]]
+        exps_to_append = exps[liste[varsi]]
                 
-        liste[varsi] = np.arange(len(exps), len(exps)+len(exps_str_to_append))
+        liste[varsi] = np.arange(len(exps), len(exps)+len(exps_to_append))
         
         list_tuples[mask, :] = liste
         
         
         start = time.time()
-        variables = vect_rule_4(exps_str_to_append, "r"+str(r)+"_", len(random_deps[0]), len(secret_deps[0]))
-        end = time.time()        
-        exps_str_to_append = np.asarray([elem[0] for elem in variables])
-        
-        secret_deps_append = np.asarray([elem[1] for elem in variables])
-        random_deps_append = np.asarray([elem[2] for elem in variables])
+        exps_to_append = anf_rule_4(exps_to_append, r)
+        end = time.time()
+        secret_deps_append, random_deps_append = anf_deps(exps_to_append)
 
-        exps_str = np.append(exps_str, exps_str_to_append)
-        exps = np.append(exps, vect_eval(exps_str_to_append))
+        exps = np.append(exps, exps_to_append, axis=0)
         secret_deps = np.append(secret_deps, secret_deps_append, axis=0)
         random_deps = np.append(random_deps, random_deps_append, axis=0)
         
         total += (end - start)
         
-    return list_tuples, exps, exps_str, secret_deps, random_deps, total
+    return list_tuples, exps, secret_deps, random_deps, total
         
+##############################################################################
+#
+# apply_rules_1_2
+#	OUTPUT:
+#		- applies rule 2 then rule 1 to the tuples of list_tuples (only 
+#           rule 1 if rule_2 is False), and repeats until a pass of the 
+#           rules does not eliminate any tuple if fixpoint is True. Returns
+#           list_tuples, l, sums and nb_occs_tuple restricted to the 
+#           remaining tuples. When rule_2 is False, secret_deps_tuple can
+#           give the secret dependencies of the tuples (OR of the secret
+#           dependencies of their wires, as np.uint) if they are known
+#
+#   When numba is available, all the passes are computed by a single
+#   compiled loop over the tuples (rules_1_2_kernel), otherwise each rule
+#   is a numpy pass over the whole batch. A pass of the kernel processes
+#   all the remaining tuples before the next one starts, so that both
+#   versions stop after the same pass and return the same tuples.
+#
+##############################################################################
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+RULES_JIT = numba is not None
+
+def rules_1_2_kernel(list_tuples, alive, secret_deps, random_deps, val_max, t, hw, rule_2, fixpoint):
+    (n, w) = list_tuples.shape
+    nb_secrets = secret_deps.shape[1]
+    nb_randoms = random_deps.shape[1]
+    removed = 1
+    passes = 0
+    while((removed > 0) and ((passes == 0) or fixpoint)):
+        removed = 0
+        for k in range(n):
+            if(not alive[k]):
+                continue
+            #Rule 2 : a random variable appearing in a single wire of the tuple, as a linear term, replaces this wire
+            if(rule_2):
+                for r in range(nb_randoms):
+                    occ = 0
+                    for j in range(w):
+                        occ += random_deps[list_tuples[k, j], r]
+                    if(occ == 1):
+                        for j in range(w):
+                            if(random_deps[list_tuples[k, j], r] == 1):
+                                list_tuples[k, j] = r
+            #Rule 1 : the tuple is eliminated if it does not depend on all the shares (resp. more than t shares) of a secret
+            failure = False
+            for sec in range(nb_secrets):
+                dep = secret_deps[list_tuples[k, 0], sec]
+                for j in range(1, w):
+                    dep |= secret_deps[list_tuples[k, j], sec]
+                if(((t < 0) and (dep == val_max)) or ((t >= 0) and (hw[dep] > t))):
+                    failure = True
+                    break
+            if(not failure):
+                alive[k] = False
+                removed += 1
+        passes += 1
+    return passes
+
+if(RULES_JIT):
+    rules_1_2_kernel = numba.njit(nogil=True)(rules_1_2_kernel)
+
+
+def apply_rules_1_2(list_tuples, l, sums, nb_occs_tuple, secret_deps, random_deps, val_max, t, rule_2, fixpoint, verbosity, secret_deps_tuple = None):
+    if(RULES_JIT):
+        alive = np.ones(len(list_tuples), dtype=np.bool_)
+        passes = rules_1_2_kernel(list_tuples, alive, secret_deps, random_deps, -1 if (val_max is None) else val_max, -1 if (t is None) else t, HW, rule_2, fixpoint)
+        list_tuples = list_tuples[alive, :]
+        l = l[alive, :]
+        sums = sums[alive]
+        if(not(nb_occs_tuple is None)):
+            nb_occs_tuple = nb_occs_tuple[alive, :]
+        if(verbosity == 2):
+            print ('Rules 1 and 2 applied ('+str(passes)+' passes)... '+str(len(list_tuples))+' tuples')
+        return list_tuples, l, sums, nb_occs_tuple
+        
+    ln = len(list_tuples) + 1
+    while((len(list_tuples) > 0) and (len(list_tuples) < ln)):
+        ln = len(list_tuples)
+        #################### Rule 2 ####################     
+        if(rule_2):
+            apply_rule_2(list_tuples, random_deps, verbosity)
+        
+        #################### Rule 1 ####################     
+        if((secret_deps_tuple is None) or rule_2):
+            secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples, :], axis=1, dtype=np.uint)
+        if(t is None):   
+            r1_mask = apply_rule_1(secret_deps_tuple, val_max)
+        else:
+            r1_mask = apply_rule_1_exp(secret_deps_tuple, t)
+        secret_deps_tuple = None
+        list_tuples = list_tuples[r1_mask, :]
+        l = l[r1_mask, : ]
+        sums = sums[r1_mask]
+        if(not(nb_occs_tuple is None)):
+            nb_occs_tuple = nb_occs_tuple[r1_mask, :]
+        del r1_mask
+        if(verbosity == 2):
+            print ('Rule 1 applied'+'... '+str(len(list_tuples))+' tuples')
+        if(not fixpoint):
+            break
+    return list_tuples, l, sums, nb_occs_tuple
+
 ##############################################################################
 #
 # apply rules 1, 2, 3 and 4 in a loop to extract remaining failure tuples
+#   (list_tuples is not modified, the first pass of rule 1 copies the 
+#   remaining tuples). secret_deps_tuple can give the secret dependencies
+#   of the tuples of list_tuples if they are known (see apply_rules_1_2)
 #
 ##############################################################################
-def apply_all_rules(list_tuples, secret_deps, random_deps, exps, exps_str, nb_occs_tuple, sums, i, val_max, t=None, verbosity=0):
+def apply_all_rules(list_tuples, secret_deps, random_deps, exps, nb_occs_tuple, sums, i, val_max, t=None, verbosity=0, secret_deps_tuple=None):
     total_time = 0
     total_time3 = 0
+    rule_3_init(exps)
     #################### Rule 1 ####################      
     l = np.copy(list_tuples)
-    secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples, :], axis=1, dtype=np.uint)
-    if(t is None):   
-        r1_mask = apply_rule_1(secret_deps_tuple, val_max)
-    else:
-        r1_mask = apply_rule_1_exp(secret_deps_tuple, t)
-    list_tuples = list_tuples[r1_mask, :]
-    l = l[r1_mask, : ]
-    sums = sums[r1_mask]
-    if(not(nb_occs_tuple is None)):
-        nb_occs_tuple = nb_occs_tuple[r1_mask, :]
-        
-    if(verbosity == 2):
-        print ('Rule 1 applied'+'... '+str(len(list_tuples))+' tuples')
-    del r1_mask
+    list_tuples, l, sums, nb_occs_tuple = apply_rules_1_2(list_tuples, l, sums, nb_occs_tuple, secret_deps, random_deps, val_max, t, False, False, verbosity, secret_deps_tuple)
     
     ln = len(list_tuples) + 1
     #Loop on all rules
@@ -500,25 +543,9 @@ def apply_all_rules(list_tuples, secret_deps, random_deps, exps, exps_str, nb_oc
         if(verbosity == 2):
             print ('Iteration '+str(count+1)+'... '+str(len(list_tuples))+' tuples')
         
-        while( (len(list_tuples)>0) and (len(list_tuples) < ln) ):
-            ln = len(list_tuples)
-            #################### Rule 2 ####################     
-            apply_rule_2(list_tuples, random_deps, verbosity)
-            
-            #################### Rule 1 ####################     
-            secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples, :], axis=1, dtype=np.uint)
-            if(t is None):   
-                r1_mask = apply_rule_1(secret_deps_tuple, val_max)
-            else:
-                r1_mask = apply_rule_1_exp(secret_deps_tuple, t)
-            list_tuples = list_tuples[r1_mask, :]
-            l = l[r1_mask, : ]
-            sums = sums[r1_mask]
-            if(not(nb_occs_tuple is None)):
-                nb_occs_tuple = nb_occs_tuple[r1_mask, :]
-            del r1_mask
-            if(verbosity == 2):
-                print ('Rule 1 applied'+'... '+str(len(list_tuples))+' tuples')
+        #################### Rules 2 and 1 until no tuple is eliminated ####################     
+        list_tuples, l, sums, nb_occs_tuple = apply_rules_1_2(list_tuples, l, sums, nb_occs_tuple, secret_deps, random_deps, val_max, t, True, True, verbosity)
+        ln = len(list_tuples)
                 
         if(len(list_tuples) > 0):
             #################### Rule 4 ####################
@@ -526,68 +553,34 @@ def apply_all_rules(list_tuples, secret_deps, random_deps, exps, exps_str, nb_oc
                 print("Rule 4")
             ini = len(exps)
             start = time.time()
-            list_tuples, exps, exps_str, secret_deps, random_deps, ti = apply_rule_4(list_tuples, random_deps, exps, exps_str, secret_deps, verbosity)
+            list_tuples, exps, secret_deps, random_deps, ti = apply_rule_4(list_tuples, random_deps, exps, secret_deps, verbosity)
             end = time.time()
             total_time += ti
             if(verbosity == 2):
                 print ("After Rule 4 : " + str(len(exps)-ini) + " Modified Tuples")
             
-            #################### Rule 2 ####################     
-            apply_rule_2(list_tuples, random_deps, verbosity)
-            
-            #################### Rule 1 ####################     
-            secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples, :], axis=1, dtype=np.uint)
-            if(t is None):   
-                r1_mask = apply_rule_1(secret_deps_tuple, val_max)
-            else:
-                r1_mask = apply_rule_1_exp(secret_deps_tuple, t)
-            list_tuples = list_tuples[r1_mask, :]
-            l = l[r1_mask, : ]
-            sums = sums[r1_mask]
-            if(not(nb_occs_tuple is None)):
-                nb_occs_tuple = nb_occs_tuple[r1_mask, :]
-            del r1_mask
-            if(verbosity == 2):
-                print ('Rule 1 applied'+'... '+str(len(list_tuples))+' tuples')
+            #################### Rules 2 and 1 ####################     
+            list_tuples, l, sums, nb_occs_tuple = apply_rules_1_2(list_tuples, l, sums, nb_occs_tuple, secret_deps, random_deps, val_max, t, True, False, verbosity)
          
         if(len(list_tuples) > 0):
             for anyvar in range(3):
                 #if(len(list_tuples)>0):
                 #################### Rule 3 ####################     
                 start = time.time()
-                exps_to_append, exps_str_to_append = apply_rule_3(list_tuples, exps, exps_str, verbosity)
+                exps_to_append = apply_rule_3(list_tuples, exps, verbosity)
                 if(len(exps_to_append) > 0):
-                    random_secret = vect_variables(exps_str_to_append, len(secret_deps[0]), len(random_deps[0])).tolist()
-                    secret_deps_append = np.asarray([elem[0] for elem in random_secret])
-                    random_deps_append = np.asarray([elem[1] for elem in random_secret])
+                    secret_deps_append, random_deps_append = anf_deps(exps_to_append)
     
-                    exps = np.append(exps, exps_to_append)
-                    exps_str = np.append(exps_str, exps_str_to_append)
+                    exps = np.append(exps, exps_to_append, axis=0)
                     secret_deps = np.append(secret_deps, secret_deps_append, axis=0)
                     random_deps = np.append(random_deps, random_deps_append, axis=0)
-                    del random_secret
                     del secret_deps_append
                     del random_deps_append
                 end = time.time()
                 total_time3 += (end - start)
                 
-            #################### Rule 2 ####################     
-            apply_rule_2(list_tuples, random_deps, verbosity)
-        
-            #################### Rule 1 ####################     
-            secret_deps_tuple = np.bitwise_or.reduce(secret_deps[list_tuples, :], axis=1, dtype=np.uint)
-            if(t is None):   
-                r1_mask = apply_rule_1(secret_deps_tuple, val_max)
-            else:
-                r1_mask = apply_rule_1_exp(secret_deps_tuple, t)
-            list_tuples = list_tuples[r1_mask, :]
-            l = l[r1_mask, : ]
-            sums = sums[r1_mask]
-            if(not(nb_occs_tuple is None)):
-                nb_occs_tuple = nb_occs_tuple[r1_mask, :]
-            del r1_mask
-            if(verbosity == 2):
-                print ('Rule 1 applied'+'... '+str(len(list_tuples))+' tuples')
+            #################### Rules 2 and 1 ####################     
+            list_tuples, l, sums, nb_occs_tuple = apply_rules_1_2(list_tuples, l, sums, nb_occs_tuple, secret_deps, random_deps, val_max, t, True, False, verbosity)
             
         count += 1
         
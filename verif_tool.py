@@ -0,0 +1,648 @@
+# coding=utf-8
+###############################################################################
+#
+# Implementation of VRAPS (Verifier for Random Probing Security) in SageMath
+#
+# VRAPS is a formal verification tool for random probing security and random 
+# probing expandability (RPE) that was introduced in the following publication:
+# 
+#    "Random Probing Security: Verification, Composition, Expansion and New 
+#    Constructions"
+#    By Sonia Belaïd, Jean-Sébastien Coron, Emmanuel Prouff, Matthieu Rivain, 
+#    and Abdul Rahman Taleb
+#    In the proceedings of CRYPTO 2020.
+#
+# Copyright (C) 2020 CryptoExperts
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import os
+import time
+import re
+import numpy as np
+import argparse
+import hashlib
+from fractions import Fraction
+
+from verif_files import checkpoint, shard, result_cache
+from verif_files.symmetry import symmetry_init
+from verif_files.verification_rules import BATCH_SIZE
+from verif_files.gadget_cache import load_gadget
+from verif_files.coefficients import find_pmax, get_fmin, get_fmax, sqrt_function, sqrt_coeff, log2_str
+from verif_files.shard import shard_merge, shard_save
+from verif_files.probing_func import verification_probing
+from verif_files.random_probing_func import verification_random_probing
+from verif_files.random_probing_comp_func import verification_random_probing_comp
+from verif_files.random_probing_exp1_func import verification_random_probing_exp_1
+from verif_files.random_probing_exp2_func import verification_random_probing_exp_2
+from verif_files.random_probing_exp_copy_func import verification_random_probing_exp_copy_12
+from verif_files.random_probing_exp_fused_func import verification_random_probing_exp_fused
+
+############################################################################################################
+####         Values of t and t_output (one value, or several values separated by commas)
+############################################################################################################
+def sweep_values(s):
+    values = [int(v) for v in s.split(",")]
+    if(min(values) < 1):
+        raise argparse.ArgumentTypeError("values should be at least 1")
+    return values
+    
+    
+############################################################################################################
+####         MAIN
+############################################################################################################
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("File", help="Name of gadget's input file")
+    parser.add_argument("Property", help="Property among P, RP, RPE, RPC to verify", choices=["P", "RP", "RPE", "RPC"])
+    parser.add_argument("-c", "--coeff_max", help="Number of Coefficients (default: -1 to compute all coefficients)", type=int)
+    parser.add_argument("-v", "--verbose", help="Verbosity During Execution", type=int, default=0, choices = [0,1,2])
+    parser.add_argument("-t", help="Number of input/output shares required for properties P, RPE and RPC (several values separated by commas are verified in a single run)", type=sweep_values)
+    parser.add_argument("-t_output", help="Number of output shares required for properties RPE and RPC (several values separated by commas are verified in a single run)", type=sweep_values)
+    parser.add_argument("-j", "--jobs", help="Number of worker processes used for the verification (default: 1)", type=int, default=1)
+    parser.add_argument("--checkpoint", help="Periodically save the state of the verification in files prefixed by CHECKPOINT")
+    parser.add_argument("--resume", help="Resume the verification from the files saved with --checkpoint", action="store_true")
+    parser.add_argument("--shard", help="Only verify the part k/N of the tuples (1 <= k <= N) and write the partial coefficients in a file (for RP and copy gadgets, only the tuples of size coeff_max are split, every shard verifies all the smaller tuples)")
+    parser.add_argument("--shard_output", help="File written by --shard (default: shard_k_N.npz)")
+    parser.add_argument("--merge", help="Merge the files written by the N shards of the verification and output the final results", nargs="+", metavar="SHARD_FILE")
+    parser.add_argument("--cache", help="Directory of the cache of compiled gadgets and of the coefficients already computed (nothing is cached if not specified)")
+    parser.add_argument("--symmetry", help="Detect the permutations of the shares (and of the inputs) leaving the gadget unchanged and only verify one tuple of each orbit", action="store_true")
+    parser.add_argument("--apriori", help="For property RP, only verify the tuples of each size extending the secure tuples of the previous size (the other tuples are counted without being enumerated)", action="store_true")
+    parser.add_argument("--survivors", help="For property RPE, only verify each output combination of the second function on the tuples which are failure tuples for all the previous ones (faster, the coefficients can be slightly larger)", action="store_true")
+    parser.add_argument("--fused", help="For property RPE, verify all the functions (RPE1 and RPE2, or the four functions of a copy gadget) in a single enumeration of the tuples (faster when t or t_output is nb_shares - 1)", action="store_true")
+    parser.add_argument("--dump", help="Write the rewritten gadget and the expressions of its wires in the files sage_tmp1.sage and sage_tmp2_exps.sage (debug)", action="store_true")
+    
+    args = parser.parse_args()
+    if((args.Property in ["RPE", "RPC", "P"]) and not(args.t)):
+        parser.error("Value of t is required when property is " + str(args.Property))
+        
+    if((args.Property in ["RPE", "RPC", "RP"]) and not(args.coeff_max)):
+        parser.error("Value of c is required when property is " + str(args.Property))
+
+    if(args.jobs < 1):
+        parser.error("Number of jobs should be at least 1")
+
+    if(args.resume and not(args.checkpoint)):
+        parser.error("--resume requires --checkpoint")
+
+    if(args.shard):
+        match = re.match(r"^(\d+)/(\d+)$", args.shard)
+        if((not match) or not(1 <= int(match.group(1)) <= int(match.group(2)))):
+            parser.error("Value of --shard should be k/N with 1 <= k <= N")
+        
+    if((args.shard or args.merge) and (args.Property == "P")):
+        parser.error("--shard and --merge are not available for property P")
+        
+    if(args.shard and args.merge):
+        parser.error("--shard and --merge cannot be used together")
+        
+    if(args.symmetry and (args.Property == "P")):
+        parser.error("--symmetry is not available for property P")
+        
+    if(args.apriori and (args.Property != "RP")):
+        parser.error("--apriori is only available for property RP")
+        
+    if(args.apriori and (args.symmetry or args.shard or args.merge)):
+        parser.error("--apriori cannot be used with --symmetry, --shard or --merge")
+        
+    if(args.survivors and (args.Property != "RPE")):
+        parser.error("--survivors is only available for property RPE")
+        
+    if(args.fused and (args.Property != "RPE")):
+        parser.error("--fused is only available for property RPE")
+        
+    if(args.fused and (args.symmetry or args.survivors)):
+        parser.error("--fused cannot be used with --symmetry or --survivors")
+        
+    #Couples (t, t_output) to verify, several couples (sweep) are verified in a single enumeration of the tuples for properties RPE and RPC
+    t_values = args.t if args.t else [None]
+    t_str = ",".join([str(t) for t in t_values])
+    t_output_str = ",".join([str(t_output) for t_output in (args.t_output if args.t_output else [None])])
+    sweep = [(t, t_output) for t in t_values for t_output in (args.t_output if args.t_output else [None])]
+    (args.t, args.t_output) = sweep[0]
+    
+    if((len(sweep) > 1) and (args.symmetry or args.survivors)):
+        parser.error("Several values of t or t_output cannot be used with --symmetry or --survivors")
+        
+    if((len(sweep) > 1) and (args.Property == "RPE")):
+        args.fused = True
+        
+    verbosity = args.verbose
+    
+    
+    #Checkpoints and shard files are only valid for the same gadget, property and parameters
+    with open(args.File, "rb") as f:
+        gadget_hash = hashlib.sha256(f.read()).hexdigest()
+    params = " ".join([gadget_hash, args.Property, str(args.coeff_max), t_str, t_output_str, str(BATCH_SIZE), str(args.symmetry), str(args.apriori), str(args.survivors), str(args.fused)])
+    
+    if(args.shard):
+        (k, nb_shards) = [int(v) for v in args.shard.split("/")]
+        shard.SHARD = (k - 1, nb_shards)
+        shard.SHARD_OUTPUT = args.shard_output if args.shard_output else "shard_" + str(k) + "_" + str(nb_shards) + ".npz"
+    shard.SHARD_PARAMS = params
+        
+    if(args.checkpoint):
+        checkpoint.CHECKPOINT_FILE = args.checkpoint
+        checkpoint.CHECKPOINT_RESUME = args.resume
+        checkpoint.CHECKPOINT_PARAMS = params + " " + str(args.shard)
+        
+    #The levels verified by a shard are partial, they are not stored in the cache of results
+    if(args.cache and not(args.shard or args.merge)):
+        result_cache.RESULT_CACHE_DIR = os.path.join(args.cache, gadget_hash + "_results_v" + str(result_cache.RESULT_CACHE_VERSION), args.Property + "_t" + t_str + "_" + t_output_str + "_b" + str(BATCH_SIZE) + ("_apriori" if args.apriori else "") + ("_sym" if args.symmetry else "") + ("_surv" if args.survivors else "") + ("_fused" if args.fused else ""))
+        
+    if(args.merge):
+        shard_merge(args.merge)
+    
+    ####    Analysis of input file
+    print ("Reading file...")
+    gadget = load_gadget(args.File, gadget_hash, args.cache, verbosity, args.dump)
+    (nb_shares, complexity, list_out) = (gadget["nb_shares"], gadget["complexity"], gadget["out"])
+    
+    #Numpy Arrays for intermediate variables only
+    (indices, exps, secret_deps, random_deps, nb_occs, weights, exps_str) = gadget["int"]
+    nb_wires = int(np.sum(nb_occs))
+
+    coeff_max = args.coeff_max
+    if coeff_max == -1:
+        coeff_max = len(indices)
+        args.coeff_max = nb_wires
+        
+    if coeff_max > len(indices):
+        coeff_max = len(indices)
+        args.coeff_max = nb_wires
+        
+    for t in t_values:
+        if((t) and (t >= nb_shares)):
+            print("Error : t (=" + str(t) + ") >= nb_shares (=" + str(nb_shares) + ")")
+            exit()
+
+    print("Gadget with " + str(len(secret_deps[0])) + " input(s),  " + str(len(list_out)) + " output(s),  " + str(nb_shares) + " share(s)")
+    print ("Total number of intermediate variables : "+str(len(indices)))
+    print ("Total number of output variables : " + str(len(list_out)))
+    print ("Total number of Wires : " + str(nb_wires) + "\n")
+    
+    ####    Symmetries of the gadget (intermediate wires, then the shares of each output)
+    if(args.symmetry):
+        kinds = [0] * len(exps) + [k+1 for k in range(len(list_out)) for w in list_out[k][1]]
+        order = symmetry_init(np.concatenate([exps] + [out[1] for out in list_out]), np.concatenate([nb_occs] + [out[4] for out in list_out]), kinds)
+        print("Symmetry group of order " + str(order) + "\n")
+    
+        
+    ##########################  Case of Copy Gadget (if property is RPE and is a copy gadget, special verification is needed)
+    if((args.Property not in ["RP", "RPC", "P"]) and (len(list_out) == 2) and (len(secret_deps[0]) == 1)):
+        print("Execution of RPE for a Copy Gadget...\n")
+        args.Property = "RPEC"
+        
+        
+    #####################################  Case of Probing P #####################################
+    if(args.Property == 'P'):
+        for t in t_values:
+            verification_probing(indices, weights, exps,  exps_str, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, t, verbosity, jobs = args.jobs)
+
+    #####################################  End of Case of Probing P #####################################
+        
+    #####################################  Case of Random Probing RP #####################################
+    elif(args.Property == 'RP'):      
+        
+        if(verbosity == 0):
+            print("Verifying Random Probing Security ...\n")
+        
+        if(verbosity > 0):
+            print ("----     Verification of Random Probing Security     ----")
+        start = time.time()
+        coeff_c = verification_random_probing(indices, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, verbosity, jobs = args.jobs, apriori = args.apriori)
+        end = time.time()
+        if(verbosity > 0):
+            print("\n----     End of Verification of Random Probing Security     ----\n")
+
+        if(shard.SHARD_OUTPUT is not None):
+            shard_save()
+            return
+        
+        #Lower bound on f(p)
+        fmin = get_fmin(coeff_c)
+        print("\nCoefficients fmin(p) = " + str(coeff_c) + "\n")
+        
+        #Upper bound on f(p)
+        fmax = get_fmax(coeff_c, args.coeff_max)
+        print("Coefficients fmax(p) = " + str(coeff_c) + "\n")
+        
+        #Printing outputs
+        print("Verification Time = " + str(end-start) + " seconds\n")
+        
+        print("Complexity (Nadd, Ncopy, Nmult, Nrand) = " + str(complexity) + "\n")
+
+        print("")
+    #####################################  End of Case of Random Probing RP #####################################
+    
+    
+    #####################################  Case of Random Probing COMP #####################################
+    elif(args.Property == 'RPC'):
+        (indices_o, exps_o, secret_deps_o, random_deps_o, nb_occs_o, weights_o, exps_str_o) = list_out[0]
+        indices_o = indices_o + len(exps) 
+        weights = np.append(weights, weights_o, 0)
+        exps = np.append(exps, exps_o, 0)
+        secret_deps = np.append(secret_deps, secret_deps_o, 0)
+        random_deps = np.append(random_deps, random_deps_o, 0)
+        nb_occs = np.append(nb_occs, nb_occs_o)
+        del weights_o;   del exps_o;   del exps_str_o;   del secret_deps_o;   del random_deps_o;   del nb_occs_o
+        
+        total_time = 0
+        
+        if(verbosity == 0):
+            print("Verifying Random Probing Composability ( t = " + t_str + " ) ...\n")
+        
+        if(verbosity > 0):
+            print("----     Verification of Random Probing Composability ( t = "+t_str+" )    ----")
+        start = time.time()
+        if(len(sweep) > 1):
+            outs = verification_random_probing_exp_fused(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, t_output = args.t_output, jobs = args.jobs, sweep = sweep, comp = True)
+        else:
+            outs = [verification_random_probing_comp(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, t_output = args.t_output, jobs = args.jobs)]
+        end = time.time()
+        if(verbosity > 0):
+            print("\n----     End of Verification of Random Probing Composability     ----\n\n")
+        total_time += (end-start)
+
+        if(shard.SHARD_OUTPUT is not None):
+            shard_save()
+            return
+
+        for ((t, t_output), out) in zip(sweep, outs):
+            if(len(sweep) > 1):
+                print("\n####################  t = " + str(t) + ", t_output = " + str(t_output) + "  ####################\n")
+            
+            coeffs = out
+            fmin = get_fmin(coeffs)
+            print("\nCoefficients Prop_COMP fmin(p) = " + str(coeffs) + "\n")  
+            fmax = get_fmax(coeffs, args.coeff_max)
+            print("Coefficients Prop_COMP fmax(p) = " + str(coeffs)) 
+        
+            if(len(sweep) == 1):
+                print("\nTotal Verification Time = " + str(total_time) + " seconds\n")
+            
+            print("Complexity (Nadd, Ncopy, Nmult, Nrand) = " + str(complexity) + "\n")
+        
+            #Amplification Order
+            d = next((i for i, x in enumerate(coeffs) if x), 0)
+            print("Amplification Order d = " + str(d) + "\n")
+            print("Coeff c" + str(d)+" = " + str(coeffs[d]) + "\n")
+        
+            pmin = find_pmax([fmax])
+            print("Log2 of Lower Bound on p : pmin = " + log2_str(pmin) + " , Log2 fmax(pmin) = " + log2_str(fmax(p = pmin)))
+        
+            pmax = find_pmax([fmin])
+            print("Log2 of Upper Bound on p : pmax = " + log2_str(pmax) + " , Log2 fmin(pmax) = " + log2_str(fmin(p = pmax)))
+            print("")
+        if(len(sweep) > 1):
+            print("Total Verification Time (all the values of t and t_output) = " + str(total_time) + " seconds\n")
+    
+    
+    #####################################  End of Case of Random Probing COMP #####################################
+    
+    
+    #####################################  Case of Random Probing EXP (EXP1 & EXP2) #####################################
+    elif(args.Property == 'RPE'):        
+    
+        if(len(list_out) != 1):
+            print("Not applicable yet, not 1 output.\n")
+            exit()
+            
+        (indices_o, exps_o, secret_deps_o, random_deps_o, nb_occs_o, weights_o, exps_str_o) = list_out[0]
+        indices_o = indices_o + len(exps) 
+        weights = np.append(weights, weights_o, 0)
+        exps = np.append(exps, exps_o, 0)
+        secret_deps = np.append(secret_deps, secret_deps_o, 0)
+        random_deps = np.append(random_deps, random_deps_o, 0)
+        nb_occs = np.append(nb_occs, nb_occs_o)
+        del weights_o;   del exps_o;   del exps_str_o;   del secret_deps_o;   del random_deps_o;   del nb_occs_o
+        
+        ##########################  Executing Verification Methods
+        total_time = 0
+        if(verbosity == 0):
+            print("Verifying Random Probing Expandability ( t = " + t_str + " ) ...\n")
+        
+        if(args.fused):
+            if(verbosity > 0):
+                print("----     Verification of Random Probing Expandability Properties 1 and 2 ( t = "+t_str+" )    ----")
+            start = time.time()
+            outs = verification_random_probing_exp_fused(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, t_output = args.t_output, jobs = args.jobs, sweep = sweep)
+            end = time.time()
+            if(verbosity > 0):
+                print("\n----     End of Verification of Random Probing Expandability Properties 1 and 2     ----\n\n")
+            total_time += (end-start)
+        
+        else:
+            if(verbosity > 0):
+                print("----     Verification of Random Probing Expandability Property 1 ( t = "+t_str+" )    ----")
+            start = time.time()
+            out1 = verification_random_probing_exp_1(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, t_output = args.t_output, jobs = args.jobs)
+            end = time.time()
+            if(verbosity > 0):
+                print("\n----     End of Verification of Random Probing Expandability Property 1     ----\n\n")
+            total_time += (end-start)
+    
+            if(verbosity > 0):
+                print("----     Verification of Random Probing Expandability Property 2 ( t = "+t_str+" )    ----")
+            start = time.time()
+            out2 = verification_random_probing_exp_2(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, survivors = args.survivors)
+            end = time.time()
+            if(verbosity > 0):
+                print("\n----     End of Verification of Random Probing Expandability Property 2     ----\n\n")
+            total_time += (end-start)
+            outs = [(out1, out2)]
+
+        if(shard.SHARD_OUTPUT is not None):
+            shard_save()
+            return
+
+        for ((t, t_output), (out1, out2)) in zip(sweep, outs):
+            if(len(sweep) > 1):
+                print("\n####################  t = " + str(t) + ", t_output = " + str(t_output) + "  ####################\n")
+            
+            #####################################  Case of Gadgets with 1 input, 1 output #####################################
+            if(len(secret_deps[0]) == 1):
+        
+                coeffs1 = out1
+                coeffs2 = out2  
+                coeffs = [max(coeffs1[i], coeffs2[i]) for i in range(len(coeffs1))]
+                if(verbosity > 0):
+                    print("\nCoefficients Prop_EXP1 fmin_I1(p) = " + str(coeffs1))  
+                    print("Coefficients Prop_EXP2 fmin_I1(p) = " + str(coeffs2)) 
+                
+                print("Coefficients Prop_EXP fmin_I1(p) = " + str(coeffs)) 
+                print("") 
+               
+                get_fmax(coeffs1, args.coeff_max)
+                get_fmax(coeffs2, args.coeff_max)
+                fmin = get_fmin(coeffs)
+                fmax = get_fmax(coeffs, args.coeff_max)
+                
+                if(verbosity > 0):    
+                    print("Coefficients Prop_EXP1 fmax_I1(p) = " + str(coeffs1)) 
+                    print("Coefficients Prop_EXP2 fmax_I1(p) = " + str(coeffs2)) 
+                
+                print("Coefficients Prop_EXP fmax_I1(p) = " + str(coeffs)) 
+
+
+                if(len(sweep) == 1):
+                    print("\nTotal Verification Time = " + str(total_time) + " seconds\n")
+            
+                print("Complexity (Nadd, Ncopy, Nmult, Nrand) = " + str(complexity) + "\n")
+            
+                #Amplification Order
+                d = next((i for i, x in enumerate(coeffs) if x), 0)
+                print("Amplification Order d = " + str(d) + "\n")
+            
+                pmin = find_pmax([fmax])
+                print("Log2 of Lower Bound on p : pmin = " + log2_str(pmin) + " , Log2 fmax(pmin) = " + log2_str(fmax(p = pmin)))
+            
+                pmax = find_pmax([fmin])
+                print("Log2 of Upper Bound on p : pmax = " + log2_str(pmax) + " , Log2 fmin(pmax) = " + log2_str(fmin(p = pmax)))
+                print("")
+            #####################################  End of Case of Gadgets with 1 input, 1 output ##################################### 
+            
+            #####################################  Case of Gadgets with 2 inputs, 1 output #####################################
+            else:
+                liste_fmin = []
+                liste_fmax = []
+            
+                coeffs1_I1, coeffs1_I2, coeffs1_I1_and_I2, coeffs1_I1_or_I2 = out1
+                coeffs2_I1, coeffs2_I2, coeffs2_I1_and_I2, coeffs2_I1_or_I2 = out2
+            
+                coeffs_I1 = [max(coeffs1_I1[i], coeffs2_I1[i]) for i in range(len(coeffs1_I1))]
+                coeffs_I2 = [max(coeffs1_I2[i], coeffs2_I2[i]) for i in range(len(coeffs1_I2))]
+                coeffs_I1_and_I2 = [max(coeffs1_I1_and_I2[i], coeffs2_I1_and_I2[i]) for i in range(len(coeffs1_I1_and_I2))]
+            
+                d1 = next((i for i, x in enumerate(coeffs_I1) if x), 0)
+                d2 = next((i for i, x in enumerate(coeffs_I2) if x), 0)
+                d12 = next((i for i, x in enumerate(coeffs_I1_and_I2) if x), 0)
+                if(d1 < d2):
+                    d = d1
+                    cd = coeffs_I1[d]
+                elif(d1 > d2):
+                    d = d2
+                    cd = coeffs_I2[d]
+                else:
+                    d = d1
+                    cd = max(coeffs_I1[d], coeffs_I2[d])
+                
+                #d12/2 is kept exact (printed as 3/2 for instance)
+                if(d > Fraction(d12, 2)):
+                    d = Fraction(d12, 2)
+                    cd = sqrt_coeff(coeffs_I1_and_I2[d12])
+                
+                elif(d == Fraction(d12, 2)):
+                    cd = max(cd, sqrt_coeff(coeffs_I1_and_I2[d12]))
+                
+                if(verbosity > 0):
+                    #EXP1
+                    print("Coefficients Prop_EXP1 fmin_I1(p) = " + str(coeffs1_I1))
+                    print("Coefficients Prop_EXP1 fmin_I2(p) = " + str(coeffs1_I2))
+                    print("Coefficients Prop_EXP1 fmin_I1_and_I2(p) = " + str(coeffs1_I1_and_I2))
+                    print("")
+                    
+                liste_fmin.append(get_fmin(coeffs1_I1))
+                liste_fmax.append(get_fmax(coeffs1_I1, args.coeff_max))
+                liste_fmin.append(get_fmin(coeffs1_I2))
+                liste_fmax.append(get_fmax(coeffs1_I2, args.coeff_max))
+                liste_fmin.append(sqrt_function(get_fmin(coeffs1_I1_and_I2)))
+                liste_fmax.append(sqrt_function(get_fmax(coeffs1_I1_and_I2, args.coeff_max)))
+            
+                if(verbosity > 0):
+                
+                    print("Coefficients Prop_EXP1 fmax_I1(p) = " + str(coeffs1_I1))
+                    print("Coefficients Prop_EXP1 fmax_I2(p) = " + str(coeffs1_I2))
+                    print("Coefficients Prop_EXP1 fmax_I1_and_I2(p) = " + str(coeffs1_I1_and_I2) + "\n")  
+                
+                    #EXP2
+                    print("Coefficients Prop_EXP2 fmin_I1(p) = " + str(coeffs2_I1))
+                    print("Coefficients Prop_EXP2 fmin_I2(p) = " + str(coeffs2_I2))
+                    print("Coefficients Prop_EXP2 fmin_I1_and_I2(p) = " + str(coeffs2_I1_and_I2))
+                    print("")
+                    
+                liste_fmin.append(get_fmin(coeffs2_I1))
+                liste_fmax.append(get_fmax(coeffs2_I1, args.coeff_max))
+                liste_fmin.append(get_fmin(coeffs2_I2))
+                liste_fmax.append(get_fmax(coeffs2_I2, args.coeff_max))
+                liste_fmin.append(sqrt_function(get_fmin(coeffs2_I1_and_I2)))
+                liste_fmax.append(sqrt_function(get_fmax(coeffs2_I1_and_I2, args.coeff_max)))
+            
+                if(verbosity > 0):
+                
+                    print("Coefficients Prop_EXP2 fmax_I1(p) = " + str(coeffs2_I1))
+                    print("Coefficients Prop_EXP2 fmax_I2(p) = " + str(coeffs2_I2))
+                    print("Coefficients Prop_EXP2 fmax_I1_and_I2(p) = " + str(coeffs2_I1_and_I2) + "\n") 
+                
+                #EXP BOTH
+                print("Coefficients Prop_EXP fmin_I1(p) = " + str(coeffs_I1))
+                print("Coefficients Prop_EXP fmin_I2(p) = " + str(coeffs_I2))
+                print("Coefficients Prop_EXP fmin_I1_and_I2(p) = " + str(coeffs_I1_and_I2))
+                print("")
+            
+                get_fmax(coeffs_I1, args.coeff_max)
+                get_fmax(coeffs_I2, args.coeff_max)
+                get_fmax(coeffs_I1_and_I2, args.coeff_max)
+            
+                print("Coefficients Prop_EXP fmax_I1(p) = " + str(coeffs_I1))
+                print("Coefficients Prop_EXP fmax_I2(p) = " + str(coeffs_I2))
+                print("Coefficients Prop_EXP fmax_I1_and_I2(p) = " + str(coeffs_I1_and_I2))
+                
+                if(len(sweep) == 1):
+                    print("\nTotal Verification Time = " + str(total_time) + " seconds\n")
+            
+                print("Complexity (Nadd, Ncopy, Nmult, Nrand) = " + str(complexity) + "\n")
+            
+                #Amplification Order
+                print("Amplification Order d = " + str(d))
+                print("Coeff c" + str(d)+" = " + str(cd) + "\n")
+            
+                pmin = find_pmax(liste_fmax)
+                print("Log2 of Lower Bound on p : pmin = " + log2_str(pmin) + " , Log2 fmax(pmin) = " + log2_str(max([f(p = pmin) for f in liste_fmax])))
+            
+                pmax = find_pmax(liste_fmin)
+                print("Log2 of Upper Bound on p : pmax = " + log2_str(pmax) + " , Log2 fmin(pmax) = " + log2_str(max([f(p = pmax) for f in liste_fmin])))
+                print("")
+            #####################################  End of Case of Gadgets with 2 inputs, 1 output #####################################
+        if(len(sweep) > 1):
+            print("Total Verification Time (all the values of t and t_output) = " + str(total_time) + " seconds\n")
+        
+    #####################################  Case of Random Probing EXP (EXP1 & EXP2) #####################################
+    
+    #####################################  Case of RPE for Copy Gadgets with 1 input, 2 outputs #####################################
+    else:
+        (indices_o1, exps_o, secret_deps_o, random_deps_o, nb_occs_o, weights_o, exps_str_o) = list_out[0]
+        indices_o1 = indices_o1 + len(exps) 
+        weights = np.append(weights, weights_o, 0)
+        exps = np.append(exps, exps_o, 0)
+        secret_deps = np.append(secret_deps, secret_deps_o, 0)
+        random_deps = np.append(random_deps, random_deps_o, 0)
+        nb_occs = np.append(nb_occs, nb_occs_o)
+        del weights_o;   del exps_o;   del exps_str_o;   del secret_deps_o;   del random_deps_o;   del nb_occs_o
+        
+        (indices_o2, exps_o, secret_deps_o, random_deps_o, nb_occs_o, weights_o, exps_str_o) = list_out[1]
+        indices_o2 = indices_o2 + len(exps) 
+        weights = np.append(weights, weights_o, 0)
+        exps = np.append(exps, exps_o, 0)
+        secret_deps = np.append(secret_deps, secret_deps_o, 0)
+        random_deps = np.append(random_deps, random_deps_o, 0)
+        nb_occs = np.append(nb_occs, nb_occs_o)
+        del weights_o;   del exps_o;   del exps_str_o;   del secret_deps_o;   del random_deps_o;   del nb_occs_o
+        
+        indices_o = np.asarray([indices_o1, indices_o2])
+        
+        ##########################  Executing Verification Method
+        total_time = 0
+        
+        if(verbosity > 0):
+            print("----     Verification of Random Probing Expandability Copy    ----\n")
+        start = time.time()
+        
+        if(verbosity == 0):
+            print("Verifying Random Probing Expandability ( t = " + t_str + " ) ...\n")
+        
+        if(args.fused):
+            if(verbosity > 0):
+                print("\n----     Verification of EXP Copy 1, 2, 12 and 21    ----\n")
+            #t_output is not used for the copy gadgets, only the values of t are verified
+            outs = verification_random_probing_exp_fused(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, copy = True, jobs = args.jobs, sweep = [(t, None) for t in t_values])
+        
+        else:
+            if(verbosity > 0):
+                print("\n----     Verification of EXP Copy 1    ----\n")
+            c1 = verification_random_probing_exp_1(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, copy = True, jobs = args.jobs)
+            
+            if(verbosity > 0):
+                print("\n----     Verification of EXP Copy 2    ----\n")
+            c2 = verification_random_probing_exp_2(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, copy = True, survivors = args.survivors)
+            
+            if(verbosity > 0):
+                print("\n----     Verification of EXP Copy 12   ----\n")
+            c12 = verification_random_probing_exp_copy_12(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, 0, jobs = args.jobs, survivors = args.survivors)
+            
+            if(verbosity > 0):
+                print("\n----     Verification of EXP Copy 21    ----\n")
+            c21 = verification_random_probing_exp_copy_12(indices, indices_o, weights, exps, secret_deps, random_deps, nb_occs, coeff_max, nb_shares, args.t, verbosity, 1, jobs = args.jobs, survivors = args.survivors)
+            outs = [(c1, c2, c12, c21)]
+        end = time.time()
+        
+        if(verbosity > 0):
+            print("\n----     End of Verification of Random Probing Expandability Copy     ----\n\n")
+        total_time += (end-start)
+
+        if(shard.SHARD_OUTPUT is not None):
+            shard_save()
+            return
+        
+        for (t, (c1, c2, c12, c21)) in zip(t_values, outs):
+            if(len(t_values) > 1):
+                print("\n####################  t = " + str(t) + "  ####################\n")
+            
+            c = [max(c1[i], max(c2[i], max(c12[i], c21[i]))) for i in range(len(c1))]
+            liste_fmin = []
+            liste_fmax = []
+        
+            if(verbosity > 0):
+                print("Coeffs f1_min(p) =  " + str(c1))
+                print("Coeffs f2_min(p) =  " + str(c2))
+                print("Coeffs f12_min(p) =  " + str(c12))
+                print("Coeffs f21_min(p) =  " + str(c21)+"\n")
+            
+            liste_fmin.append(get_fmin(c1))
+            liste_fmin.append(get_fmin(c2))
+            liste_fmin.append(get_fmin(c12))
+            liste_fmin.append(get_fmin(c21))
+        
+            liste_fmax.append(get_fmax(c1, args.coeff_max))
+            liste_fmax.append(get_fmax(c2, args.coeff_max))
+            liste_fmax.append(get_fmax(c12, args.coeff_max))
+            liste_fmax.append(get_fmax(c21, args.coeff_max))
+            
+            if(verbosity > 0):
+                print("Coeffs f1_max(p) =  " + str(c1))
+                print("Coeffs f2_max(p) =  " + str(c2))
+                print("Coeffs f12_max(p) =  " + str(c12))
+                print("Coeffs f21_max(p) =  " + str(c21) + "\n")
+            
+            
+            d = next((i for i, x in enumerate(c) if x), 0)
+            
+            fmin = get_fmin(c)
+            print("coeffs f_min(p) : " + str(c))
+        
+            fmax = get_fmax(c, args.coeff_max)
+            print("\ncoeffs f_max(p) : " + str(c))
+        
+            if(len(t_values) == 1):
+                print("\nTotal Verification Time = " + str(total_time) + " seconds\n")
+            
+            print("Complexity (Nadd, Ncopy, Nmult, Nrand) = " + str(complexity) + "\n")
+        
+            #Amplification Order
+            print("Amplification Order d = " + str(d) + "\n")
+        
+            pmin = find_pmax(liste_fmax)
+            print("Log2 of Lower Bound on p : pmin = " + log2_str(pmin) + " , Log2 fmax(pmin) = " + log2_str(max([f(p = pmin) for f in liste_fmax])))
+        
+            pmax = find_pmax(liste_fmin)
+            print("Log2 of Upper Bound on p : pmax = " + log2_str(pmax) + " , Log2 fmin(pmax) = " + log2_str(max([f(p = pmax) for f in liste_fmin])))
+            print("")
+        if(len(t_values) > 1):
+            print("Total Verification Time (all the values of t) = " + str(total_time) + " seconds\n")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file